@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Cache of the outputs ("artifacts") of the components of Linguistica
+#
+#    An entry of the cache is keyed by the SHA-1 of the name and version of
+#    a component, its parameters (the settings it is run with), and the
+#    contents of its input files. It keeps hard links to (or, where there
+#    are none, copies of) the output files of a run of the component, and
+#    its manifest (manifest.json): the component, version, parameters, the
+#    SHA-1 of each input and output file, and when the entry was created and
+#    last used. When the outputs needed by the other components are there
+#    as the entry has them, the component is not run again, and the missing
+#    ones are restored from the entry.
+#
+#    A component writes the settings it was run with next to its outputs,
+#    with the size and modification time of its input files, in a settings
+#    file (<corpus>_settings.json, see write_settings). Outputs the cache has
+#    no entry for, e.g. those of an earlier run of the component on its own,
+#    are "adopted" if they are all there and their settings file has the
+#    parameters of the entry and the inputs as they are now: an entry is
+#    made with their hashes, and the component is not run. Otherwise (some
+#    outputs are missing, or they were made with other settings or inputs)
+#    they are restored from the entry, or else the component is run again.
+#
+#    The cache is the folder [language]/cache/:
+#
+#    <key>/manifest.json
+#    <key>/files/...   -- the outputs, by their paths relative to [language]/
+#    hashes.json       -- SHA-1 of files by path, size and modification time,
+#                         so that unchanged files are not read again
+#
+#    Usage (listing and evicting entries):
+#
+#        $ python3 artifact_cache.py ../data/english/cache --list
+#        $ python3 artifact_cache.py ../data/english/cache --max-age=30 --max-size=1000
+#
+#------------------------------------------------------------------------------#
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import time
+
+MANIFEST = "manifest.json"
+FILES = "files"
+HASHES = "hashes.json"
+
+BLOCK_SIZE = 1 << 20
+
+
+def cache_path(language, datafolder, filename):
+    """Return the cache folder for the corpus (next to its outputs)."""
+    if filename:
+        return Path(Path(filename).parent, "cache")
+    else:
+        return Path(datafolder, language, "cache")
+
+
+class ArtifactCache:
+    """The cache in "folder" (see above). "root" is the folder that the
+    paths of the output files in the manifests are relative to."""
+
+    def __init__(self, folder, root=None):
+        self.folder = Path(folder)
+        self.root = Path(root) if root is not None else self.folder.parent
+        self._hashes = None
+
+    # -------------------------------------------------------------------------#
+    #   file hashes
+    # -------------------------------------------------------------------------#
+
+    def file_hash(self, path):
+        """Return the SHA-1 of the contents of the file "path"; for a folder,
+        of the names and contents of its files."""
+        path = Path(path)
+        if path.is_dir():
+            sha1 = hashlib.sha1()
+            for child in sorted(path.iterdir()):
+                sha1.update(child.name.encode("utf-8"))
+                sha1.update(self.file_hash(child).encode("ascii"))
+            return sha1.hexdigest()
+
+        if self._hashes is None:
+            self._hashes = self._load_json(Path(self.folder, HASHES), dict())
+        stat = path.stat()
+        key = str(path.resolve())
+        known = self._hashes.get(key)
+        if known and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+
+        sha1 = hashlib.sha1()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                sha1.update(block)
+        self._hashes[key] = [stat.st_size, stat.st_mtime_ns, sha1.hexdigest()]
+        return sha1.hexdigest()
+
+    def save_hashes(self):
+        if self._hashes is not None:
+            # only for files which still exist
+            self._hashes = {path: known for path, known in self._hashes.items()
+                            if Path(path).exists()}
+            self._save_json(Path(self.folder, HASHES), self._hashes)
+
+    # -------------------------------------------------------------------------#
+    #   entries
+    # -------------------------------------------------------------------------#
+
+    def key(self, component, version, parameters, inputs):
+        """Return the key of a run of "component" (of "version") with
+        the dict "parameters" on the input files "inputs"."""
+        description = {"component": component, "version": version,
+                       "parameters": parameters,
+                       "inputs": [self.file_hash(path) for path in inputs]}
+        return hashlib.sha1(json.dumps(description, sort_keys=True,
+                                       default=str).encode("utf-8")).hexdigest()
+
+    def entry(self, key):
+        return Path(self.folder, key)
+
+    def manifest(self, key):
+        """Return the manifest of the entry "key" if the entry is complete
+        (all its files are there with their contents, which a file hard
+        linked to an output rewritten in place no longer has), or else
+        None."""
+        manifest = self._load_json(Path(self.entry(key), MANIFEST), None)
+        if manifest is None:
+            return None
+        for relpath, output in manifest["outputs"].items():
+            path = Path(self.entry(key), FILES, relpath)
+            if not path.is_file() or path.stat().st_size != output["bytes"] \
+                    or self.file_hash(path) != output["sha1"]:
+                return None
+        return manifest
+
+    def manifests(self):
+        """Return the list of the manifests of all the entries."""
+        if not self.folder.exists():
+            return list()
+        return [manifest for manifest in
+                (self._load_json(Path(entry, MANIFEST), None)
+                 for entry in sorted(self.folder.iterdir()) if entry.is_dir())
+                if manifest is not None]
+
+    def store(self, key, component, version, parameters, inputs, outputs,
+              adopted=False):
+        """Make the entry "key" with the files "outputs" (hard linked, or
+        copied). "adopted" is True for outputs not made by cached_run()."""
+        entry = self.entry(key)
+        if entry.exists():
+            shutil.rmtree(str(entry))
+        manifest = {"key": key, "component": component, "version": version,
+                    "parameters": parameters, "adopted": adopted,
+                    "inputs": {str(path): self.file_hash(path)
+                               for path in inputs},
+                    "outputs": dict(), "created": time.time()}
+        for path in sorted(outputs):
+            relpath = Path(path).relative_to(self.root)
+            target = Path(entry, FILES, relpath)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            _link_or_copy(path, target)
+            manifest["outputs"][relpath.as_posix()] = {
+                "bytes": target.stat().st_size,
+                "sha1": self.file_hash(path)}
+        self.touch(manifest)
+        return manifest
+
+    def restore(self, manifest, replace=False):
+        """Put the outputs of the entry of "manifest" which are missing (and
+        those which differ if "replace" is True) back in their places (hard
+        linked, or copied), and return the list of them."""
+        restored = list()
+        for relpath, output in manifest["outputs"].items():
+            path = Path(self.root, relpath)
+            if path.exists():
+                if not replace or self.file_hash(path) == output["sha1"]:
+                    continue
+                path.unlink()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _link_or_copy(Path(self.entry(manifest["key"]), FILES, relpath),
+                          path)
+            restored.append(path)
+        self.touch(manifest)
+        return restored
+
+    def has_outputs(self, manifest, paths):
+        """Return True if the files "paths" are all outputs of the entry of
+        "manifest", and the outputs of the entry which are there have the
+        same contents (i.e. none was rewritten since)."""
+        if not {Path(path).relative_to(self.root).as_posix()
+                for path in paths} <= set(manifest["outputs"]):
+            return False
+        for relpath, output in manifest["outputs"].items():
+            path = Path(self.root, relpath)
+            if path.is_file() and self.file_hash(path) != output["sha1"]:
+                return False
+        return True
+
+    def touch(self, manifest):
+        manifest["last used"] = time.time()
+        self._save_json(Path(self.entry(manifest["key"]), MANIFEST), manifest)
+
+    def evict(self, max_age=None, max_bytes=None):
+        """Remove the entries last used more than max_age seconds ago, and
+        then the least recently used ones until the entries take at most
+        max_bytes bytes. Return the list of keys removed."""
+        manifests = sorted(self.manifests(), key=lambda m: m["last used"])
+        sizes = {m["key"]: sum(output["bytes"]
+                               for output in m["outputs"].values())
+                 for m in manifests}
+        total = sum(sizes.values())
+        now = time.time()
+
+        removed = list()
+        for manifest in manifests:
+            key = manifest["key"]
+            if (max_age is not None and now - manifest["last used"] > max_age)\
+                    or (max_bytes is not None and total > max_bytes):
+                shutil.rmtree(str(self.entry(key)))
+                total -= sizes[key]
+                removed.append(key)
+        return removed
+
+    # -------------------------------------------------------------------------#
+
+    @staticmethod
+    def _load_json(path, default):
+        try:
+            with path.open() as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    @staticmethod
+    def _save_json(path, obj):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = Path(str(path) + ".tmp")
+        with temp.open("w") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=4)
+        temp.replace(path)
+
+
+def settings_path(outfolder, corpus_stem):
+    """Return the settings file of the outputs for corpus_stem in
+    outfolder."""
+    return Path(outfolder, corpus_stem + "_settings.json")
+
+
+def write_settings(path, settings, inputs):
+    """Write the settings file "path" of outputs made with the dict
+    "settings" from the files "inputs" (see the top of this module)."""
+    ArtifactCache._save_json(Path(path),
+        {"settings": settings,
+         "inputs": {str(Path(input)): _stat(input) for input in inputs}})
+
+
+def remove_settings(path):
+    """Remove the settings file "path" before its outputs are rewritten."""
+    if Path(path).exists():
+        Path(path).unlink()
+
+
+def has_settings(path, settings, inputs):
+    """Return True if the settings file "path" is for outputs made with
+    "settings" from the files "inputs" as they are now."""
+    recorded = ArtifactCache._load_json(Path(path), None)
+    return recorded is not None and recorded.get("settings") == settings \
+        and recorded.get("inputs") == {str(Path(input)): _stat(input)
+                                       for input in inputs}
+
+
+def _stat(path):
+    stat = Path(path).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _link_or_copy(source, target):
+    """Hard link "target" to "source", or copy it where this fails (e.g.
+    across file systems)."""
+    try:
+        os.link(str(source), str(target))
+    except OSError:
+        shutil.copyfile(str(source), str(target))
+
+
+def _snapshot(folders):
+    """Return {path: (size, modification time)} of the files in "folders"."""
+    snapshot = dict()
+    for folder in folders:
+        if Path(folder).exists():
+            for path in Path(folder).rglob("*"):
+                if path.is_file():
+                    stat = path.stat()
+                    snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def cached_run(cache, component, version, parameters, inputs, outfolders,
+               run, outputs, settingsfile):
+    """Make sure that the files "outputs" of "component" (of "version")
+    with "parameters" on the files "inputs" are there and up to date (see
+    the top of this module): they are restored from the ArtifactCache
+    "cache", or adopted in it if "settingsfile" is for them, or else run()
+    is called and the files it writes or changes in "outfolders" are
+    stored. Return True if run() was not called."""
+    key = cache.key(component, version, parameters, inputs)
+    manifest = cache.manifest(key)
+    outputs = [Path(path) for path in outputs]
+
+    if manifest is not None and cache.has_outputs(manifest, outputs):
+        restored = cache.restore(manifest)
+        print("{}: outputs reused from the cache ({} of {} files "
+              "restored)".format(component, len(restored),
+                                 len(manifest["outputs"])), flush=True)
+        cache.save_hashes()
+        return True
+
+    if all(path.is_file() for path in outputs) and \
+            has_settings(settingsfile, parameters, inputs):
+        cache.store(key, component, version, parameters, inputs,
+                    outputs + [Path(settingsfile)], adopted=True)
+        print("{}: existing outputs adopted in the cache {}".format(
+              component, cache.entry(key)), flush=True)
+        cache.save_hashes()
+        return True
+
+    # outputs which are missing or were made with other settings are
+    # replaced (an adopted entry has only some of the outputs)
+    if manifest is not None and not manifest.get("adopted"):
+        restored = cache.restore(manifest, replace=True)
+        print("{}: outputs restored from the cache ({} of {} files)".format(
+              component, len(restored), len(manifest["outputs"])), flush=True)
+        cache.save_hashes()
+        return True
+
+    # outputs hard linked to entries get files of their own, which run()
+    # may rewrite in place without changing the entries
+    for path in _snapshot(outfolders):
+        if path.stat().st_nlink > 1:
+            temp = Path(str(path) + ".tmp")
+            shutil.copy2(str(path), str(temp))
+            temp.replace(path)
+
+    before = _snapshot(outfolders)
+    run()
+    after = _snapshot(outfolders)
+    written = [path for path, stat in after.items()
+               if before.get(path) != stat]
+    cache.store(key, component, version, parameters, inputs, written)
+    print("{}: {} output files stored in the cache {}".format(component,
+          len(written), cache.entry(key)), flush=True)
+    cache.save_hashes()
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="List or evict the entries of an artifact cache.")
+    parser.add_argument("cache", help="cache folder, e.g. "
+                        "../data/english/cache")
+    parser.add_argument("--list", help="list the entries",
+                        action="store_true")
+    parser.add_argument("--max-age", help="remove the entries not used for "
+                        "this number of days",
+                        type=float, default=None)
+    parser.add_argument("--max-size", help="then remove the least recently "
+                        "used entries until the cache takes at most this "
+                        "number of megabytes",
+                        type=float, default=None)
+    args = parser.parse_args()
+
+    cache = ArtifactCache(args.cache)
+
+    if args.max_age is not None or args.max_size is not None:
+        removed = cache.evict(
+            max_age=None if args.max_age is None else args.max_age * 86400,
+            max_bytes=None if args.max_size is None else args.max_size * 2**20)
+        print("{} entries removed".format(len(removed)))
+
+    if args.list:
+        for manifest in cache.manifests():
+            print("{}\t{}{}\t{}\t{} files\t{:.1f} MB\tlast used {}".format(
+                  manifest["key"], manifest["component"],
+                  " (adopted)" if manifest.get("adopted") else "",
+                  json.dumps(manifest["parameters"], sort_keys=True),
+                  len(manifest["outputs"]),
+                  sum(output["bytes"] for output in manifest["outputs"].values())
+                  / 2**20,
+                  time.strftime("%Y-%m-%d %H:%M",
+                                time.localtime(manifest["last used"]))))
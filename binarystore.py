@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Helpers for binary datasets stored as folders of .npy files, which are
+#    memory-mapped when loaded so that opening even a large dataset is
+#    nearly instantaneous.
+#
+#    A string table (e.g. a vocabulary) is stored as two arrays: the UTF-8
+#    bytes of all strings joined by "\n", and the byte offset where each
+#    string starts (plus the total length at the end).
+#
+#------------------------------------------------------------------------------#
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+STRING_SEP = "\n"
+
+
+def save_arrays(folder: Path, **arrays):
+    """Save each keyword argument as "<name>.npy" in "folder"."""
+    if not folder.exists():
+        folder.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(str(Path(folder, name + ".npy")), np.asarray(array))
+
+
+class ArrayWriter:
+    """Write an array of known shape and dtype as "<name>.npy" in "folder"
+    in consecutive batches of rows, so that the whole array need not be in
+    memory at once. Use as a context manager, or call close()."""
+
+    def __init__(self, folder: Path, name, shape, dtype):
+        if not folder.exists():
+            folder.mkdir(parents=True)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.nrows = 0
+        self._file = Path(folder, name + ".npy").open("wb")
+        np.lib.format.write_array_header_1_0(self._file,
+            {"descr": np.lib.format.dtype_to_descr(self.dtype),
+             "fortran_order": False, "shape": self.shape})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, rows):
+        rows = np.ascontiguousarray(rows, dtype=self.dtype)
+        self.nrows += len(rows)
+        self._file.write(rows.tobytes())
+
+    def close(self):
+        self._file.close()
+        if self.nrows != self.shape[0]:
+            raise ValueError("{} rows written, {} expected"
+                             .format(self.nrows, self.shape[0]))
+
+
+def load_array(folder: Path, name, mmap_mode="r"):
+    return np.load(str(Path(folder, name + ".npy")), mmap_mode=mmap_mode)
+
+
+def save_info(folder: Path, info):
+    with Path(folder, "info.json").open("w") as f:
+        json.dump(info, f, ensure_ascii=False, indent=4)
+
+
+def load_info(folder: Path):
+    with Path(folder, "info.json").open() as f:
+        return json.load(f)
+
+
+def save_string_table(folder: Path, name, strings):
+    """Save the sequence "strings" (which must not contain "\\n") as the
+    string table "name" in "folder"."""
+    strings = list(strings)
+    encoded = [s.encode("utf-8") for s in strings]
+    for s in encoded:
+        if b"\n" in s:
+            raise ValueError("String {!r} contains a newline".format(s))
+
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) + 1 for s in encoded])
+    blob = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+
+    save_arrays(folder, **{name + "_strings": blob,
+                           name + "_offsets": offsets})
+
+
+class StringTable:
+    """Read-only, memory-mapped table of strings saved by
+    save_string_table(). Strings are decoded only when accessed."""
+
+    def __init__(self, folder: Path, name):
+        self._blob = load_array(folder, name + "_strings")
+        self._offsets = load_array(folder, name + "_offsets")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError("string table index out of range")
+        i %= len(self)
+        start, end = self._offsets[i], self._offsets[i + 1] - 1
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        """Decode all strings at once."""
+        if not len(self):
+            return list()
+        return self._blob.tobytes().decode("utf-8").split(STRING_SEP)
+
+    def to_index(self):
+        """Return a dict from string to its position in the table."""
+        return {s: i for i, s in enumerate(self.tolist())}
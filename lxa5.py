@@ -7,21 +7,29 @@
 #------------------------------------------------------------------------------#
 
 import argparse
+from contextlib import contextmanager
+import copy
+import multiprocessing
 import time
 from pathlib import Path
 import sys
 
 from lxa5_module import (read_word_freq_file, MakeBiSignatures,
-                         MakeStemToWords,
-                         MakeSigToStems, MakeAffixToSigs,
-                         MakeStemToSig, MakeWordToSigs,
-                         MakeWordToSigtransforms)
+                         MakeStemToWords, SignatureBuilder, BISIG_ENGINES,
+                         MakeBisigTable, MakeStemWordTable,
+                         MakeStemToWordsTwoPass)
+from lxa5_incremental import IncrementalMorphology, state_path
+from lxa5_index import write_morphology_index, morphology_index_path
+from artifact_cache import (ArtifactCache, cache_path, cached_run,
+                            settings_path, write_settings, remove_settings)
 
 from lxa5lib import (get_language_corpus_datafolder, json_pdump,
                      changeFilenameSuffix, stdout_list, OutputLargeDict,
                      load_config_for_command_line_help,
                      determine_use_corpus, read_word_freq,
-                     sorted_alphabetized, get_wordlist_path_corpus_stem)
+                     sorted_alphabetized, get_wordlist_path_corpus_stem,
+                     open_file, compressed_path, find_file, COMPRESSIONS,
+                     StageMetrics)
 
 import ngrams
 
@@ -31,6 +39,13 @@ import ngrams
 
 NumberOfCorrections = 100  # TODO: keep or not?
 
+# FindSuffixesFlag of each --direction
+DIRECTIONS = {"suffix": True, "prefix": False}
+
+# version of the outputs of main() in the artifact cache (see
+# artifact_cache.py); increase it when they change
+CACHE_VERSION = 1
+
 #------------------------------------------------------------------------------#
 
 def makeArgParser(configfilename="config.json"):
@@ -73,6 +88,49 @@ def makeArgParser(configfilename="config.json"):
                         " if this is zero, then the program counts "
                         "all word tokens in the corpus",
                         type=int, default=0)
+    parser.add_argument("--compress", help="compress the outputs (their "
+                        "names end in \".gz\" etc)",
+                        type=str, choices=sorted(COMPRESSIONS), default=None)
+    parser.add_argument("--bisig-engine", help="how word pairs for "
+                        "bisignatures are found: \"pairs\" compares all "
+                        "pairs of words with the same first letters, "
+                        "\"splits\" groups the stem/affix splits of the "
+                        "words by stem (faster for large wordlists; same "
+                        "results)",
+                        type=str, choices=sorted(BISIG_ENGINES),
+                        default="pairs")
+    parser.add_argument("--workers", help="number of processes finding "
+                        "bisignatures in parallel, each on a part of the "
+                        "wordlist",
+                        type=int, default=1)
+    parser.add_argument("--compact", help="keep word pairs and stems as "
+                        "indices into the wordlist in arrays, which uses "
+                        "much less memory for large wordlists",
+                        action="store_true")
+    parser.add_argument("--two-pass", help="count the uses of bisignatures "
+                        "and signatures first, and then only make the stems "
+                        "and signatures used at least minsig times; the word "
+                        "pairs are not all kept in memory",
+                        action="store_true")
+    parser.add_argument("--save-state", help="also save the analysis as "
+                        "lxa/<corpus>_state.pickle, to be updated by "
+                        "lxa5_incremental.py for added or removed words "
+                        "(--workers, --compact and --two-pass are ignored)",
+                        action="store_true")
+    parser.add_argument("--direction", help="find suffixes or prefixes; "
+                        "by default, prefixes for the languages known to be "
+                        "prefixal (e.g. swahili) and suffixes otherwise. "
+                        "With \"both\", the two analyses run in parallel "
+                        "and write <corpus>_suffix_... and "
+                        "<corpus>_prefix_... outputs",
+                        type=str, choices=sorted(DIRECTIONS) + ["both"],
+                        default=None)
+    parser.add_argument("--metrics", help="JSON file for the wall time, CPU "
+                        "time (with that of the --workers processes), peak "
+                        "memory (traced by tracemalloc, which slows down the "
+                        "run; peak RSS for the --workers processes) and "
+                        "output sizes of each stage",
+                        type=str, default=None)
     return parser
 
 # remove this function?
@@ -87,12 +145,9 @@ def create_wordlist(language, filename, datafolder,
     return wordlist, word_freq_dict
 
 
-def main(language=None, corpus=None, datafolder=None, filename=None,
-         MinimumStemLength=4, MaximumAffixLength=3, MinimumNumberofSigUses=5,
-         maxwordtokens=0, use_corpus=True):
-
-    print("\n*****************************************************\n"
-          "Running the lxa5.py program now...\n")
+def find_suffixes(language):
+    """Return True if suffixes (rather than prefixes) are to be found for
+    the language."""
 
     # -------------------------------------------------------------------------#
     #       decide suffixing or prefixing
@@ -112,6 +167,18 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
         FindSuffixesFlag = False  # prefixal
     else:
         FindSuffixesFlag = True  # suffixal
+    return FindSuffixesFlag
+
+
+def load_word_freq(language, corpus, datafolder, filename, maxwordtokens=0,
+                   use_corpus=True):
+    """Return (wordFreqDict, corpus_stem) from the wordlist, which is
+    made (or restored from the artifact cache) by ngrams.py first for a
+    corpus."""
+    if use_corpus:
+        ngrams.ensure_ngrams(language=language, corpus=corpus,
+                             datafolder=datafolder, filename=filename,
+                             maxwordtokens=maxwordtokens)
 
     wordlist_path, corpus_stem = get_wordlist_path_corpus_stem(language, corpus,
                                 datafolder, filename, maxwordtokens, use_corpus)
@@ -119,87 +186,95 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     print("wordlist file path:\n{}\n".format(wordlist_path))
 
     if not wordlist_path.exists():
-        if use_corpus:
-            if maxwordtokens:
-                warning = " ({} tokens)".format(maxwordtokens)
-            else:
-                warning = ""
-            print("\nWordlist for {}{} not found.\n"
-                  "ngrams.py is now run.\n".format(corpus, warning))
-            ngrams.main(language=language, corpus=corpus,
-                        datafolder=datafolder, filename=filename,
-                        maxwordtokens=maxwordtokens)
-        else:
-            sys.exit("\nThe specified wordlist ""\n"
-                     "is not found.".format(wordlist_path))
-
-    wordFreqDict = read_word_freq(wordlist_path)
-    wordlist = sorted(wordFreqDict.keys())
+        sys.exit("\nThe specified wordlist {}\n"
+                 "is not found.".format(wordlist_path))
+
+    return read_word_freq(wordlist_path), corpus_stem
 
+
+def make_outfolder(language, datafolder, filename, name="lxa"):
+    """Return the output folder "name" (created if needed), next to the
+    corpus file."""
     if filename:
-        outfolder = Path(Path(filename).parent, "lxa")
+        outfolder = Path(Path(filename).parent, name)
     else:
-        outfolder = Path(datafolder, language, 'lxa')
+        outfolder = Path(datafolder, language, name)
 
     if not outfolder.exists():
         outfolder.mkdir(parents=True)
-
-    # TODO -- filenames not yet used in main()
-    outfile_Signatures_name = str(outfolder) + corpus_stem + "_Signatures.txt"
-    outfile_SigTransforms_name = str(outfolder) + corpus_stem + "_SigTransforms.txt"
-    outfile_FSA_name = str(outfolder) + corpus_stem + "_FSA.txt"
-    outfile_FSA_graphics_name = str(outfolder) + corpus_stem + "_FSA_graphics.png"
-
-    # -------------------------------------------------------------------------#
-    #   create: BisigToTuple
-    #                  (key: tuple of bisig | value: set of (stem, word1, word2)
-    #           StemToWords (key: stem | value: set of words)
-    #           SigToStems  (key: tuple of sig | value: set of stems )
-    #           StemToSig   (key: str of stem  | value: tuple of sig )
-    #           WordToSigs  (key: str of word  | value: set of sigs )
-    #           AffixToSigs (key: str of affix | value: set of sigs )
-    # -------------------------------------------------------------------------#
-
-    BisigToTuple = MakeBiSignatures(wordlist, MinimumStemLength,
-                                    MaximumAffixLength, FindSuffixesFlag)
-    print("BisigToTuple ready", flush=True)
-
-    StemToWords = MakeStemToWords(BisigToTuple, MinimumNumberofSigUses)
-    print("StemToWords ready", flush=True)
-
-    SigToStems = MakeSigToStems(StemToWords, MaximumAffixLength,
-                                MinimumNumberofSigUses, FindSuffixesFlag)
-    print("SigToStems ready", flush=True)
-
-    StemToSig = MakeStemToSig(SigToStems)
-    print("StemToSig ready", flush=True)
-
-    WordToSigs = MakeWordToSigs(StemToWords, StemToSig)
-    print("WordToSigs ready", flush=True)
-
-    WordToSigtransforms = MakeWordToSigtransforms(WordToSigs)
-    print("WordToSigtransforms ready", flush=True)
-
-    AffixToSigs = MakeAffixToSigs(SigToStems)
-    print("AffixToSigs ready", flush=True)
-
-    # -------------------------------------------------------------------------#
-    #   generate graphs for several dicts
-    # -------------------------------------------------------------------------#
-    #    GenerateGraphFromDict(StemToWords, outfolder, 'StemToWords.gexf')
-    #    GenerateGraphFromDict(SigToStems, outfolder, 'SigToStems.gexf')
-    #    GenerateGraphFromDict(WordToSigs, outfolder, 'WordToSigs.gexf')
-    #    GenerateGraphFromDict(StemToSig, outfolder, 'StemToSig.gexf')
-    # -------------------------------------------------------------------------#
+    return outfolder
+
+
+def output_settings(MinimumStemLength=4, MaximumAffixLength=3,
+                    MinimumNumberofSigUses=5, direction="suffix"):
+    """Return the settings of main() which change its outputs, as written in
+    their settings file (see artifact_cache.py)."""
+    return dict(MinimumStemLength=MinimumStemLength,
+                MaximumAffixLength=MaximumAffixLength,
+                MinimumNumberofSigUses=MinimumNumberofSigUses,
+                direction=direction)
+
+
+def ensure_lxa5(language=None, corpus=None, datafolder=None, filename=None,
+                MinimumStemLength=4, MaximumAffixLength=3,
+                MinimumNumberofSigUses=5, maxwordtokens=0, use_corpus=True):
+    """Make sure that the outputs of main() for the wordlist and parameters
+    are there and up to date, at least WordToSigtransforms.json: they are
+    restored from the artifact cache if it has them for the same wordlist
+    contents and parameters, or adopted in it if main() made them on its
+    own with these parameters from the wordlist as it is, or else main() is
+    run and its outputs are cached (see artifact_cache.py). Return True if
+    main() was not run."""
+    if use_corpus:
+        ngrams.ensure_ngrams(language=language, corpus=corpus,
+                             datafolder=datafolder, filename=filename,
+                             maxwordtokens=maxwordtokens)
+    wordlist_path, corpus_stem = get_wordlist_path_corpus_stem(language,
+                        corpus, datafolder, filename, maxwordtokens, use_corpus)
+
+    outfolder = make_outfolder(language, datafolder, filename)
+    outputs = [find_file(Path(outfolder,
+                              corpus_stem + "_WordToSigtransforms.json"))]
+    direction = "suffix" if find_suffixes(language) else "prefix"
+
+    cache = ArtifactCache(cache_path(language, datafolder, filename),
+                          outfolder.parent)
+    return cached_run(cache, "lxa5", CACHE_VERSION,
+                      output_settings(MinimumStemLength, MaximumAffixLength,
+                                      MinimumNumberofSigUses, direction),
+                      [wordlist_path], [outfolder],
+                      lambda: main(language=language, corpus=corpus,
+                                   datafolder=datafolder, filename=filename,
+                                   MinimumStemLength=MinimumStemLength,
+                                   MaximumAffixLength=MaximumAffixLength,
+                                   MinimumNumberofSigUses=
+                                   MinimumNumberofSigUses,
+                                   maxwordtokens=maxwordtokens,
+                                   use_corpus=use_corpus, direction=direction),
+                      outputs, settings_path(outfolder, corpus_stem))
+
+
+def write_outputs(outfolder, corpus_stem, wordFreqDict, StemToWords,
+                  SigToStems, WordToSigs, WordToSigtransforms, AffixToSigs,
+                  compress=None, FindSuffixesFlag=True, metrics=None):
+    """Write the lxa outputs for corpus_stem in outfolder. Each write is a
+    stage of "metrics" (a StageMetrics) if it is given."""
+    if metrics is None:
+        metrics = StageMetrics()
 
     # -------------------------------------------------------------------------#
     #      output stem file
     # -------------------------------------------------------------------------#
 
-    stemfilename = Path(outfolder, '{}_StemToWords.txt'.format(corpus_stem))
-    OutputLargeDict(stemfilename, StemToWords, key=lambda x: len(x[1]),
-                    reverse=True,
-                    min_cell_width=25, howmanyperline=5)
+    # all outputs are compressed if "compress" is given
+
+    stemfilename = compressed_path(Path(outfolder,
+                        '{}_StemToWords.txt'.format(corpus_stem)), compress)
+    with output_stage(metrics, "OutputLargeDict", stemfilename,
+                      StemToWords=len(StemToWords)):
+        OutputLargeDict(stemfilename, StemToWords, key=lambda x: len(x[1]),
+                        reverse=True,
+                        min_cell_width=25, howmanyperline=5)
 
     print('===> stem file generated:', stemfilename, flush=True)
 
@@ -207,25 +282,33 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #      output affix file
     # -------------------------------------------------------------------------#
 
-    affixfilename = Path(outfolder, '{}_AffixToSigs.txt'.format(corpus_stem))
-    OutputLargeDict(affixfilename, AffixToSigs, min_cell_width=25,
-                    key=lambda x: len(x[1]), reverse=True,
-                    howmanyperline=5, SignatureValues=True)
+    affixfilename = compressed_path(Path(outfolder,
+                        '{}_AffixToSigs.txt'.format(corpus_stem)), compress)
+    with output_stage(metrics, "OutputLargeDict", affixfilename,
+                      AffixToSigs=len(AffixToSigs)):
+        OutputLargeDict(affixfilename, AffixToSigs, min_cell_width=25,
+                        key=lambda x: len(x[1]), reverse=True,
+                        howmanyperline=5, SignatureValues=True)
     print('===> affix file generated:', affixfilename, flush=True)
 
     # -------------------------------------------------------------------------#
     #   output SigToStems
     # -------------------------------------------------------------------------#
 
-    SigToStems_outfilename = Path(outfolder, corpus_stem + "_SigToStems.txt")
-    OutputLargeDict(SigToStems_outfilename, SigToStems, key=lambda x: len(x[1]),
-                    reverse=True,
-                    howmanyperline=5, SignatureKeys=True)
+    SigToStems_outfilename = compressed_path(Path(outfolder,
+                                corpus_stem + "_SigToStems.txt"), compress)
+    with output_stage(metrics, "OutputLargeDict", SigToStems_outfilename,
+                      SigToStems=len(SigToStems)):
+        OutputLargeDict(SigToStems_outfilename, SigToStems,
+                        key=lambda x: len(x[1]), reverse=True,
+                        howmanyperline=5, SignatureKeys=True)
 
     SigToStems_outfilename_json = changeFilenameSuffix(SigToStems_outfilename,
                                                        ".json")
-    json_pdump(SigToStems, SigToStems_outfilename_json.open("w"),
-               key=lambda x : len(x[1]), reverse=True)
+    with output_stage(metrics, "json_pdump", SigToStems_outfilename_json,
+                      SigToStems=len(SigToStems)):
+        with open_file(SigToStems_outfilename_json, "w") as f:
+            json_pdump(SigToStems, f, key=lambda x : len(x[1]), reverse=True)
 
     print('===> output file generated:', SigToStems_outfilename, flush=True)
     print('===> output file generated:', SigToStems_outfilename_json, flush=True)
@@ -234,15 +317,20 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #   output WordToSigs
     # -------------------------------------------------------------------------#
 
-    WordToSigs_outfilename = Path(outfolder, corpus_stem + "_WordToSigs.txt")
-    OutputLargeDict(WordToSigs_outfilename, WordToSigs, key=lambda x: len(x[1]),
-                    reverse=True,
-                    min_cell_width=25, SignatureValues=True)
+    WordToSigs_outfilename = compressed_path(Path(outfolder,
+                                corpus_stem + "_WordToSigs.txt"), compress)
+    with output_stage(metrics, "OutputLargeDict", WordToSigs_outfilename,
+                      WordToSigs=len(WordToSigs)):
+        OutputLargeDict(WordToSigs_outfilename, WordToSigs,
+                        key=lambda x: len(x[1]), reverse=True,
+                        min_cell_width=25, SignatureValues=True)
 
     WordToSigs_outfilename_json = changeFilenameSuffix(WordToSigs_outfilename,
                                                        ".json")
-    json_pdump(WordToSigs, WordToSigs_outfilename_json.open("w"),
-               key=lambda x : len(x[1]), reverse=True)
+    with output_stage(metrics, "json_pdump", WordToSigs_outfilename_json,
+                      WordToSigs=len(WordToSigs)):
+        with open_file(WordToSigs_outfilename_json, "w") as f:
+            json_pdump(WordToSigs, f, key=lambda x : len(x[1]), reverse=True)
 
     print('===> output file generated:', WordToSigs_outfilename, flush=True)
     print('===> output file generated:', WordToSigs_outfilename_json, flush=True)
@@ -251,19 +339,25 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #   output WordToSigtransforms
     # -------------------------------------------------------------------------#
 
-    WordToSigtransforms_outfilename = Path(outfolder,
-                                        corpus_stem + "_WordToSigtransforms.txt")
-    OutputLargeDict(WordToSigtransforms_outfilename, WordToSigtransforms,
-                    min_cell_width=25, sigtransforms=True,
-                    key=lambda x: len(x[1]), reverse=True)
+    WordToSigtransforms_outfilename = compressed_path(Path(outfolder,
+                        corpus_stem + "_WordToSigtransforms.txt"), compress)
+    with output_stage(metrics, "OutputLargeDict",
+                      WordToSigtransforms_outfilename,
+                      WordToSigtransforms=len(WordToSigtransforms)):
+        OutputLargeDict(WordToSigtransforms_outfilename, WordToSigtransforms,
+                        min_cell_width=25, sigtransforms=True,
+                        key=lambda x: len(x[1]), reverse=True)
     print('===> output file generated:',
           WordToSigtransforms_outfilename, flush=True)
 
     WordToSigtransforms_outfilename_json = changeFilenameSuffix(
                                   WordToSigtransforms_outfilename, ".json")
-    json_pdump(WordToSigtransforms,
-               WordToSigtransforms_outfilename_json.open("w"),
-               key=lambda x : len(x[1]), reverse=True)
+    with output_stage(metrics, "json_pdump",
+                      WordToSigtransforms_outfilename_json,
+                      WordToSigtransforms=len(WordToSigtransforms)):
+        with open_file(WordToSigtransforms_outfilename_json, "w") as f:
+            json_pdump(WordToSigtransforms, f,
+                       key=lambda x : len(x[1]), reverse=True)
     print('===> output file generated:',
           WordToSigtransforms_outfilename_json, flush=True)
 
@@ -271,19 +365,25 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #   output the most freq word types not in any induced paradigms {the, of..}
     # -------------------------------------------------------------------------#
 
-    wordFreqDict_sorted = sorted_alphabetized(wordFreqDict.items(),
-                                              key=lambda x: x[1], reverse=True)
+    with metrics.stage("sorted_alphabetized",
+                       cardinalities={"wordFreqDict": len(wordFreqDict)}):
+        wordFreqDict_sorted = sorted_alphabetized(wordFreqDict.items(),
+                                                  key=lambda x: x[1],
+                                                  reverse=True)
 
-    mostFreqWordsNotInSigs_outfilename = Path(outfolder,
+    mostFreqWordsNotInSigs_outfilename = compressed_path(Path(outfolder,
                                               corpus_stem +
-                                              "_mostFreqWordsNotInSigs.txt")
-
-    with mostFreqWordsNotInSigs_outfilename.open('w') as f:
-        for (word, freq) in wordFreqDict_sorted:
-            if word not in WordToSigs:
-                print(word, freq, file=f)
-            else:
-                break
+                                              "_mostFreqWordsNotInSigs.txt"),
+                                              compress)
+
+    with output_stage(metrics, "word list",
+                      mostFreqWordsNotInSigs_outfilename):
+        with open_file(mostFreqWordsNotInSigs_outfilename, 'w') as f:
+            for (word, freq) in wordFreqDict_sorted:
+                if word not in WordToSigs:
+                    print(word, freq, file=f)
+                else:
+                    break
 
     print('===> output file generated:',
           mostFreqWordsNotInSigs_outfilename, flush=True)
@@ -292,12 +392,15 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #   output the word types in induced paradigms
     # -------------------------------------------------------------------------#
 
-    WordsInSigs_outfilename = Path(outfolder, corpus_stem + "_WordsInSigs.txt")
+    WordsInSigs_outfilename = compressed_path(Path(outfolder,
+                                corpus_stem + "_WordsInSigs.txt"), compress)
 
-    with WordsInSigs_outfilename.open('w') as f:
-        for (word, freq) in wordFreqDict_sorted:
-            if word in WordToSigs:
-                print(word, freq, file=f)
+    with output_stage(metrics, "word list", WordsInSigs_outfilename,
+                      WordsInSigs=len(WordToSigs)):
+        with open_file(WordsInSigs_outfilename, 'w') as f:
+            for (word, freq) in wordFreqDict_sorted:
+                if word in WordToSigs:
+                    print(word, freq, file=f)
 
     print('===> output file generated:',
           WordsInSigs_outfilename, flush=True)
@@ -306,17 +409,275 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #   output the word types NOT in induced paradigms
     # -------------------------------------------------------------------------#
 
-    WordsNotInSigs_outfilename = Path(outfolder,
-                                      corpus_stem + "_WordsNotInSigs.txt")
+    WordsNotInSigs_outfilename = compressed_path(Path(outfolder,
+                                corpus_stem + "_WordsNotInSigs.txt"), compress)
 
-    with WordsNotInSigs_outfilename.open('w') as f:
-        for (word, freq) in wordFreqDict_sorted:
-            if word not in WordToSigs:
-                print(word, freq, file=f)
+    with output_stage(metrics, "word list", WordsNotInSigs_outfilename,
+                      WordsNotInSigs=len(wordFreqDict) - len(WordToSigs)):
+        with open_file(WordsNotInSigs_outfilename, 'w') as f:
+            for (word, freq) in wordFreqDict_sorted:
+                if word not in WordToSigs:
+                    print(word, freq, file=f)
 
     print('===> output file generated:',
           WordsNotInSigs_outfilename, flush=True)
 
+    # -------------------------------------------------------------------------#
+    #   output the binary index of WordToSigs, SigToStems and AffixToSigs
+    # -------------------------------------------------------------------------#
+
+    indexfolder = morphology_index_path(outfolder, corpus_stem)
+    with output_stage(metrics, "write_morphology_index", indexfolder,
+                      WordToSigs=len(WordToSigs), SigToStems=len(SigToStems),
+                      AffixToSigs=len(AffixToSigs)):
+        write_morphology_index(indexfolder, WordToSigs, SigToStems,
+                               AffixToSigs, FindSuffixesFlag,
+                               datasource=corpus_stem)
+
+    print('===> index generated:', indexfolder, flush=True)
+
+
+@contextmanager
+def output_stage(metrics, name, path, **cardinalities):
+    """metrics.stage() of writing the file or folder "path", with its size
+    in bytes."""
+    with metrics.stage(name, file=str(path),
+                       cardinalities=cardinalities) as record:
+        yield record
+    if metrics.enabled:
+        path = Path(path)
+        files = path.iterdir() if path.is_dir() else [path]
+        record["bytes"] = sum(f.stat().st_size for f in files)
+
+
+def main(language=None, corpus=None, datafolder=None, filename=None,
+         MinimumStemLength=4, MaximumAffixLength=3, MinimumNumberofSigUses=5,
+         maxwordtokens=0, use_corpus=True, compress=None,
+         bisig_engine="pairs", workers=1, compact=False, two_pass=False,
+         save_state=False, direction=None, metrics=None):
+
+    print("\n*****************************************************\n"
+          "Running the lxa5.py program now...\n")
+
+    if direction is None:
+        direction = "suffix" if find_suffixes(language) else "prefix"
+
+    # metrics is the name of the JSON file with the timing and memory of each
+    # stage (see StageMetrics in lxa5lib.py), if given
+    metrics = StageMetrics(metrics, dict(language=language, corpus=corpus,
+                           filename=filename, direction=direction,
+                           MinimumStemLength=MinimumStemLength,
+                           MaximumAffixLength=MaximumAffixLength,
+                           MinimumNumberofSigUses=MinimumNumberofSigUses,
+                           maxwordtokens=maxwordtokens, compress=compress,
+                           bisig_engine=bisig_engine, workers=workers,
+                           compact=compact, two_pass=two_pass,
+                           save_state=save_state))
+
+    with metrics.stage("load_word_freq") as record:
+        wordFreqDict, corpus_stem = load_word_freq(language, corpus,
+                                                   datafolder, filename,
+                                                   maxwordtokens, use_corpus)
+        record["cardinalities"] = {"wordFreqDict": len(wordFreqDict)}
+
+    outfolder = make_outfolder(language, datafolder, filename)
+    wordlist_path, _ = get_wordlist_path_corpus_stem(language, corpus,
+                                datafolder, filename, maxwordtokens, use_corpus)
+
+    # TODO -- filenames not yet used in main()
+    outfile_Signatures_name = str(outfolder) + corpus_stem + "_Signatures.txt"
+    outfile_SigTransforms_name = str(outfolder) + corpus_stem + "_SigTransforms.txt"
+    outfile_FSA_name = str(outfolder) + corpus_stem + "_FSA.txt"
+    outfile_FSA_graphics_name = str(outfolder) + corpus_stem + "_FSA_graphics.png"
+
+    analysis = dict(MinimumStemLength=MinimumStemLength,
+                    MaximumAffixLength=MaximumAffixLength,
+                    MinimumNumberofSigUses=MinimumNumberofSigUses,
+                    compress=compress, bisig_engine=bisig_engine,
+                    workers=workers, compact=compact, two_pass=two_pass,
+                    save_state=save_state)
+
+    if direction != "both":
+        settingsfile = settings_path(outfolder, corpus_stem)
+        remove_settings(settingsfile)
+        analyze(wordFreqDict, outfolder, corpus_stem,
+                DIRECTIONS[direction], metrics=metrics, **analysis)
+        write_settings(settingsfile, output_settings(MinimumStemLength,
+                       MaximumAffixLength, MinimumNumberofSigUses, direction),
+                       [wordlist_path])
+        metrics.save()
+        return
+
+    # the suffixal and prefixal analyses run in two processes, which get
+    # wordFreqDict from this one; their outputs are named
+    # <corpus>_suffix_... and <corpus>_prefix_..., and so are their metrics
+    # files (e.g. out_suffix.json for --metrics=out.json)
+    processes = list()
+    for name, FindSuffixesFlag in sorted(DIRECTIONS.items(), reverse=True):
+        remove_settings(settings_path(outfolder,
+                                      "{}_{}".format(corpus_stem, name)))
+        direction_metrics = copy.deepcopy(metrics)
+        if metrics.enabled:
+            metrics_path = Path(metrics.filename)
+            direction_metrics.filename = Path(metrics_path.parent,
+                "{}_{}{}".format(metrics_path.stem, name, metrics_path.suffix))
+        direction_metrics.info["direction"] = name
+        process = multiprocessing.Process(target=analyze,
+                      args=(wordFreqDict, outfolder,
+                            "{}_{}".format(corpus_stem, name),
+                            FindSuffixesFlag),
+                      kwargs=dict(analysis, metrics=direction_metrics),
+                      name=name)
+        process.start()
+        processes.append(process)
+
+    for process in processes:
+        process.join()
+
+    failed = [process.name for process in processes if process.exitcode]
+    if failed:
+        sys.exit("\nThe {} analysis failed.".format(" and ".join(failed)))
+
+    for name in DIRECTIONS:
+        write_settings(settings_path(outfolder,
+                                     "{}_{}".format(corpus_stem, name)),
+                       output_settings(MinimumStemLength, MaximumAffixLength,
+                                       MinimumNumberofSigUses, name),
+                       [wordlist_path])
+
+
+def analyze(wordFreqDict, outfolder, corpus_stem, FindSuffixesFlag=True,
+            MinimumStemLength=4, MaximumAffixLength=3,
+            MinimumNumberofSigUses=5, compress=None, bisig_engine="pairs",
+            workers=1, compact=False, two_pass=False, save_state=False,
+            metrics=None):
+    """Find the signatures of the words in wordFreqDict, with suffixes or
+    prefixes by FindSuffixesFlag, and write the outputs for corpus_stem in
+    outfolder. Each step is a stage of "metrics" (a StageMetrics), which is
+    saved at the end, if it is given."""
+    if metrics is None:
+        metrics = StageMetrics()
+
+    wordlist = sorted(wordFreqDict.keys())
+
+    # -------------------------------------------------------------------------#
+    #   create: BisigToTuple
+    #                  (key: tuple of bisig | value: set of (stem, word1, word2)
+    #           StemToWords (key: stem | value: set of words)
+    #           SigToStems  (key: tuple of sig | value: set of stems )
+    #           StemToSig   (key: str of stem  | value: tuple of sig )
+    #           WordToSigs  (key: str of word  | value: set of sigs )
+    #           AffixToSigs (key: str of affix | value: set of sigs )
+    # -------------------------------------------------------------------------#
+
+    if save_state:
+        # the same analysis, with what lxa5_incremental.py needs to update it
+        with metrics.stage("IncrementalMorphology") as record:
+            morphology = IncrementalMorphology.from_words(wordFreqDict,
+                                    MinimumStemLength, MaximumAffixLength,
+                                    MinimumNumberofSigUses, FindSuffixesFlag,
+                                    engine=bisig_engine)
+            record["cardinalities"] = signature_cardinalities(morphology)
+        statefilename = state_path(outfolder, corpus_stem)
+        with output_stage(metrics, "IncrementalMorphology.save",
+                          statefilename):
+            morphology.save(statefilename)
+        print('===> state file generated:', statefilename, flush=True)
+
+        write_outputs(outfolder, corpus_stem, morphology.wordFreqDict,
+                      morphology.StemToWords, morphology.SigToStems,
+                      morphology.WordToSigs, morphology.WordToSigtransforms,
+                      morphology.AffixToSigs, compress, FindSuffixesFlag,
+                      metrics)
+        metrics.save()
+        return
+
+    if two_pass and compact:
+        print("Warning: --compact is ignored with --two-pass.")
+
+    if two_pass:
+        # no BisigToTuple; see MakeStemToWordsTwoPass
+        with metrics.stage("MakeStemToWordsTwoPass") as record:
+            StemToWords = MakeStemToWordsTwoPass(wordlist, MinimumStemLength,
+                                                 MaximumAffixLength,
+                                                 MinimumNumberofSigUses,
+                                                 FindSuffixesFlag,
+                                                 engine=bisig_engine,
+                                                 workers=workers)
+            record["cardinalities"] = {"StemToWords": len(StemToWords)}
+        print("StemToWords ready", flush=True)
+    elif compact:
+        # BisigToTuple and StemToWords with words as indices into wordlist
+        with metrics.stage("MakeBisigTable") as record:
+            BisigToTuple = MakeBisigTable(wordlist, MinimumStemLength,
+                                          MaximumAffixLength, FindSuffixesFlag,
+                                          engine=bisig_engine, workers=workers)
+            record["cardinalities"] = {"bisigs": len(BisigToTuple.bisigs),
+                                       "word pairs": len(BisigToTuple)}
+        print("BisigToTuple ready", flush=True)
+
+        with metrics.stage("MakeStemWordTable") as record:
+            StemToWords = MakeStemWordTable(BisigToTuple,
+                                            MinimumNumberofSigUses)
+            record["cardinalities"] = {"StemToWords": len(StemToWords)}
+        del BisigToTuple
+        print("StemToWords ready", flush=True)
+    else:
+        with metrics.stage("MakeBiSignatures") as record:
+            BisigToTuple = MakeBiSignatures(wordlist, MinimumStemLength,
+                                            MaximumAffixLength,
+                                            FindSuffixesFlag,
+                                            engine=bisig_engine,
+                                            workers=workers)
+            record["cardinalities"] = {"bisigs": len(BisigToTuple),
+                                       "word pairs": sum(map(len,
+                                                   BisigToTuple.values()))}
+        print("BisigToTuple ready", flush=True)
+
+        with metrics.stage("MakeStemToWords") as record:
+            StemToWords = MakeStemToWords(BisigToTuple, MinimumNumberofSigUses)
+            record["cardinalities"] = {"StemToWords": len(StemToWords)}
+        print("StemToWords ready", flush=True)
+
+    # SigToStems, StemToSig, WordToSigs, WordToSigtransforms and AffixToSigs
+    # with one traversal of StemToWords
+    with metrics.stage("SignatureBuilder") as record:
+        signatures = SignatureBuilder(MaximumAffixLength,
+                                      MinimumNumberofSigUses,
+                                      FindSuffixesFlag, two_pass=two_pass)
+        signatures.build(StemToWords)
+        record["cardinalities"] = signature_cardinalities(signatures)
+
+    SigToStems = signatures.SigToStems
+    StemToSig = signatures.StemToSig
+    WordToSigs = signatures.WordToSigs
+    WordToSigtransforms = signatures.WordToSigtransforms
+    AffixToSigs = signatures.AffixToSigs
+    print("SigToStems, StemToSig, WordToSigs, WordToSigtransforms, "
+          "AffixToSigs ready", flush=True)
+
+    # -------------------------------------------------------------------------#
+    #   generate graphs for several dicts
+    # -------------------------------------------------------------------------#
+    #    GenerateGraphFromDict(StemToWords, outfolder, 'StemToWords.gexf')
+    #    GenerateGraphFromDict(SigToStems, outfolder, 'SigToStems.gexf')
+    #    GenerateGraphFromDict(WordToSigs, outfolder, 'WordToSigs.gexf')
+    #    GenerateGraphFromDict(StemToSig, outfolder, 'StemToSig.gexf')
+    # -------------------------------------------------------------------------#
+
+    write_outputs(outfolder, corpus_stem, wordFreqDict, StemToWords,
+                  SigToStems, WordToSigs, WordToSigtransforms, AffixToSigs,
+                  compress, FindSuffixesFlag, metrics)
+    metrics.save()
+
+
+def signature_cardinalities(signatures):
+    """Return the sizes of the dicts of signatures (a SignatureBuilder or
+    IncrementalMorphology)."""
+    return {name: len(getattr(signatures, name))
+            for name in ["SigToStems", "StemToSig", "WordToSigs",
+                         "WordToSigtransforms", "AffixToSigs"]}
+
 
 # -----------------------------------------------------------------------------#
 
@@ -589,6 +950,14 @@ if __name__ == "__main__":
     MaximumAffixLength = args.maxaffix
     MinimumNumberofSigUses = args.minsig
     maxwordtokens = args.maxwordtokens
+    compress = args.compress
+    bisig_engine = args.bisig_engine
+    workers = args.workers
+    compact = args.compact
+    two_pass = args.two_pass
+    save_state = args.save_state
+    direction = args.direction
+    metrics = args.metrics
 
     description="You are running {}.\n".format(__file__) + \
                 "This program computes morphological signatures.\n" + \
@@ -608,6 +977,9 @@ if __name__ == "__main__":
          MinimumStemLength=MinimumStemLength,
          MaximumAffixLength=MaximumAffixLength,
          MinimumNumberofSigUses=MinimumNumberofSigUses,
-         maxwordtokens=maxwordtokens, use_corpus=use_corpus)
+         maxwordtokens=maxwordtokens, use_corpus=use_corpus,
+         compress=compress, bisig_engine=bisig_engine, workers=workers,
+         compact=compact, two_pass=two_pass, save_state=save_state,
+         direction=direction, metrics=metrics)
 
 
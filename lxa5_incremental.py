@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Incremental update of the results of lxa5.py when words are added to or
+#    removed from the wordlist
+#
+#    IncrementalMorphology keeps, for each bucket of words with the same first
+#    MinimumStemLength letters (see StemBuckets in lxa5_module.py), the pairs
+#    of words found in the bucket and the stems made from them. When words
+#    are added or removed, only the pairs of their buckets are found again,
+#    and only the stems of these buckets and of the buckets with pairs of a
+#    bisignature which is now used more or less than MinimumNumberofSigUses
+#    times are made again. SigToStems, StemToSig, WordToSigs,
+#    WordToSigtransforms and AffixToSigs are updated in place, and have the
+#    same contents as from a full run of lxa5.py on the new wordlist.
+#
+#    Usage:
+#
+#        $ python3 lxa5.py --save-state ...
+#            (writes the state as lxa/xxx_state.pickle along with the outputs)
+#        $ python3 lxa5_incremental.py ../data/english/lxa/english-brown_state.pickle --add=newwords.txt --remove=oldwords.txt
+#            (updates the state and the outputs)
+#
+#------------------------------------------------------------------------------#
+
+import argparse
+from collections import Counter, defaultdict
+from pathlib import Path
+import pickle
+
+from lxa5_module import BisigTuples, StemSignature, WordSigtransforms
+from lxa5lib import read_word_freq, COMPRESSIONS
+from artifact_cache import settings_path, remove_settings
+
+STATE_SUFFIX = "_state.pickle"
+
+
+class IncrementalMorphology:
+    '''
+    The lxa5.py analysis of a wordlist, with what is needed to update it
+    when words are added or removed (see update()).
+    '''
+
+    def __init__(self, MinimumStemLength=4, MaximumAffixLength=3,
+                 MinimumNumberofSigUses=5, FindSuffixesFlag=True,
+                 engine="pairs"):
+        self.MinimumStemLength = MinimumStemLength
+        self.MaximumAffixLength = MaximumAffixLength
+        self.MinimumNumberofSigUses = MinimumNumberofSigUses
+        self.FindSuffixesFlag = FindSuffixesFlag
+        self.engine = engine
+
+        self.wordFreqDict = Counter()
+
+        # a bucket is named by the first MinimumStemLength letters of its
+        # words (read from right to left if FindSuffixesFlag is False)
+        self.BucketToWords = dict()
+        self.BucketToPairs = dict()  # list of (bisig, (stem, word1, word2))
+        self.BucketToStems = dict()
+        self.last_bucket = None  # not analyzed, as in StemBuckets
+
+        self.BisigCounts = Counter()
+        self.BisigToBuckets = dict()  # bisig: Counter of buckets
+
+        self.StemToWords = dict()
+        self.StemToCandidateSig = dict()  # signature of each stem
+        self.CandidateSigToStems = dict()  # all signatures, used or not
+
+        self.SigToStems = dict()
+        self.StemToSig = dict()
+        self.WordToSigs = dict()
+        self.WordToSigtransforms = dict()
+        self.AffixToSigs = defaultdict(set)
+
+    @classmethod
+    def from_words(cls, wordFreqDict, *args, **kwargs):
+        '''Return the analysis of the words in wordFreqDict.'''
+        morphology = cls(*args, **kwargs)
+        morphology.update(add=wordFreqDict)
+        return morphology
+
+    def save(self, path):
+        with open(str(path), "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(str(path), "rb") as f:
+            return pickle.load(f)
+
+    def bucket(self, word):
+        if not self.FindSuffixesFlag:
+            word = word[::-1]
+        return word[: self.MinimumStemLength]
+
+    def bisig_used(self, bisig):
+        return self.BisigCounts.get(bisig, 0) >= self.MinimumNumberofSigUses
+
+    # -------------------------------------------------------------------------#
+
+    def update(self, add=None, remove=()):
+        '''
+        Add the words of "add" (a dict of word: count; the counts of words
+        already in the wordlist are increased) and remove the words in
+        "remove", and update the analysis. Return the numbers of words
+        actually added to and removed from the wordlist.
+        '''
+        buckets = set()  # buckets with words added or removed
+        added = removed = 0
+
+        for word in remove:
+            if word not in self.wordFreqDict:
+                continue
+            removed += 1
+            del self.wordFreqDict[word]
+            bucket = self.bucket(word)
+            self.BucketToWords[bucket].discard(word)
+            if not self.BucketToWords[bucket]:
+                del self.BucketToWords[bucket]
+            buckets.add(bucket)
+
+        for word, count in (add or dict()).items():
+            if word not in self.wordFreqDict:
+                added += 1
+                bucket = self.bucket(word)
+                if not bucket in self.BucketToWords:
+                    self.BucketToWords[bucket] = set()
+                self.BucketToWords[bucket].add(word)
+                buckets.add(bucket)
+            self.wordFreqDict[word] += count
+
+        # the last bucket of the sorted wordlist is the one with the
+        # largest name
+        last_bucket = max(self.BucketToWords) if self.BucketToWords else None
+        if last_bucket != self.last_bucket:
+            buckets.update({self.last_bucket, last_bucket} - {None})
+            self.last_bucket = last_bucket
+
+        # bisig: whether it was used MinimumNumberofSigUses times before
+        BisigWasUsed = dict()
+        for bucket in buckets:
+            self._find_pairs(bucket, BisigWasUsed)
+
+        for bisig, wasused in BisigWasUsed.items():
+            if wasused != self.bisig_used(bisig):
+                buckets.update(self.BisigToBuckets.get(bisig, ()))
+
+        self._make_stems(buckets)
+        return added, removed
+
+    def _find_pairs(self, bucket, BisigWasUsed):
+        for bisig, chunk in self.BucketToPairs.pop(bucket, ()):
+            self._count_bisig(bisig, bucket, -1, BisigWasUsed)
+
+        words = self.BucketToWords.get(bucket, ())
+        if len(words) < 2 or bucket == self.last_bucket:
+            return
+
+        if self.FindSuffixesFlag:
+            sortedwords = sorted(words)
+        else:
+            sortedwords = sorted(word[::-1] for word in words)
+
+        pairs = list(BisigTuples([(0, sortedwords)], self.MinimumStemLength,
+                                 self.MaximumAffixLength,
+                                 self.FindSuffixesFlag, self.engine))
+        if pairs:
+            self.BucketToPairs[bucket] = pairs
+        for bisig, chunk in pairs:
+            self._count_bisig(bisig, bucket, 1, BisigWasUsed)
+
+    def _count_bisig(self, bisig, bucket, delta, BisigWasUsed):
+        if bisig not in BisigWasUsed:
+            BisigWasUsed[bisig] = self.bisig_used(bisig)
+
+        self.BisigCounts[bisig] += delta
+        if not self.BisigCounts[bisig]:
+            del self.BisigCounts[bisig]
+
+        if not bisig in self.BisigToBuckets:
+            self.BisigToBuckets[bisig] = Counter()
+        self.BisigToBuckets[bisig][bucket] += delta
+        if not self.BisigToBuckets[bisig][bucket]:
+            del self.BisigToBuckets[bisig][bucket]
+            if not self.BisigToBuckets[bisig]:
+                del self.BisigToBuckets[bisig]
+
+    # -------------------------------------------------------------------------#
+
+    def _make_stems(self, buckets):
+        # signature: whether it was in SigToStems before
+        SigWasUsed = dict()
+        NewSigToStems = dict()  # the stems added for each signature
+        words_changed = set()
+
+        for bucket in buckets:
+            for stem in self.BucketToStems.pop(bucket, ()):
+                words = self.StemToWords.pop(stem)
+                sig = self.StemToCandidateSig.pop(stem)
+                if sig not in SigWasUsed:
+                    SigWasUsed[sig] = sig in self.SigToStems
+                if sig in self.SigToStems:
+                    self._detach(stem, sig, words, words_changed)
+                self.CandidateSigToStems[sig].discard(stem)
+
+            StemToWord = dict()
+            for bisig, (stem, word1, word2) in self.BucketToPairs.get(bucket,
+                                                                      ()):
+                if not self.bisig_used(bisig):
+                    continue
+                if not stem in StemToWord:
+                    StemToWord[stem] = set()
+                StemToWord[stem].add(word1)
+                StemToWord[stem].add(word2)
+
+            if StemToWord:
+                self.BucketToStems[bucket] = list(StemToWord)
+
+            for stem, words in StemToWord.items():
+                words = sorted(words)
+                sig = StemSignature(stem, words, self.MaximumAffixLength,
+                                    self.FindSuffixesFlag)
+                if sig not in SigWasUsed:
+                    SigWasUsed[sig] = sig in self.SigToStems
+                self.StemToWords[stem] = words
+                self.StemToCandidateSig[stem] = sig
+                if not sig in self.CandidateSigToStems:
+                    self.CandidateSigToStems[sig] = set()
+                self.CandidateSigToStems[sig].add(stem)
+                if not sig in NewSigToStems:
+                    NewSigToStems[sig] = list()
+                NewSigToStems[sig].append(stem)
+
+        for sig, wasused in SigWasUsed.items():
+            stems = self.CandidateSigToStems.get(sig, set())
+            isused = len(stems) >= self.MinimumNumberofSigUses
+            newstems = NewSigToStems.get(sig, ())
+
+            if wasused and not isused:
+                # the stems removed above are already detached
+                for stem in stems.difference(newstems):
+                    self._detach(stem, sig, self.StemToWords[stem],
+                                 words_changed)
+                del self.SigToStems[sig]
+                for affix in sig:
+                    self.AffixToSigs[affix].discard(sig)
+                    if not self.AffixToSigs[affix]:
+                        del self.AffixToSigs[affix]
+            elif isused:
+                self.SigToStems[sig] = stems
+                if not wasused:
+                    newstems = stems
+                    for affix in sig:
+                        self.AffixToSigs[affix].add(sig)
+                for stem in newstems:
+                    self._attach(stem, sig, words_changed)
+
+            if not stems:
+                self.CandidateSigToStems.pop(sig, None)
+
+        for word in words_changed:
+            if word in self.WordToSigs:
+                self.WordToSigtransforms[word] = WordSigtransforms(
+                                                word, self.WordToSigs[word])
+            else:
+                self.WordToSigtransforms.pop(word, None)
+
+    def _attach(self, stem, sig, words_changed):
+        self.StemToSig[stem] = sig
+        for word in self.StemToWords[stem]:
+            if word not in self.WordToSigs:
+                self.WordToSigs[word] = list()
+            self.WordToSigs[word].append(sig)
+            words_changed.add(word)
+
+    def _detach(self, stem, sig, words, words_changed):
+        del self.StemToSig[stem]
+        for word in words:
+            self.WordToSigs[word].remove(sig)
+            if not self.WordToSigs[word]:
+                del self.WordToSigs[word]
+            words_changed.add(word)
+
+
+def state_path(outfolder, corpus_stem):
+    return Path(outfolder, corpus_stem + STATE_SUFFIX)
+
+
+def main(statefilename, add=None, remove=None, compress=None):
+    from lxa5 import write_outputs
+
+    statefilename = Path(statefilename)
+    outfolder = statefilename.parent
+    corpus_stem = statefilename.name[: -len(STATE_SUFFIX)]
+
+    morphology = IncrementalMorphology.load(statefilename)
+    print("state loaded:", statefilename, flush=True)
+
+    add = read_word_freq(add) if add else dict()
+    remove = list(read_word_freq(remove)) if remove else list()
+    added, removed = morphology.update(add=add, remove=remove)
+    print("{} words added, {} words removed; "
+          "{} signatures".format(added, removed, len(morphology.SigToStems)),
+          flush=True)
+
+    morphology.save(statefilename)
+    print("state saved:", statefilename, flush=True)
+
+    # the outputs are no longer those of lxa5.py for the wordlist file
+    remove_settings(settings_path(outfolder, corpus_stem))
+    write_outputs(outfolder, corpus_stem, morphology.wordFreqDict,
+                  morphology.StemToWords, morphology.SigToStems,
+                  morphology.WordToSigs, morphology.WordToSigtransforms,
+                  morphology.AffixToSigs, compress,
+                  morphology.FindSuffixesFlag)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Update the results of lxa5.py for words added to or "
+                    "removed from the wordlist.")
+    parser.add_argument("state", help="state file written by lxa5.py "
+                        "--save-state, e.g. "
+                        "../data/english/lxa/english-brown" + STATE_SUFFIX)
+    parser.add_argument("--add", help="wordlist file (one word per line, "
+                        "optionally with its count) of words to add",
+                        type=str, default=None)
+    parser.add_argument("--remove", help="wordlist file of words to remove",
+                        type=str, default=None)
+    parser.add_argument("--compress", help="compress the outputs (their "
+                        "names end in \".gz\" etc)",
+                        type=str, choices=sorted(COMPRESSIONS), default=None)
+    args = parser.parse_args()
+
+    main(args.state, add=args.add, remove=args.remove,
+         compress=args.compress)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Binary index of the results of lxa5.py, for lookups like "which
+#    signatures does word X belong to", "which stems are in signature Z" and
+#    "which signatures (and stems) take affix Y", without reading the .json
+#    outputs.
+#
+#    The index is a folder (lxa/<corpus>_morphindex/) of memory-mapped .npy
+#    arrays (see binarystore.py):
+#
+#    words, stems, affixes -- string tables, each sorted, so that the ID of
+#                             a string is found by binary search
+#    sig_affixes           -- affix IDs of each signature; the signatures
+#                             are sorted by their tuples of affixes
+#    word_sigs             -- signature IDs of each word, as in WordToSigs
+#    sig_stems             -- stem IDs of each signature
+#    affix_sigs            -- signature IDs of each affix
+#
+#    Each of the last four is a pair of arrays <name> and <name>_offsets
+#    (number of keys + 1 offsets): the values of key i are
+#    <name>[offsets[i]:offsets[i+1]].
+#
+#    Usage:
+#
+#        $ python3 lxa5_index.py ../data/english/lxa/english-brown_morphindex --word jumped
+#        $ python3 lxa5_index.py ../data/english/lxa/english-brown_morphindex --sig NULL-ed-ing-s
+#        $ python3 lxa5_index.py ../data/english/lxa/english-brown_morphindex --affix ing
+#
+#------------------------------------------------------------------------------#
+
+import argparse
+from bisect import bisect_left
+from pathlib import Path
+
+import numpy as np
+
+from binarystore import (save_arrays, load_array, save_info, load_info,
+                         save_string_table, StringTable)
+from lxa5lib import SEP_SIG
+
+
+def morphology_index_path(outfolder, corpus_stem):
+    return Path(outfolder, corpus_stem + "_morphindex")
+
+
+def _csr(keys, key_to_values):
+    """Return (values, offsets) of the lists of value IDs of "keys"."""
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(key_to_values[key]) for key in keys])
+    values = np.fromiter((value for key in keys
+                          for value in key_to_values[key]),
+                         dtype=np.int32, count=int(offsets[-1]))
+    return values, offsets
+
+
+def write_morphology_index(indexfolder, WordToSigs, SigToStems, AffixToSigs,
+                           FindSuffixesFlag=True, datasource=""):
+    """Write the index of the lxa5.py results in "indexfolder"."""
+    indexfolder = Path(indexfolder)
+
+    words = sorted(WordToSigs)
+    stems = sorted({stem for stems in SigToStems.values() for stem in stems})
+    affixes = sorted(AffixToSigs)
+    sigs = sorted(SigToStems)
+
+    stem_ids = {stem: i for i, stem in enumerate(stems)}
+    affix_ids = {affix: i for i, affix in enumerate(affixes)}
+    sig_ids = {sig: i for i, sig in enumerate(sigs)}
+
+    arrays = dict()
+    for name, keys, key_to_values in [
+            ("sig_affixes", sigs,
+             {sig: [affix_ids[affix] for affix in sig] for sig in sigs}),
+            ("word_sigs", words,
+             {word: [sig_ids[sig] for sig in WordToSigs[word]]
+              for word in words}),
+            ("sig_stems", sigs,
+             {sig: sorted(stem_ids[stem] for stem in SigToStems[sig])
+              for sig in sigs}),
+            ("affix_sigs", affixes,
+             {affix: sorted(sig_ids[sig] for sig in AffixToSigs[affix])
+              for affix in affixes})]:
+        arrays[name], arrays[name + "_offsets"] = _csr(keys, key_to_values)
+
+    for name, strings in [("words", words), ("stems", stems),
+                          ("affixes", affixes)]:
+        save_string_table(indexfolder, name, strings)
+    save_arrays(indexfolder, **arrays)
+    save_info(indexfolder, {"data source": str(datasource),
+                            "FindSuffixesFlag": FindSuffixesFlag,
+                            "words": len(words), "stems": len(stems),
+                            "affixes": len(affixes), "signatures": len(sigs)})
+
+
+class MorphologyIndex:
+    """Signatures, stems and affixes of an index written by
+    write_morphology_index(). Everything is memory-mapped, and a lookup
+    reads only O(log n) strings plus its results. Signatures are tuples of
+    affixes, as in SigToStems."""
+
+    def __init__(self, indexfolder):
+        self.folder = Path(indexfolder)
+        self.info = load_info(self.folder)
+        self.FindSuffixesFlag = self.info["FindSuffixesFlag"]
+
+        self.words = StringTable(self.folder, "words")
+        self.stems = StringTable(self.folder, "stems")
+        self.affixes = StringTable(self.folder, "affixes")
+        self._arrays = dict()
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = (load_array(self.folder, name),
+                                  load_array(self.folder, name + "_offsets"))
+        return self._arrays[name]
+
+    def _values(self, name, i):
+        values, offsets = self._array(name)
+        return values[offsets[i]:offsets[i + 1]].tolist()
+
+    def __len__(self):
+        """Number of signatures."""
+        return self.info["signatures"]
+
+    def sig(self, i):
+        """Return signature i as a tuple of affixes."""
+        return tuple(self.affixes[j] for j in self._values("sig_affixes", i))
+
+    def sig_id(self, sig):
+        """Return the ID of "sig" (a tuple of affixes, or a string with the
+        affixes separated by SEP_SIG), or None if it is not a signature."""
+        if isinstance(sig, str):
+            sig = tuple(sig.split(SEP_SIG))
+        sig = tuple(sig)
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.sig(mid) < sig:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self.sig(lo) == sig:
+            return lo
+        return None
+
+    def sig_to_stems(self):
+        """Return SigToStems (sig: set of stems) with all the signatures."""
+        sig_affixes, sig_affixes_offsets = self._array("sig_affixes")
+        sig_stems, sig_stems_offsets = self._array("sig_stems")
+        affixes = self.affixes.tolist()
+        stems = self.stems.tolist()
+        sig_affixes = sig_affixes.tolist()
+        sig_stems = sig_stems.tolist()
+        sig_affixes_offsets = sig_affixes_offsets.tolist()
+        sig_stems_offsets = sig_stems_offsets.tolist()
+
+        SigToStems = dict()
+        for i in range(len(self)):
+            sig = tuple(affixes[j] for j in sig_affixes[
+                        sig_affixes_offsets[i]:sig_affixes_offsets[i + 1]])
+            SigToStems[sig] = {stems[j] for j in sig_stems[
+                               sig_stems_offsets[i]:sig_stems_offsets[i + 1]]}
+        return SigToStems
+
+    def sigs_of_word(self, word):
+        """Return the list of signatures of "word", as in WordToSigs."""
+        i = _find(self.words, word)
+        if i is None:
+            return list()
+        return [self.sig(j) for j in self._values("word_sigs", i)]
+
+    def stems_of_sig(self, sig):
+        """Return the sorted list of stems of "sig"."""
+        i = self.sig_id(sig)
+        if i is None:
+            return list()
+        return [self.stems[j] for j in self._values("sig_stems", i)]
+
+    def sigs_of_affix(self, affix):
+        """Return the sorted list of signatures with "affix"."""
+        i = _find(self.affixes, affix)
+        if i is None:
+            return list()
+        return [self.sig(j) for j in self._values("affix_sigs", i)]
+
+    def stems_of_affix(self, affix):
+        """Return the sorted list of stems taking "affix", i.e. the stems of
+        the signatures with "affix"."""
+        i = _find(self.affixes, affix)
+        if i is None:
+            return list()
+        stem_ids = set()
+        for j in self._values("affix_sigs", i):
+            stem_ids.update(self._values("sig_stems", j))
+        return [self.stems[j] for j in sorted(stem_ids)]
+
+
+def _find(table, string):
+    """Return the position of "string" in the sorted StringTable "table",
+    or None if it is not there."""
+    i = bisect_left(table, string)
+    if i < len(table) and table[i] == string:
+        return i
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Look up signatures, stems and affixes in the binary "
+                    "morphology index written by lxa5.py.")
+    parser.add_argument("index", help="morphology index folder, e.g. "
+                        "../data/english/lxa/english-brown_morphindex")
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument("--word", help="print the signatures of a word",
+                       type=str, default=None)
+    query.add_argument("--sig", help="print the stems of a signature, with "
+                       "affixes separated by \"{}\" (e.g. NULL{}s)".format(
+                       SEP_SIG, SEP_SIG), type=str, default=None)
+    query.add_argument("--affix", help="print the signatures and stems "
+                       "with an affix", type=str, default=None)
+    parser.add_argument("--limit", help="maximum number of results printed",
+                        type=int, default=50)
+    args = parser.parse_args()
+
+    index = MorphologyIndex(args.index)
+
+    if args.word is not None:
+        sigs = index.sigs_of_word(args.word)
+        print("# signatures: {}".format(len(sigs)))
+        for sig in sigs[:args.limit]:
+            print(SEP_SIG.join(sig))
+    elif args.sig is not None:
+        stems = index.stems_of_sig(args.sig)
+        print("# stems: {}".format(len(stems)))
+        for stem in stems[:args.limit]:
+            print(stem)
+    else:
+        sigs = index.sigs_of_affix(args.affix)
+        print("# signatures: {}".format(len(sigs)))
+        for sig in sigs[:args.limit]:
+            print(SEP_SIG.join(sig))
+        stems = index.stems_of_affix(args.affix)
+        print("# stems: {}".format(len(stems)))
+        for stem in stems[:args.limit]:
+            print(stem)
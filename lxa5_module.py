@@ -1,6 +1,10 @@
+from array import array
 from collections import Counter, defaultdict
-from itertools import combinations
+from collections.abc import Mapping
+from itertools import combinations, groupby
 import math
+import multiprocessing
+from operator import itemgetter
 import os
 from pathlib import Path
 import time
@@ -1519,31 +1523,83 @@ def OutputStemFile(stemfilename: Path, StemToWord, wordFreqDict):
 
 # ----------------------------------------------------------------------------------------------------------------------------#
 def MakeBiSignatures(wordlist, MinimumStemLength, MaximumAffixLength,
-                     FindSuffixesFlag=True):
+                     FindSuffixesFlag=True, engine="pairs", workers=1):
     '''
     This function finds pairs of words which make a valid signature,
     and makes Dictionary whose key is the signature and 
     whose value is a tuple: stem, word1, word2.
+
+    "engine" is how the pairs in a bucket of words are found:
+    "pairs" compares all pairs of words (see BucketPairsByCombinations),
+    "splits" groups the stem/affix splits of the words by stem
+    (see BucketPairsBySplits). Both give the same BisigToTuple.
+
+    If workers > 1, the buckets are analyzed by a pool of "workers"
+    processes, with the same result.
     '''
     BisigToTuple = dict()
     nWords = len(wordlist)
 
+    SortWordlist(wordlist, FindSuffixesFlag)
+
+    buckets = StemBuckets(wordlist, MinimumStemLength, FindSuffixesFlag)
+
+    if workers <= 1:
+        for bisigtuple, chunk in BisigTuples(buckets, MinimumStemLength,
+                                             MaximumAffixLength,
+                                             FindSuffixesFlag, engine):
+            if not bisigtuple in BisigToTuple:
+                BisigToTuple[bisigtuple] = set()
+            BisigToTuple[bisigtuple].add(chunk)
+        return BisigToTuple
+
+    # the partial results are merged in the order of the batches, which
+    # gives the same BisigToTuple as above
+    for partial in MapBucketBatches(_bisig_tuples_of_batch, buckets, nWords,
+                                    workers, MinimumStemLength,
+                                    MaximumAffixLength, FindSuffixesFlag,
+                                    engine):
+        for bisigtuple, chunks in partial.items():
+            if not bisigtuple in BisigToTuple:
+                BisigToTuple[bisigtuple] = set()
+            BisigToTuple[bisigtuple].update(chunks)
+
+    return BisigToTuple
+
+
+def SortWordlist(wordlist, FindSuffixesFlag=True):
+    '''
+    Sort the wordlist in place for MakeBiSignatures and MakeBisigTable.
+    '''
     if not FindSuffixesFlag:  # then alphabetize the words from right to left
         wordlist.sort(key=lambda x: x[::-1])
     else:
         wordlist.sort()
 
-    print('nWords', nWords)
+    print('nWords', len(wordlist))
     print('FindSuffixesFlag', FindSuffixesFlag)
 
+
+def StemBuckets(wordlist, MinimumStemLength, FindSuffixesFlag=True,
+                include_last=False):
+    '''
+    Yield (start, bucket) for the lists ("buckets") of words in the sorted
+    wordlist whose first k letters are the same (k = MinimumStemLength),
+    with the words reversed if FindSuffixesFlag is False; "start" is the
+    index of the first word of the bucket in the wordlist. Only words in
+    the same bucket can share a stem. As a bucket is analyzed when the
+    next one starts, the last bucket of the wordlist is not yielded,
+    unless include_last is True.
+    '''
     # subwordlist stores words in wordlist whose first k letters
     #   are the same (k = MinimumStemLength)
     if FindSuffixesFlag:
         subwordlist = [wordlist[0]]
     else:
         subwordlist = [wordlist[0][::-1]]
+    start = 0
 
-    for n in range(1, nWords):
+    for n in range(1, len(wordlist)):
         word1 = wordlist[n - 1]
         word2 = wordlist[n]
 
@@ -1554,47 +1610,536 @@ def MakeBiSignatures(wordlist, MinimumStemLength, MaximumAffixLength,
         minimalstem = word1[: MinimumStemLength]
         if minimalstem == word2[: MinimumStemLength]:
             subwordlist.append(word2)
-            continue
         else:
-            wordlist_forAnalysisNow = list(subwordlist)
+            if len(subwordlist) > 1:
+                yield start, subwordlist
             subwordlist = [word2]
+            start = n
 
-        for (word1, word2) in combinations(wordlist_forAnalysisNow, 2):
+    if include_last and len(subwordlist) > 1:
+        yield start, subwordlist
 
-            stem = maximalcommonprefix(word1, word2)
-            stemlen = len(stem)
-            suffix1 = word1[stemlen:]
-            suffix2 = word2[stemlen:]
 
-            if len(suffix1) > MaximumAffixLength or \
-                            len(suffix2) > MaximumAffixLength:
-                continue
+def BucketPairsByCombinations(bucket, MinimumStemLength, MaximumAffixLength):
+    '''
+    Yield (i, j, stem length) for the pairs of words bucket[i], bucket[j]
+    (i < j) whose maximal common prefix ("stem") leaves affixes of at most
+    MaximumAffixLength letters. All pairs of words are compared.
+    '''
+    for (i, word1), (j, word2) in combinations(enumerate(bucket), 2):
+
+        stemlen = len(maximalcommonprefix(word1, word2))
+
+        if len(word1) - stemlen > MaximumAffixLength or \
+                        len(word2) - stemlen > MaximumAffixLength:
+            continue
 
-            if not FindSuffixesFlag:
-                word1 = word1[::-1]
-                word2 = word2[::-1]
-                stem = stem[::-1]
-                suffix1 = suffix1[::-1]
-                suffix2 = suffix2[::-1]
+        yield i, j, stemlen
 
-            if len(suffix1) == 0:
-                suffix1 = 'NULL'
-            if len(suffix2) == 0:
-                suffix2 = 'NULL'
 
-            bisig = list()  # stores two affixes
-            bisig.append(suffix1)
-            bisig.append(suffix2)
+def BucketPairsBySplits(bucket, MinimumStemLength, MaximumAffixLength):
+    '''
+    Yield the same (i, j, stem length) as BucketPairsByCombinations,
+    in the same order, from the stem/affix splits of the words instead of
+    all pairs of words.
+
+    A word has at most MaximumAffixLength + 1 splits with an affix short
+    enough. The splits are grouped by stem, and within a group, two words
+    have the stem as their maximal common prefix if their affixes begin
+    with different letters (or one affix is empty). As the bucket is
+    sorted, the words of a group with the same first affix letter are
+    next to each other.
+    '''
+    StemToSplits = defaultdict(list)  # stem: list of (first letter, index)
+
+    for i, word in enumerate(bucket):
+        wordlen = len(word)
+        for stemlen in range(max(MinimumStemLength,
+                                 wordlen - MaximumAffixLength), wordlen + 1):
+            StemToSplits[word[: stemlen]].append((word[stemlen: stemlen + 1],
+                                                  i))
+
+    pairs = list()  # (index of word1, index of word2, stem length)
+
+    for stem, splits in StemToSplits.items():
+        if len(splits) < 2:
+            continue
+        stemlen = len(stem)
+        runs = [[i for _, i in run]
+                for _, run in groupby(splits, key=itemgetter(0))]
+        for run1, run2 in combinations(runs, 2):
+            pairs.extend((i, j, stemlen) for i in run1 for j in run2)
+
+    pairs.sort()  # as the pairs come from combinations()
+    return pairs
+
+
+BISIG_ENGINES = {"pairs": BucketPairsByCombinations,
+                 "splits": BucketPairsBySplits}
+
+
+def Bisig(suffix1, suffix2):
+    '''
+    Return the bisignature of two affixes: the sorted tuple of the two,
+    with 'NULL' for an empty affix.
+    '''
+    if len(suffix1) == 0:
+        suffix1 = 'NULL'
+    if len(suffix2) == 0:
+        suffix2 = 'NULL'
+
+    bisig = list()  # stores two affixes
+    bisig.append(suffix1)
+    bisig.append(suffix2)
+
+    bisig.sort()
+    return tuple(bisig)
+
+
+def BisigTuple(stem, word1, word2, FindSuffixesFlag=True):
+    '''
+    Return (bisignature of the two words, (stem, word1, word2)), where the
+    words and stem are reversed if FindSuffixesFlag is False (and are
+    reversed back here).
+    '''
+    stemlen = len(stem)
+    suffix1 = word1[stemlen:]
+    suffix2 = word2[stemlen:]
+
+    if not FindSuffixesFlag:
+        word1 = word1[::-1]
+        word2 = word2[::-1]
+        stem = stem[::-1]
+        suffix1 = suffix1[::-1]
+        suffix2 = suffix2[::-1]
+
+    chunk = (stem, word1, word2)
+    return Bisig(suffix1, suffix2), chunk
+
+
+def BisigTuples(buckets, MinimumStemLength, MaximumAffixLength,
+                FindSuffixesFlag=True, engine="pairs"):
+    '''
+    Yield (bisignature, (stem, word1, word2)) for the pairs of words
+    in the buckets (see StemBuckets), in order.
+    '''
+    FindBucketPairs = BISIG_ENGINES[engine]
 
-            bisig.sort()
-            bisigtuple = tuple(bisig)
+    for start, bucket in buckets:
+        for i, j, stemlen in FindBucketPairs(bucket, MinimumStemLength,
+                                             MaximumAffixLength):
+            word1 = bucket[i]
+            yield BisigTuple(word1[: stemlen], word1, bucket[j],
+                             FindSuffixesFlag)
 
+
+BATCHES_PER_WORKER = 16
+
+
+def BatchBuckets(buckets, batchsize):
+    '''
+    Yield lists of consecutive buckets with about "batchsize" words each.
+    '''
+    batch = list()
+    nWords = 0
+    for start, bucket in buckets:
+        batch.append((start, bucket))
+        nWords += len(bucket)
+        if nWords >= batchsize:
+            yield batch
+            batch = list()
+            nWords = 0
+    if batch:
+        yield batch
+
+
+def MapBucketBatches(function, buckets, nWords, workers, *args):
+    '''
+    Yield function((batch, *args)) for batches of the buckets (of about
+    nWords / (BATCHES_PER_WORKER * workers) words each), in order,
+    computed by a pool of "workers" processes.
+    '''
+    batchsize = max(1, nWords // (workers * BATCHES_PER_WORKER))
+    tasks = ((batch, *args) for batch in BatchBuckets(buckets, batchsize))
+
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(function, tasks)
+
+
+def _bisig_tuples_of_batch(args):
+    '''
+    Return the part of BisigToTuple from a batch of buckets, with lists
+    instead of sets of (stem, word1, word2) in the order they are found.
+    '''
+    batch, MinimumStemLength, MaximumAffixLength, FindSuffixesFlag, \
+        engine = args
+    partial = dict()
+    for bisigtuple, chunk in BisigTuples(batch, MinimumStemLength,
+                                         MaximumAffixLength,
+                                         FindSuffixesFlag, engine):
+        if not bisigtuple in partial:
+            partial[bisigtuple] = list()
+        partial[bisigtuple].append(chunk)
+    return partial
+
+def MakeStemToWordsTwoPass(wordlist, MinimumStemLength, MaximumAffixLength,
+                           MinimumNumberofSigUses, FindSuffixesFlag=True,
+                           engine="pairs", workers=1):
+    '''
+    Same as MakeBiSignatures followed by MakeStemToWords, without
+    BisigToTuple: a first pass over the buckets of words only counts the
+    pairs of words of each bisignature, and a second pass adds to
+    StemToWords the pairs of the bisignatures with at least
+    MinimumNumberofSigUses pairs. The pairs of words are never all kept.
+    '''
+    SortWordlist(wordlist, FindSuffixesFlag)
+    nWords = len(wordlist)
+
+    def buckets():
+        return StemBuckets(wordlist, MinimumStemLength, FindSuffixesFlag)
+
+    args = (MinimumStemLength, MaximumAffixLength, FindSuffixesFlag, engine)
+
+    if workers <= 1:
+        BisigCounts = _bisig_counts_of_batch((buckets(), *args))
+    else:
+        BisigCounts = Counter()
+        for partial in MapBucketBatches(_bisig_counts_of_batch, buckets(),
+                                        nWords, workers, *args):
+            BisigCounts.update(partial)
+
+    bisigs = {bisig for bisig, count in BisigCounts.items()
+              if count >= MinimumNumberofSigUses}
+    print('bisignatures: {} of {} kept'.format(len(bisigs),
+                                               len(BisigCounts)))
+    del BisigCounts
+
+    if workers <= 1:
+        StemToWord = _stem_to_words_of_batch((buckets(), *args, bisigs))
+    else:
+        StemToWord = dict()
+        for partial in MapBucketBatches(_stem_to_words_of_batch, buckets(),
+                                        nWords, workers, *args, bisigs):
+            StemToWord.update(partial)
+
+    for stem in StemToWord:
+        thislist = list(StemToWord[stem])
+        thislist.sort()
+        StemToWord[stem] = thislist
+    return StemToWord
+
+
+def _bisig_counts_of_batch(args):
+    '''
+    Return the Counter of the bisignatures of the pairs of words in a batch
+    of buckets.
+    '''
+    batch, MinimumStemLength, MaximumAffixLength, FindSuffixesFlag, \
+        engine = args
+    return Counter(bisigtuple for bisigtuple, chunk in
+                   BisigTuples(batch, MinimumStemLength, MaximumAffixLength,
+                               FindSuffixesFlag, engine))
+
+
+def _stem_to_words_of_batch(args):
+    '''
+    Return the part of StemToWords (with sets of words) from the pairs of
+    words with one of the given bisignatures in a batch of buckets. As the
+    words of a stem are in one bucket, the parts from different batches
+    have no stems in common.
+    '''
+    batch, MinimumStemLength, MaximumAffixLength, FindSuffixesFlag, \
+        engine, bisigs = args
+    StemToWord = dict()
+    for bisigtuple, (stem, word1, word2) in BisigTuples(batch,
+                                                MinimumStemLength,
+                                                MaximumAffixLength,
+                                                FindSuffixesFlag, engine):
+        if bisigtuple not in bisigs:
+            continue
+        if not stem in StemToWord:
+            StemToWord[stem] = set()
+        StemToWord[stem].add(word1)
+        StemToWord[stem].add(word2)
+    return StemToWord
+
+
+# ----------------------------------------------------------------------------------------------------------------------------#
+#   compact versions of BisigToTuple and StemToWords, with words as indices
+#   into the wordlist sorted by SortWordlist, and stems as
+#   (word index, stem length)
+# ----------------------------------------------------------------------------------------------------------------------------#
+
+class BisigTable:
+    '''
+    Compact version of BisigToTuple: for each pair of words, the
+    bisignature ID, the indices of the two words in the sorted wordlist
+    and the stem length are kept in arrays, and the bisignatures in a list.
+    Strings are only made when asked for.
+    '''
+
+    def __init__(self, wordlist, FindSuffixesFlag=True):
+        self.wordlist = wordlist
+        self.FindSuffixesFlag = FindSuffixesFlag
+        self.bisigs = list()  # bisignature ID: bisignature
+        self.bisig_ids = dict()  # bisignature: bisignature ID
+        self.bisig = array('i')
+        self.word1 = array('i')
+        self.word2 = array('i')
+        self.stemlen = array('H')
+
+    def __len__(self):
+        return len(self.bisig)
+
+    def bisig_id(self, bisigtuple):
+        if bisigtuple not in self.bisig_ids:
+            self.bisig_ids[bisigtuple] = len(self.bisigs)
+            self.bisigs.append(bisigtuple)
+        return self.bisig_ids[bisigtuple]
+
+    def add_buckets(self, buckets, MinimumStemLength, MaximumAffixLength,
+                    engine="pairs"):
+        '''Add the pairs of words in the buckets (see StemBuckets).'''
+        FindBucketPairs = BISIG_ENGINES[engine]
+
+        for start, bucket in buckets:
+            for i, j, stemlen in FindBucketPairs(bucket, MinimumStemLength,
+                                                 MaximumAffixLength):
+                suffix1 = bucket[i][stemlen:]
+                suffix2 = bucket[j][stemlen:]
+                if not self.FindSuffixesFlag:
+                    suffix1 = suffix1[::-1]
+                    suffix2 = suffix2[::-1]
+                self.bisig.append(self.bisig_id(Bisig(suffix1, suffix2)))
+                self.word1.append(start + i)
+                self.word2.append(start + j)
+                self.stemlen.append(stemlen)
+
+    def extend(self, other):
+        '''Add the pairs of words of another BisigTable.'''
+        newids = [self.bisig_id(bisigtuple) for bisigtuple in other.bisigs]
+        self.bisig.extend(newids[bisig] for bisig in other.bisig)
+        self.word1.extend(other.word1)
+        self.word2.extend(other.word2)
+        self.stemlen.extend(other.stemlen)
+
+    def stem(self, word, stemlen):
+        '''Return the stem of "stemlen" letters of the word at index
+        "word" in the wordlist.'''
+        word = self.wordlist[word]
+        if self.FindSuffixesFlag:
+            return word[: stemlen]
+        else:
+            return word[len(word) - stemlen:]
+
+    def select(self, mask):
+        '''Return a BisigTable with the pairs of words where the boolean
+        array "mask" is True.'''
+        table = BisigTable(self.wordlist, self.FindSuffixesFlag)
+        table.bisigs = self.bisigs
+        table.bisig_ids = self.bisig_ids
+        for name in ["bisig", "word1", "word2", "stemlen"]:
+            column = getattr(self, name)
+            getattr(table, name).frombytes(
+                np.frombuffer(column, dtype=column.typecode)[mask].tobytes())
+        return table
+
+    def counts(self):
+        '''Return the array of the numbers of pairs by bisignature ID.'''
+        return np.bincount(np.frombuffer(self.bisig, dtype=np.int32),
+                           minlength=len(self.bisigs))
+
+    def to_dict(self):
+        '''Return BisigToTuple (see MakeBiSignatures).'''
+        BisigToTuple = dict()
+        for bisig, word1, word2, stemlen in zip(self.bisig, self.word1,
+                                                self.word2, self.stemlen):
+            bisigtuple = self.bisigs[bisig]
             if not bisigtuple in BisigToTuple:
                 BisigToTuple[bisigtuple] = set()
-            chunk = (stem, word1, word2)
-            BisigToTuple[bisigtuple].add(chunk)
+            BisigToTuple[bisigtuple].add((self.stem(word1, stemlen),
+                                          self.wordlist[word1],
+                                          self.wordlist[word2]))
+        return BisigToTuple
 
-    return BisigToTuple
+
+def MakeBisigTable(wordlist, MinimumStemLength, MaximumAffixLength,
+                   FindSuffixesFlag=True, engine="pairs", workers=1):
+    '''
+    Compact version of MakeBiSignatures, which returns a BisigTable.
+    '''
+    SortWordlist(wordlist, FindSuffixesFlag)
+    table = BisigTable(wordlist, FindSuffixesFlag)
+
+    buckets = StemBuckets(wordlist, MinimumStemLength, FindSuffixesFlag)
+
+    if workers <= 1:
+        table.add_buckets(buckets, MinimumStemLength, MaximumAffixLength,
+                          engine)
+        return table
+
+    for partial in MapBucketBatches(_bisig_table_of_batch, buckets,
+                                    len(wordlist), workers, MinimumStemLength,
+                                    MaximumAffixLength, FindSuffixesFlag,
+                                    engine):
+        table.extend(partial)
+
+    return table
+
+
+def _bisig_table_of_batch(args):
+    '''
+    Return the BisigTable (without the wordlist) of a batch of buckets.
+    '''
+    batch, MinimumStemLength, MaximumAffixLength, FindSuffixesFlag, \
+        engine = args
+    partial = BisigTable(None, FindSuffixesFlag)
+    partial.add_buckets(batch, MinimumStemLength, MaximumAffixLength, engine)
+    return partial
+
+
+class StemWordTable(Mapping):
+    '''
+    Compact version of StemToWords: a read-only dict-like object whose
+    keys are the stems and whose values are the sorted lists of words,
+    both made from the wordlist on access. The stems are in the order
+    of the sorted wordlist (alphabetical, from right to left if
+    FindSuffixesFlag is False).
+
+    stem_words   -- index of the first word in the wordlist with the stem
+    stem_lengths -- length of the stem
+    offsets      -- the words of stem k are words[offsets[k]:offsets[k+1]]
+    words        -- word indices in the wordlist
+    '''
+
+    def __init__(self, wordlist, FindSuffixesFlag, stem_words, stem_lengths,
+                 offsets, words):
+        self.wordlist = wordlist
+        self.FindSuffixesFlag = FindSuffixesFlag
+        self.stem_words = stem_words
+        self.stem_lengths = stem_lengths
+        self.offsets = offsets
+        self.words = words
+
+    def __len__(self):
+        return len(self.stem_words)
+
+    def stem(self, k):
+        word = self.wordlist[int(self.stem_words[k])]
+        stemlen = int(self.stem_lengths[k])
+        if self.FindSuffixesFlag:
+            return word[: stemlen]
+        else:
+            return word[len(word) - stemlen:]
+
+    def words_of(self, k):
+        wordlist = self.wordlist
+        return [wordlist[i] for i in
+                self.words[self.offsets[k]: self.offsets[k + 1]].tolist()]
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.stem(k)
+
+    def items(self):
+        '''Yield (stem, sorted list of words), in the order of the
+        stems.'''
+        for k in range(len(self)):
+            yield self.stem(k), self.words_of(k)
+
+    def __getitem__(self, stem):
+        # binary search, with the stems compared in the direction in which
+        # the wordlist is sorted
+        if not self.FindSuffixesFlag:
+            stem = stem[::-1]
+            sortkey = lambda k: self.stem(k)[::-1]
+        else:
+            sortkey = self.stem
+
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if sortkey(mid) < stem:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and sortkey(lo) == stem:
+            return self.words_of(lo)
+        raise KeyError(stem)
+
+
+def MakeStemWordTable(bisigtable, MinimumNumberofSigUses):
+    '''
+    Compact version of MakeStemToWords, from a BisigTable.
+    '''
+    wordlist = bisigtable.wordlist
+    nWords = len(wordlist)
+
+    bisig = np.frombuffer(bisigtable.bisig, dtype=np.int32)
+    keep = bisigtable.counts()[bisig] >= MinimumNumberofSigUses
+    word1 = np.frombuffer(bisigtable.word1, dtype=np.int32)[keep]
+    word2 = np.frombuffer(bisigtable.word2, dtype=np.int32)[keep]
+    stemlen = np.frombuffer(bisigtable.stemlen, dtype=np.uint16)[keep]
+
+    # common prefix length of each word with the previous one in the
+    # wordlist, in the direction in which the wordlist is sorted
+    if bisigtable.FindSuffixesFlag:
+        sortedwords = wordlist
+    else:
+        sortedwords = [word[::-1] for word in wordlist]
+    prefixlen = np.zeros(nWords, dtype=np.int32)
+    prefixlen[1:] = [len(maximalcommonprefix(sortedwords[n - 1],
+                                             sortedwords[n]))
+                     for n in range(1, nWords)]
+    del sortedwords
+
+    # a stem is identified by its length and the first word in the wordlist
+    # beginning with it
+    stemword = np.empty(len(word1), dtype=np.int32)
+    for length in np.unique(stemlen):
+        selected = stemlen == length
+        starts = np.where(prefixlen < length, np.arange(nWords, dtype=np.int32),
+                          0)
+        np.maximum.accumulate(starts, out=starts)
+        stemword[selected] = starts[word1[selected]]
+    del prefixlen, selected, starts
+
+    # sorted by these keys, the stems are in the order of the wordlist
+    maxstemlen = int(stemlen.max()) + 1 if len(stemlen) else 1
+    stemkeys, stems = np.unique(stemword.astype(np.int64) * maxstemlen +
+                                stemlen, return_inverse=True)
+    del stemword, stemlen
+
+    # the words of a stem are sorted alphabetically, by their ranks in the
+    # alphabetical order of the words
+    if bisigtable.FindSuffixesFlag:
+        wordorder = None
+    else:
+        wordorder = np.array(sorted(range(nWords), key=wordlist.__getitem__),
+                             dtype=np.int32)
+        rank = np.empty(nWords, dtype=np.int32)
+        rank[wordorder] = np.arange(nWords, dtype=np.int32)
+        word1 = rank[word1]
+        word2 = rank[word2]
+        del rank
+
+    # (stem, word) keys, sorted and without duplicates
+    stems *= nWords
+    keys = np.unique(np.concatenate([stems + word1, stems + word2]))
+    del stems, word1, word2
+
+    offsets = np.zeros(len(stemkeys) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // nWords, minlength=len(stemkeys)),
+              out=offsets[1:])
+    words = (keys % nWords).astype(np.int32)
+    del keys
+    if wordorder is not None:
+        words = wordorder[words]
+
+    return StemWordTable(wordlist, bisigtable.FindSuffixesFlag,
+                         (stemkeys // maxstemlen).astype(np.int32),
+                         (stemkeys % maxstemlen).astype(np.int32),
+                         offsets, words)
 
 # currently not used
 # ------------------------------------------------------------------------------#
@@ -1677,38 +2222,127 @@ def MakeWordToSigs(StemToWords, StemToSig):
 # ----------------------------------------------------------------------------------------------------------------------------#
 
 def MakeWordToSigtransforms(WordToSigs, FindSuffixesFlag=True):
+    WordToSigtransforms = dict()
+
+    for word in WordToSigs.keys():
+        WordToSigtransforms[word] = WordSigtransforms(word, WordToSigs[word],
+                                                      FindSuffixesFlag)
+
+    return WordToSigtransforms
+
+
+def WordSigtransforms(word, sigs, FindSuffixesFlag=True):
+    '''
+    Return the set of (sig, affix) for the signatures of a word, where affix
+    is the first affix of sig at the end (or beginning, if FindSuffixesFlag
+    is False) of the word.
+    '''
     if FindSuffixesFlag:
-        def check_affix(word, affix):
-            if affix == "NULL":
-                affix = ""
-            if word.endswith(affix):
-                return True
-            else:
-                return False
+        check_affix = word.endswith
     else:
-        def check_affix(word, affix):
-            if affix == "NULL":
-                affix = ""
-            if word.startswith(affix):
-                return True
-            else:
-                return False
+        check_affix = word.startswith
 
-    WordToSigtransforms = dict()
+    sigtransforms = set()
 
-    for word in WordToSigs.keys():
-        sigs = WordToSigs[word]
-        sigtransforms = set()
+    for sig in sigs:
+        for affix in sig:
+            if check_affix("" if affix == "NULL" else affix):
+                sigtransforms.add((sig, affix))
+                break
 
-        for sig in sigs:
-            for affix in sig:
-                if check_affix(word, affix):
-                    sigtransforms.add((sig, affix))
-                    break
+    return sigtransforms
+
+# ----------------------------------------------------------------------------------------------------------------------------#
 
-        WordToSigtransforms[word] = sigtransforms
+class SignatureBuilder:
+    '''
+    Builds SigToStems, StemToSig, WordToSigs, WordToSigtransforms and
+    AffixToSigs with one traversal of StemToWords and one of the stems
+    kept, with the same dicts as MakeSigToStems, MakeStemToSig,
+    MakeWordToSigs, MakeWordToSigtransforms (with suffixes, as lxa5.main
+    has it) and MakeAffixToSigs one after the other. Each signature is one
+    tuple shared by all the dicts, and so is each sigtransform.
+
+    If two_pass is True, the stems of each signature are counted first,
+    and only the stems of the signatures with at least
+    MinimumNumberofSigUses stems are kept.
+    '''
+
+    def __init__(self, MaximumAffixLength, MinimumNumberofSigUses,
+                 FindSuffixesFlag=True, two_pass=False):
+        self.MaximumAffixLength = MaximumAffixLength
+        self.MinimumNumberofSigUses = MinimumNumberofSigUses
+        self.FindSuffixesFlag = FindSuffixesFlag
+        self.two_pass = two_pass
+
+        self.SigToStems = dict()
+        self.StemToSig = dict()
+        self.WordToSigs = dict()
+        self.WordToSigtransforms = dict()
+        self.AffixToSigs = defaultdict(set)
+
+    def signatures(self, StemToWords):
+        '''Yield (stem, signature) for the stems of StemToWords.'''
+        for stem, words in StemToWords.items():
+            yield stem, StemSignature(stem, words, self.MaximumAffixLength,
+                                      self.FindSuffixesFlag)
+
+    def build(self, StemToWords):
+        if self.two_pass:
+            SigCounts = Counter(sig for stem, sig in
+                                self.signatures(StemToWords))
+        else:
+            SigCounts = None
+
+        # as the keys of a dict, the signatures are the first tuple made
+        # for each
+        _SigToStems = dict()
+
+        for stem, sig in self.signatures(StemToWords):
+            if SigCounts and SigCounts[sig] < self.MinimumNumberofSigUses:
+                continue
+            if not sig in _SigToStems:
+                _SigToStems[sig] = set()
+            _SigToStems[sig].add(stem)
+
+        del SigCounts
+
+        for sig, stems in _SigToStems.items():
+            if len(stems) >= self.MinimumNumberofSigUses:
+                self.SigToStems[sig] = stems
+                for affix in sig:
+                    self.AffixToSigs[affix].add(sig)
+
+        del _SigToStems
+
+        # the sigtransform (if any) of a word in a signature only depends
+        # on the signature and the end of the word
+        StemToSig = self.StemToSig
+        WordToSigs = self.WordToSigs
+        WordToSigtransforms = self.WordToSigtransforms
+
+        for sig, stems in self.SigToStems.items():
+            endlength = max(len(affix) for affix in sig)
+            EndToSigtransforms = dict()
+
+            for stem in stems:
+                StemToSig[stem] = sig
+
+                for word in StemToWords[stem]:
+                    sigs = WordToSigs.get(word)
+                    if sigs is None:
+                        sigs = WordToSigs[word] = list()
+                        WordToSigtransforms[word] = set()
+                    sigs.append(sig)
+
+                    end = word[-endlength:]
+                    if end not in EndToSigtransforms:
+                        EndToSigtransforms[end] = WordSigtransforms(word,
+                                                                    [sig])
+                    WordToSigtransforms[word].update(EndToSigtransforms[end])
+
+        return self
 
-    return WordToSigtransforms
 
 # ----------------------------------------------------------------------------------------------------------------------------#
 
@@ -1720,31 +2354,40 @@ def GetWordFromStemAffix(stem, affix):
 
 
 # ------------------------------------------------------------------------------#
+def StemSignature(stem, words, MaximumAffixLength, FindSuffixesFlag=True,
+                  NoAffixLengthRestriction=False):
+    '''
+    Return the signature (sorted tuple of affixes) of a stem with its words.
+    '''
+    affixset = set()
+    stemlength = len(stem)
+
+    for word in words:
+        if word == stem:
+            affixset.add("NULL")
+        else:
+            affixlength = len(word) - stemlength
+            if NoAffixLengthRestriction == False and \
+                            affixlength > MaximumAffixLength:
+                continue
+            if FindSuffixesFlag:
+                affix = word[stemlength:]
+            else:
+                affix = word[: affixlength]
+            affixset.add(affix)
+
+    affixlist = list(affixset)
+    affixlist.sort()
+    return tuple(affixlist)
+
+
 def MakeSigToStems(StemToWord, MaximumAffixLength, MinimumNumberofSigUses,
                    FindSuffixesFlag=True, NoAffixLengthRestriction=False):
     _SigToStems = dict()  # temporary version
 
-    for stem in StemToWord.keys():
-        affixset = set()
-        stemlength = len(stem)
-
-        for word in StemToWord[stem]:
-            if word == stem:
-                affixset.add("NULL")
-            else:
-                affixlength = len(word) - stemlength
-                if NoAffixLengthRestriction == False and \
-                                affixlength > MaximumAffixLength:
-                    continue
-                if FindSuffixesFlag:
-                    affix = word[stemlength:]
-                else:
-                    affix = word[: affixlength]
-                affixset.add(affix)
-
-        affixlist = list(affixset)
-        affixlist.sort()
-        affixTuple = tuple(affixlist)
+    for stem, words in StemToWord.items():
+        affixTuple = StemSignature(stem, words, MaximumAffixLength,
+                                   FindSuffixesFlag, NoAffixLengthRestriction)
 
         if not affixTuple in _SigToStems:
             _SigToStems[affixTuple] = set()
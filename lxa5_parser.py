@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Parser of (possibly unseen) words into stem + affix with the signatures
+#    learned by lxa5.py
+#
+#    The affixes of the signatures are in a trie, read from the end of a word
+#    for suffixes (from its start for prefixes), so that all the affixes a
+#    word may end (start) with are found in one walk of at most
+#    MaximumAffixLength letters. Each such affix gives an analysis of the word
+#    as stem + affix:
+#
+#    - if the stem is one of the stems of lxa5.py and its signature has the
+#      affix, the analysis is in that signature ("known" stem);
+#    - otherwise the analysis is in the most robust signature with the
+#      affix (see getrobustness in lxa5_module.py).
+#
+#    Analyses of known stems come first, by decreasing robustness of the
+#    signature, then the others likewise, but with the unknown stem + NULL
+#    analysis (the whole word as the stem) last: every word has it, and
+#    NULL is in most signatures, so that with the robustness of the most
+#    robust signature with NULL it would come before the real splits of
+#    unseen words (e.g. jumped+NULL before jump+ed).
+#
+#    The signatures are read from the binary index written by lxa5.py (see
+#    lxa5_index.py). Words are parsed in batches (parse_batch), in this
+#    process or by a local server (--serve): each line sent to the server is
+#    a batch of words separated by whitespace, and the reply is a line of
+#    JSON with the list of analyses of each word.
+#
+#    Usage:
+#
+#        $ python3 lxa5_parser.py ../data/english/lxa/english-brown_morphindex jumped walking
+#        $ python3 lxa5_parser.py ../data/english/lxa/english-brown_morphindex --file=newwords.txt
+#        $ python3 lxa5_parser.py ../data/english/lxa/english-brown_morphindex --serve=8765
+#
+#------------------------------------------------------------------------------#
+
+import argparse
+import json
+import socket
+import socketserver
+import sys
+
+from lxa5_module import getrobustness
+from lxa5_index import MorphologyIndex
+from lxa5lib import SEP_SIG
+
+NULL_AFFIX = "NULL"
+
+# end of an affix in a trie node
+_AFFIX = ""
+
+
+class MorphologicalParser:
+    """Parse words into stem + affix with the signatures SigToStems (sig:
+    stems) of lxa5.py. An analysis is a tuple
+    (stem, affix, sig, robustness, known), where "known" is True if the stem
+    is in SigToStems with a signature that has the affix."""
+
+    def __init__(self, SigToStems, FindSuffixesFlag=True):
+        self.FindSuffixesFlag = FindSuffixesFlag
+
+        self.StemToSig = dict()
+        self.SigRobustness = dict()
+        for sig, stems in SigToStems.items():
+            self.SigRobustness[sig] = getrobustness(sig, stems)
+            for stem in stems:
+                self.StemToSig[stem] = sig
+
+        # the most robust signature of each affix
+        self.AffixToBestSig = dict()
+        for sig in sorted(SigToStems, key=self.SigRobustness.get,
+                          reverse=True):
+            for affix in sig:
+                self.AffixToBestSig.setdefault(affix, sig)
+
+        # trie of the affixes (reversed for suffixes); _AFFIX marks the end
+        # of an affix
+        self.trie = dict()
+        for affix in self.AffixToBestSig:
+            if affix == NULL_AFFIX:
+                continue
+            node = self.trie
+            for letter in (affix[::-1] if FindSuffixesFlag else affix):
+                node = node.setdefault(letter, dict())
+            node[_AFFIX] = affix
+
+    @classmethod
+    def from_index(cls, indexfolder):
+        """Return the parser of the signatures in the morphology index
+        "indexfolder" (see lxa5_index.py)."""
+        index = MorphologyIndex(indexfolder)
+        return cls(index.sig_to_stems(), index.FindSuffixesFlag)
+
+    def affixes(self, word):
+        """Yield the affixes of the trie that "word" ends with (starts with
+        for prefixes), shortest first, and then NULL if it is an affix."""
+        node = self.trie
+        letters = reversed(word) if self.FindSuffixesFlag else word
+        for letter in letters:
+            node = node.get(letter)
+            if node is None:
+                break
+            if _AFFIX in node:
+                yield node[_AFFIX]
+        if NULL_AFFIX in self.AffixToBestSig:
+            yield NULL_AFFIX
+
+    def parse(self, word):
+        """Return the list of analyses of "word", best first (see the
+        top of this module)."""
+        analyses = list()
+        for affix in self.affixes(word):
+            if affix == NULL_AFFIX:
+                stem = word
+            elif self.FindSuffixesFlag:
+                stem = word[: -len(affix)]
+            else:
+                stem = word[len(affix):]
+            if not stem:
+                continue
+
+            sig = self.StemToSig.get(stem)
+            known = sig is not None and affix in sig
+            if not known:
+                sig = self.AffixToBestSig[affix]
+            analyses.append((stem, affix, sig, self.SigRobustness[sig],
+                             known))
+
+        # known stems first, and the unknown stem + NULL analysis last
+        analyses.sort(key=lambda analysis: (analysis[4],
+                                            analysis[4] or
+                                            analysis[1] != NULL_AFFIX,
+                                            analysis[3]),
+                      reverse=True)
+        return analyses
+
+    def parse_batch(self, words, top=None):
+        """Return the list of the analyses of each of "words" (at most "top"
+        of each if it is given). Each distinct word is parsed once."""
+        results = dict()
+        parse = self.parse
+        for word in words:
+            if word not in results:
+                results[word] = parse(word)[:top]
+        return [results[word] for word in words]
+
+
+def format_analysis(analysis, FindSuffixesFlag=True):
+    """Return analysis as "stem+affix" ("affix+stem" for prefixes), then
+    its signature and robustness, separated by tabs."""
+    stem, affix, sig, robustness, known = analysis
+    if FindSuffixesFlag:
+        split = stem + "+" + affix
+    else:
+        split = affix + "+" + stem
+    return "{}\t{}\t{}{}".format(split, SEP_SIG.join(sig), robustness,
+                                 "" if known else "\t(unknown stem)")
+
+
+#------------------------------------------------------------------------------#
+#    local server
+#------------------------------------------------------------------------------#
+
+class ParserRequestHandler(socketserver.StreamRequestHandler):
+    """Reply to each line of words with a line of JSON: the list of the
+    analyses of each word, each as [stem, affix, sig, robustness, known]."""
+
+    def handle(self):
+        parser = self.server.parser
+        top = self.server.top
+        for line in self.rfile:
+            words = line.decode("utf-8").split()
+            # each distinct word is encoded once
+            encoded = dict()
+            for word in words:
+                if word not in encoded:
+                    encoded[word] = json.dumps(parser.parse(word)[:top],
+                                               ensure_ascii=False)
+            reply = "[" + ",".join(encoded[word] for word in words) + "]"
+            self.wfile.write(reply.encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class ParserServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, parser, port, host="localhost", top=None):
+        super().__init__((host, port), ParserRequestHandler)
+        self.parser = parser
+        self.top = top
+
+
+class ParserClient:
+    """Client of a ParserServer. parse_batch() has the same results as
+    MorphologicalParser.parse_batch(), with lists instead of tuples."""
+
+    def __init__(self, port, host="localhost"):
+        self._socket = socket.create_connection((host, port))
+        self._file = self._socket.makefile("rwb")
+
+    def parse_batch(self, words):
+        for word in words:
+            if not word or any(letter.isspace() for letter in word):
+                raise ValueError("Word {!r} is empty or contains "
+                                 "whitespace".format(word))
+        self._file.write(" ".join(words).encode("utf-8") + b"\n")
+        self._file.flush()
+        return json.loads(self._file.readline().decode("utf-8"))
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Parse words into stem + affix with the signatures "
+                    "of the morphology index written by lxa5.py.")
+    parser.add_argument("index", help="morphology index folder, e.g. "
+                        "../data/english/lxa/english-brown_morphindex")
+    parser.add_argument("words", help="words to parse", nargs="*")
+    parser.add_argument("--file", help="file of words to parse, one or more "
+                        "per line (\"-\" for stdin)",
+                        type=str, default=None)
+    parser.add_argument("--top", help="maximum number of analyses of each "
+                        "word (zero means all)",
+                        type=int, default=0)
+    parser.add_argument("--serve", help="instead of parsing words, serve "
+                        "requests on this port of localhost",
+                        type=int, default=None)
+    args = parser.parse_args()
+
+    morphparser = MorphologicalParser.from_index(args.index)
+    top = args.top or None
+
+    if args.serve is not None:
+        with ParserServer(morphparser, args.serve, top=top) as server:
+            print("Serving on localhost port {}".format(args.serve),
+                  flush=True)
+            server.serve_forever()
+        sys.exit()
+
+    words = list(args.words)
+    if args.file == "-":
+        words += sys.stdin.read().split()
+    elif args.file:
+        with open(args.file, encoding="utf8") as f:
+            words += f.read().split()
+
+    for word, analyses in zip(words, morphparser.parse_batch(words, top)):
+        print(word)
+        for analysis in analyses:
+            print("\t" + format_analysis(analysis,
+                                         morphparser.FindSuffixesFlag))
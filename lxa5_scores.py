@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Scores of all the signatures of lxa5.py at once
+#
+#    SignatureArrays packs the signatures into arrays: the lengths (and
+#    corpus counts) of the stems of all the signatures one after the other,
+#    the lengths of their affixes likewise, and the offsets where the stems
+#    and affixes of each signature start. The scores of lxa5_module.py are
+#    then computed for every signature with NumPy reductions over these
+#    arrays instead of loops over stems and affixes:
+#
+#    robustness             -- getrobustness
+#    letter savings         -- FindSignature_LetterCountSavings
+#    phono information      -- findSignatureInformationContent, bits for the
+#    ordering information      letters and for their order (a stem or affix
+#                              of fewer than 2 letters has 0 bits of order,
+#                              where findSignatureInformationContent fails)
+#    average top stem count -- AverageCountOfTopStems (with stem counts)
+#
+#    Usage (ranked table of the signatures in the morphology index written
+#    by lxa5.py, with stem counts from the wordlist):
+#
+#        $ python3 lxa5_scores.py ../data/english/lxa/english-brown_morphindex --wordlist=../data/english/ngrams/english-brown_words.txt --sort=robustness
+#
+#------------------------------------------------------------------------------#
+
+import argparse
+
+import numpy as np
+
+from lxa5_index import MorphologyIndex
+from lxa5lib import SEP_SIG, read_word_freq
+
+BITS_PER_LETTER = 5
+TOP_STEMS = 5
+
+SCORES = ["stems", "affixes", "robustness", "letter savings",
+          "phono information", "ordering information",
+          "average top stem count"]
+
+
+def _offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+class SignatureArrays:
+    """The signatures of SigToStems (sig: stems) packed into arrays, with
+    the counts of the stems in StemCounts (stem: count) if it is given. The
+    stems of signature i are at stem_offsets[i]:stem_offsets[i+1] of
+    stem_lengths and stem_counts, and its affixes at
+    affix_offsets[i]:affix_offsets[i+1] of affix_lengths."""
+
+    def __init__(self, SigToStems, StemCounts=None):
+        self.sigs = list(SigToStems)
+
+        stems = [stem for sig in self.sigs for stem in SigToStems[sig]]
+        self.stem_offsets = _offsets([len(SigToStems[sig])
+                                      for sig in self.sigs])
+        self.stem_lengths = np.fromiter(map(len, stems), dtype=np.int64,
+                                        count=len(stems))
+        if StemCounts is None:
+            self.stem_counts = None
+        else:
+            self.stem_counts = np.fromiter((StemCounts.get(stem, 0)
+                                            for stem in stems),
+                                           dtype=np.float64, count=len(stems))
+
+        affixes = [affix for sig in self.sigs for affix in sig]
+        self.affix_offsets = _offsets([len(sig) for sig in self.sigs])
+        self.affix_lengths = np.fromiter(map(len, affixes), dtype=np.int64,
+                                         count=len(affixes))
+
+        # the signature of each stem and affix
+        self.stem_sigs = np.repeat(np.arange(len(self.sigs)),
+                                   np.diff(self.stem_offsets))
+        self.affix_sigs = np.repeat(np.arange(len(self.sigs)),
+                                    np.diff(self.affix_offsets))
+
+    def __len__(self):
+        return len(self.sigs)
+
+    def _sum(self, members, values):
+        """Return the sum of "values" of the stems or affixes of each
+        signature, where "members" is stem_sigs or affix_sigs."""
+        return np.bincount(members, weights=values, minlength=len(self))
+
+    def scores(self, bitsPerLetter=BITS_PER_LETTER, howmany=TOP_STEMS):
+        """Return the dict of each of SCORES (but "average top stem count"
+        only if there are stem counts): an array with the score of each
+        signature."""
+        nstems = np.diff(self.stem_offsets)
+        naffixes = np.diff(self.affix_offsets)
+        stemletters = self._sum(self.stem_sigs,
+                                self.stem_lengths).astype(np.int64)
+        affixletters = self._sum(self.affix_sigs,
+                                 self.affix_lengths).astype(np.int64)
+
+        scores = {"stems": nstems, "affixes": naffixes}
+
+        # getrobustness
+        scores["robustness"] = stemletters * (naffixes - 1) + \
+                               affixletters * (nstems - 1)
+
+        # FindSignature_LetterCountSavings, with a letter for the end of
+        # each stem and affix
+        scores["letter savings"] = (affixletters + naffixes) * (nstems - 1) + \
+                                   (stemletters + nstems) * (naffixes - 1)
+
+        # findSignatureInformationContent
+        scores["phono information"] = np.trunc(bitsPerLetter *
+                                               (stemletters + affixletters)
+                                               ).astype(np.int64)
+        ordering = self._sum(self.stem_sigs,
+                             _ordering_bits(self.stem_lengths)) + \
+                   self._sum(self.affix_sigs,
+                             _ordering_bits(self.affix_lengths))
+        scores["ordering information"] = np.trunc(ordering).astype(np.int64)
+
+        # AverageCountOfTopStems: the stems by signature and then by
+        # decreasing count, and the rank of each in its signature
+        if self.stem_counts is not None:
+            order = np.lexsort((-self.stem_counts, self.stem_sigs))
+            sigs = self.stem_sigs[order]
+            rank = np.arange(len(order)) - self.stem_offsets[sigs]
+            top = rank < howmany
+            scores["average top stem count"] = self._sum(sigs[top],
+                           self.stem_counts[order][top]) / \
+                           np.maximum(np.minimum(nstems, howmany), 1)
+        return scores
+
+    def ranked_table(self, key="robustness", minimum=None, top=None,
+                     bitsPerLetter=BITS_PER_LETTER, howmany=TOP_STEMS):
+        """Return the list of (sig, scores...) of the signatures, with the
+        scores in the order of SCORES, by decreasing "key" (one of SCORES).
+        Signatures with "key" less than "minimum" are left out, and only
+        the first "top" are returned if it is given."""
+        scores = self.scores(bitsPerLetter, howmany)
+        columns = [name for name in SCORES if name in scores]
+        values = scores[key]
+
+        order = np.argsort(-values, kind="stable")
+        if minimum is not None:
+            order = order[values[order] >= minimum]
+        order = order[:top]
+
+        rows = zip(*[scores[name][order].tolist() for name in columns])
+        return [(self.sigs[i],) + row for i, row in zip(order.tolist(), rows)]
+
+
+def _ordering_bits(lengths):
+    """log2 of the number of pairs of letters of each length, 0 for fewer
+    than 2 letters."""
+    pairs = lengths * (lengths - 1) / 2
+    return np.log2(pairs, out=np.zeros(len(pairs)), where=pairs > 0)
+
+
+def stem_counts_from_words(SigToStems, wordFreqDict, FindSuffixesFlag=True):
+    """Return StemCounts (stem: count) with the count of a stem as the sum
+    of the counts of its words, i.e. the stem with each affix of its
+    signature."""
+    StemCounts = dict()
+    for sig, stems in SigToStems.items():
+        affixes = ["" if affix == "NULL" else affix for affix in sig]
+        for stem in stems:
+            if FindSuffixesFlag:
+                words = [stem + affix for affix in affixes]
+            else:
+                words = [affix + stem for affix in affixes]
+            StemCounts[stem] = sum(wordFreqDict.get(word, 0)
+                                   for word in words)
+    return StemCounts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rank the signatures of the morphology index written by "
+                    "lxa5.py by their scores.")
+    parser.add_argument("index", help="morphology index folder, e.g. "
+                        "../data/english/lxa/english-brown_morphindex")
+    parser.add_argument("--wordlist", help="wordlist file (e.g. "
+                        "../data/english/ngrams/english-brown_words.txt) for "
+                        "the stem counts of the average top stem count",
+                        type=str, default=None)
+    parser.add_argument("--sort", help="score to rank the signatures by",
+                        type=str, choices=SCORES, default="robustness")
+    parser.add_argument("--minimum", help="leave out the signatures with "
+                        "a score (--sort) less than this",
+                        type=float, default=None)
+    parser.add_argument("--top", help="maximum number of signatures printed",
+                        type=int, default=50)
+    parser.add_argument("--bits", help="bits per letter for the information "
+                        "content", type=float, default=BITS_PER_LETTER)
+    args = parser.parse_args()
+
+    index = MorphologyIndex(args.index)
+    SigToStems = index.sig_to_stems()
+    if args.wordlist:
+        StemCounts = stem_counts_from_words(SigToStems,
+                                            read_word_freq(args.wordlist),
+                                            index.FindSuffixesFlag)
+    else:
+        StemCounts = None
+        if args.sort == "average top stem count":
+            parser.error("--wordlist is needed for the stem counts")
+
+    arrays = SignatureArrays(SigToStems, StemCounts)
+    table = arrays.ranked_table(args.sort, args.minimum, args.top or None,
+                                args.bits)
+
+    columns = [name for name in SCORES
+               if StemCounts is not None or name != "average top stem count"]
+    print("\t".join(["signature"] + columns))
+    for sig, *scores in table:
+        print("\t".join([SEP_SIG.join(sig)] +
+                        ["{:.1f}".format(score) if isinstance(score, float)
+                         else str(score) for score in scores]))
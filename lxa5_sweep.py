@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Parameter sweep for lxa5.py
+#
+#    lxa5.py is run for every combination of the given values of
+#    MinimumStemLength (--minstem), MaximumAffixLength (--maxaffix) and
+#    MinimumNumberofSigUses (--minsig). The wordlist is read once, and the
+#    pairs of words of MakeBiSignatures are found once, at the smallest
+#    MinimumStemLength and the largest MaximumAffixLength. The pairs for
+#    each combination are a subset of these: those with a stem of at least
+#    MinimumStemLength letters and affixes of at most MaximumAffixLength
+#    letters, not in the last bucket of words (see StemBuckets in
+#    lxa5_module.py). The outputs are the same as those of lxa5.py.
+#
+#    The combinations are run by a pool of processes (--workers). The
+#    outputs of each are in the folder
+#    [language]/lxa_sweep/minstem<...>_maxaffix<...>_minsig<...>/, and
+#    [language]/lxa_sweep/<corpus>_summary.txt has the numbers of
+#    bisignatures, stems, signatures and words in signatures, and the run
+#    time of each combination.
+#
+#    Usage:
+#
+#        $ python3 lxa5_sweep.py --minstem 3 4 5 --maxaffix 2 3 4 --minsig 5 10 --workers=4
+#
+#------------------------------------------------------------------------------#
+
+import argparse
+from itertools import product
+import multiprocessing
+import time
+from pathlib import Path
+
+import numpy as np
+
+from lxa5 import find_suffixes, load_word_freq, make_outfolder, write_outputs
+from lxa5_module import (SortWordlist, StemBuckets, BisigTable,
+                         MakeStemToWords, SignatureBuilder, BISIG_ENGINES)
+from lxa5lib import (get_language_corpus_datafolder,
+                     load_config_for_command_line_help,
+                     determine_use_corpus, COMPRESSIONS)
+
+SUMMARY_HEADER = ["minstem", "maxaffix", "minsig", "bisignatures", "stems",
+                  "signatures", "words_in_sigs", "seconds"]
+
+
+def makeArgParser(configfilename="config.json"):
+
+    language, \
+    corpus, \
+    datafolder, \
+    configtext = load_config_for_command_line_help(configfilename)
+
+    parser = argparse.ArgumentParser(
+        description="This program runs lxa5.py for combinations of its "
+                    "parameters.\n\n{}".format(configtext),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("--config", help="configuration filename",
+                        type=str, default=configfilename)
+
+    parser.add_argument("--language", help="Language name",
+                        type=str, default=None)
+    parser.add_argument("--corpus", help="Corpus file to use",
+                        type=str, default=None)
+    parser.add_argument("--datafolder", help="path of the data folder",
+                        type=str, default=None)
+
+    parser.add_argument("--minstem", help="values of the minimum stem length",
+                        type=int, nargs="+", default=[4])
+    parser.add_argument("--maxaffix", help="values of the maximum affix "
+                        "length",
+                        type=int, nargs="+", default=[3])
+    parser.add_argument("--minsig", help="values of the minimum number of "
+                        "signature use",
+                        type=int, nargs="+", default=[5])
+    parser.add_argument("--maxwordtokens", help="maximum number of word tokens;"
+                        " if this is zero, then the program counts "
+                        "all word tokens in the corpus",
+                        type=int, default=0)
+    parser.add_argument("--workers", help="number of processes running "
+                        "parameter combinations in parallel",
+                        type=int, default=1)
+    parser.add_argument("--bisig-engine", help="how word pairs for "
+                        "bisignatures are found (see lxa5.py)",
+                        type=str, choices=sorted(BISIG_ENGINES),
+                        default="splits")
+    parser.add_argument("--compress", help="compress the outputs (their "
+                        "names end in \".gz\" etc)",
+                        type=str, choices=sorted(COMPRESSIONS), default=None)
+    return parser
+
+
+def sweep_folder_name(MinimumStemLength, MaximumAffixLength,
+                      MinimumNumberofSigUses):
+    return "minstem{}_maxaffix{}_minsig{}".format(MinimumStemLength,
+                                                  MaximumAffixLength,
+                                                  MinimumNumberofSigUses)
+
+
+class CandidatePairs:
+    """The pairs of words of MakeBiSignatures at the smallest
+    MinimumStemLength and largest MaximumAffixLength, including the last
+    bucket of words, from which BisigToTuple for larger MinimumStemLength
+    and smaller MaximumAffixLength is selected."""
+
+    def __init__(self, wordlist, MinimumStemLength, MaximumAffixLength,
+                 FindSuffixesFlag=True, engine="splits"):
+        SortWordlist(wordlist, FindSuffixesFlag)
+        self.wordlist = wordlist
+        self.FindSuffixesFlag = FindSuffixesFlag
+        self.MinimumStemLength = MinimumStemLength
+        self.MaximumAffixLength = MaximumAffixLength
+
+        self.table = BisigTable(wordlist, FindSuffixesFlag)
+        self.table.add_buckets(StemBuckets(wordlist, MinimumStemLength,
+                                           FindSuffixesFlag,
+                                           include_last=True),
+                               MinimumStemLength, MaximumAffixLength, engine)
+        self.wordlengths = np.array([len(word) for word in wordlist],
+                                    dtype=np.int32)
+
+    def last_bucket_start(self, MinimumStemLength):
+        """Return the index of the first word of the last bucket of the
+        wordlist for MinimumStemLength."""
+        def bucket(n):
+            word = self.wordlist[n]
+            if not self.FindSuffixesFlag:
+                word = word[::-1]
+            return word[: MinimumStemLength]
+
+        n = len(self.wordlist) - 1
+        last = bucket(n)
+        while n > 0 and bucket(n - 1) == last:
+            n -= 1
+        return n
+
+    def BisigToTuple(self, MinimumStemLength, MaximumAffixLength):
+        """Return BisigToTuple as MakeBiSignatures would, in the same
+        order."""
+        if MinimumStemLength < self.MinimumStemLength or \
+                MaximumAffixLength > self.MaximumAffixLength:
+            raise ValueError("The parameters are looser than those of "
+                             "the candidate pairs")
+        table = self.table
+        word1 = np.frombuffer(table.word1, dtype=np.int32)
+        word2 = np.frombuffer(table.word2, dtype=np.int32)
+        stemlen = np.frombuffer(table.stemlen, dtype=np.uint16)
+
+        # both words of a pair are in the same bucket if their common
+        # prefix (the stem) has at least MinimumStemLength letters
+        mask = stemlen >= MinimumStemLength
+        mask &= self.wordlengths[word1] - stemlen <= MaximumAffixLength
+        mask &= self.wordlengths[word2] - stemlen <= MaximumAffixLength
+        mask &= word1 < self.last_bucket_start(MinimumStemLength)
+        return table.select(mask).to_dict()
+
+
+# shared by the processes running the parameter combinations
+_candidates = None
+_wordFreqDict = None
+
+
+def _init_worker(candidates, wordFreqDict):
+    global _candidates, _wordFreqDict
+    _candidates = candidates
+    _wordFreqDict = wordFreqDict
+
+
+def run_parameters(args):
+    """Run lxa5.py for one combination of parameters, and return its line
+    of the summary table."""
+    MinimumStemLength, MaximumAffixLength, MinimumNumberofSigUses, \
+        outfolder, corpus_stem, compress = args
+    starttime = time.time()
+
+    BisigToTuple = _candidates.BisigToTuple(MinimumStemLength,
+                                            MaximumAffixLength)
+    StemToWords = MakeStemToWords(BisigToTuple, MinimumNumberofSigUses)
+    nBisigs = sum(len(tuples) >= MinimumNumberofSigUses
+                  for tuples in BisigToTuple.values())
+    del BisigToTuple
+
+    signatures = SignatureBuilder(MaximumAffixLength, MinimumNumberofSigUses,
+                                  _candidates.FindSuffixesFlag)
+    signatures.build(StemToWords)
+
+    outfolder = Path(outfolder, sweep_folder_name(MinimumStemLength,
+                                                  MaximumAffixLength,
+                                                  MinimumNumberofSigUses))
+    outfolder.mkdir(parents=True, exist_ok=True)
+    write_outputs(outfolder, corpus_stem, _wordFreqDict, StemToWords,
+                  signatures.SigToStems, signatures.WordToSigs,
+                  signatures.WordToSigtransforms, signatures.AffixToSigs,
+                  compress, _candidates.FindSuffixesFlag)
+
+    return [MinimumStemLength, MaximumAffixLength, MinimumNumberofSigUses,
+            nBisigs, len(StemToWords), len(signatures.SigToStems),
+            len(signatures.WordToSigs),
+            "{:.2f}".format(time.time() - starttime)]
+
+
+def main(language=None, corpus=None, datafolder=None, filename=None,
+         minstem=(4,), maxaffix=(3,), minsig=(5,), maxwordtokens=0,
+         use_corpus=True, workers=1, bisig_engine="splits", compress=None):
+
+    print("\n*****************************************************\n"
+          "Running the lxa5_sweep.py program now...\n")
+
+    FindSuffixesFlag = find_suffixes(language)
+    wordFreqDict, corpus_stem = load_word_freq(language, corpus, datafolder,
+                                               filename, maxwordtokens,
+                                               use_corpus)
+    outfolder = make_outfolder(language, datafolder, filename, "lxa_sweep")
+
+    starttime = time.time()
+    candidates = CandidatePairs(sorted(wordFreqDict), min(minstem),
+                                max(maxaffix), FindSuffixesFlag, bisig_engine)
+    print("{} candidate pairs of words ready ({:.2f} seconds)".format(
+          len(candidates.table), time.time() - starttime), flush=True)
+
+    tasks = [(k, a, m, outfolder, corpus_stem, compress)
+             for k, a, m in product(sorted(set(minstem)),
+                                    sorted(set(maxaffix)),
+                                    sorted(set(minsig)))]
+
+    if workers <= 1:
+        _init_worker(candidates, wordFreqDict)
+        rows = list(map(run_parameters, tasks))
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(candidates, wordFreqDict)) as pool:
+            rows = pool.map(run_parameters, tasks)
+
+    summary_filename = Path(outfolder, corpus_stem + "_summary.txt")
+    with summary_filename.open("w") as f:
+        for row in [SUMMARY_HEADER] + rows:
+            print("\t".join(map(str, row)), file=f)
+            print("\t".join(map(str, row)))
+
+    print('===> output file generated:', summary_filename, flush=True)
+
+
+if __name__ == "__main__":
+
+    args = makeArgParser().parse_args()
+
+    description="You are running {}.\n".format(__file__) + \
+                "This program runs lxa5.py for combinations of its " \
+                "parameters.\n" + \
+                "minstem = {}\n".format(args.minstem) + \
+                "maxaffix = {}\n".format(args.maxaffix) + \
+                "minsig = {}\n".format(args.minsig) + \
+                "maxwordtokens = {} (zero means all word tokens)".format(
+                    args.maxwordtokens)
+
+    language, corpus, datafolder = get_language_corpus_datafolder(args.language,
+                                      args.corpus, args.datafolder, args.config,
+                                      description=description,
+                                      scriptname=__file__)
+
+    use_corpus = determine_use_corpus()
+
+    main(language=language, corpus=corpus, datafolder=datafolder,
+         minstem=args.minstem, maxaffix=args.maxaffix, minsig=args.minsig,
+         maxwordtokens=args.maxwordtokens, use_corpus=use_corpus,
+         workers=args.workers, bisig_engine=args.bisig_engine,
+         compress=args.compress)
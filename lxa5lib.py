@@ -1,13 +1,26 @@
 #!usr/bin/env python3
 
 from collections import Counter
+from contextlib import contextmanager
+import os
 import sys
 import json
+import time
+import tracemalloc
 from pathlib import Path
 from distutils.util import strtobool
 from collections import OrderedDict
 from pprint import pprint
-from itertools import (zip_longest, groupby)
+from itertools import zip_longest
+import heapq
+import gzip
+import bz2
+import lzma
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 #------------------------------------------------------------------------------#
 #    constants
@@ -16,6 +29,73 @@ from itertools import (zip_longest, groupby)
 SEP_SIG = "-"          # separator between affixes in a sig (NULL-s-ed-ing)
 SEP_SIGTRANSFORM = "." # separator between sig and affix (NULL-s-ed-ing.ed)
 
+# compressed files: file suffix (without ".") -> module, and magic numbers
+COMPRESSIONS = {"gz": gzip, "bz2": bz2, "xz": lzma}
+MAGIC_NUMBERS = [(b"\x1f\x8b", "gz"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz")]
+
+#------------------------------------------------------------------------------#
+#    reading and writing compressed files
+#------------------------------------------------------------------------------#
+
+def detect_compression(path: Path):
+    """Return the compression ("gz", "bz2", "xz") of the file "path" from
+    its suffix or else from its first bytes, or None if it is not
+    compressed (or does not exist)."""
+    suffix = Path(path).suffix[1:]
+    if suffix in COMPRESSIONS:
+        return suffix
+    try:
+        with Path(path).open("rb") as f:
+            head = f.read(6)
+    except OSError:
+        return None
+    for magic, compression in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_file(path: Path, mode="r", **kwargs):
+    """Open the text file "path" like Path.open(), with transparent
+    (streaming) decompression if it is compressed, or compression if its
+    suffix is ".gz", ".bz2" or ".xz" (mode "w" or "a")."""
+    if "r" in mode:
+        compression = detect_compression(path)
+    else:
+        compression = Path(path).suffix[1:]
+    if compression not in COMPRESSIONS:
+        return Path(path).open(mode, **kwargs)
+    mode = mode.replace("t", "") + "t"
+    return COMPRESSIONS[compression].open(str(path), mode, **kwargs)
+
+
+def compressed_path(path: Path, compression=None):
+    """Return "path" with the suffix of "compression" appended, if any."""
+    if not compression:
+        return Path(path)
+    return Path(str(path) + "." + compression)
+
+
+def file_stem(path: Path):
+    """Path(path).stem, after removing any compression suffix:
+    "corpus.txt.gz" -> "corpus"."""
+    path = Path(path)
+    if path.suffix[1:] in COMPRESSIONS:
+        path = Path(path.stem)
+    return path.stem
+
+
+def find_file(path: Path):
+    """Return "path" if it exists, or else its compressed version
+    (path + ".gz", ".bz2" or ".xz") if one exists, or else "path"."""
+    if Path(path).exists():
+        return Path(path)
+    for compression in COMPRESSIONS:
+        if compressed_path(path, compression).exists():
+            return compressed_path(path, compression)
+    return Path(path)
+
+
 #------------------------------------------------------------------------------#
 #    general functions used by various lxa5 components
 #------------------------------------------------------------------------------#
@@ -33,18 +113,18 @@ def get_wordlist_path_corpus_stem(language, corpus, datafolder, filename,
         # then "use_corpus" is also True and doesn't have to be checked
 
         corpus = Path(filename).name
-        corpus_stem = Path(corpus).stem + word_token_suffix
-        wordlist_path = Path(Path(filename).parent, "ngrams",
-                             corpus_stem + "_words.txt")
+        corpus_stem = file_stem(corpus) + word_token_suffix
+        wordlist_path = find_file(Path(Path(filename).parent, "ngrams",
+                                       corpus_stem + "_words.txt"))
     elif use_corpus:
         # "use_corpus" is True, but "filename" has no corpus filename
 
-        corpus_stem = Path(corpus).stem + word_token_suffix
-        wordlist_path = Path(datafolder, language, "ngrams",
-                             corpus_stem + "_words.txt")
+        corpus_stem = file_stem(corpus) + word_token_suffix
+        wordlist_path = find_file(Path(datafolder, language, "ngrams",
+                                       corpus_stem + "_words.txt"))
     else:
         # input parameters are for a wordlist, not for a corpus text file
-        corpus_stem = Path(corpus).stem
+        corpus_stem = file_stem(corpus)
         wordlist_path = Path(datafolder, language, corpus)
 
     return (wordlist_path, corpus_stem)
@@ -75,7 +155,7 @@ def read_word_freq(infilename: Path, casefold=True):
 
 # rename this function? (we *are* using this function, via "read_word_freq" above)
 def read_corpus_file(corpus_path: Path, casefold=True) -> Counter:
-    with corpus_path.open() as corpus_file:
+    with open_file(corpus_path) as corpus_file:
         lines = corpus_file.readlines()
     word_frequencies = Counter()
 
@@ -355,6 +435,24 @@ def json_pdump(inputdict, outfile,
               indent=indent, separators=separators)
 
 
+def json_pdump_items(items, outfile, ensure_ascii=False, indent=4):
+    """json pretty dump of (key, value) pairs, written one at a time and in
+    the given order; the output is the same as that of json_pdump() for an
+    OrderedDict of these pairs with asis=True"""
+    outfile.write("{")
+    linesep = "\n" + " " * indent
+    first = True
+    for k, v in items:
+        if not first:
+            outfile.write(",")
+        first = False
+        outfile.write(linesep + json.dumps(str(k), ensure_ascii=ensure_ascii)
+                      + ": " + json.dumps(str(v), ensure_ascii=ensure_ascii))
+    if not first:
+        outfile.write("\n")
+    outfile.write("}")
+
+
 def json_pload(infile):
     '''json pretty load'''
     outdict = json.load(infile)
@@ -384,6 +482,12 @@ def json_pload(infile):
 
 
 def changeFilenameSuffix(filename: Path, newsuffix):
+    # a compression suffix is kept: x.txt.gz -> x.json.gz
+    compression = filename.suffix[1:]
+    if compression in COMPRESSIONS:
+        return compressed_path(changeFilenameSuffix(Path(filename.parent,
+                                                         filename.stem),
+                                                    newsuffix), compression)
     return Path(filename.parent, filename.stem + newsuffix)
 
 
@@ -392,24 +496,142 @@ def stdout_list(header, *args):
     for x in args:
         print(x, flush=True)
 
+#------------------------------------------------------------------------------#
+#    timing and memory of the stages of a run
+#------------------------------------------------------------------------------#
+
+class StageMetrics:
+    """Wall time, CPU time and peak memory traced by tracemalloc of each
+    stage of a run, saved as JSON in "filename". A disabled StageMetrics
+    (filename None) records nothing and does not trace memory.
+
+    The CPU time includes that of the child processes which ended during
+    the stage (e.g. a pool of workers), also given on its own as
+    "children cpu seconds". tracemalloc only sees this process: for the
+    children, "children peak rss bytes" is the largest peak resident set
+    size of the child processes which ended so far in the run (where the
+    resource module is available).
+
+    Use as:
+
+        with metrics.stage("MakeStemToWords") as record:
+            StemToWords = ...
+            record["cardinalities"] = {"StemToWords": len(StemToWords)}
+    """
+
+    def __init__(self, filename=None, info=None):
+        self.filename = filename
+        self.info = dict(info or {})  # about the run, e.g. its parameters
+        self.stages = list()
+
+    @property
+    def enabled(self):
+        return self.filename is not None
+
+    @contextmanager
+    def stage(self, name, **info):
+        record = dict(stage=name, **info)
+        if not self.enabled:
+            yield record
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        childrencpu, childrenrss = _children_cpu(), _children_peak_rss()
+        yield record
+        record["wall seconds"] = round(time.perf_counter() - wall, 6)
+        childrencpu = _children_cpu() - childrencpu
+        record["cpu seconds"] = round(time.process_time() - cpu +
+                                      childrencpu, 6)
+        current, peak = tracemalloc.get_traced_memory()
+        record["peak traced bytes"] = peak
+        record["traced bytes after"] = current
+        if childrencpu or _children_peak_rss() != childrenrss:
+            record["children cpu seconds"] = round(childrencpu, 6)
+            if childrenrss is not None:
+                record["children peak rss bytes"] = _children_peak_rss()
+        self.stages.append(record)
+
+    def save(self):
+        if not self.enabled:
+            return
+        totals = {"wall seconds": round(sum(record["wall seconds"]
+                                            for record in self.stages), 6),
+                  "cpu seconds": round(sum(record["cpu seconds"]
+                                           for record in self.stages), 6),
+                  "peak traced bytes": max([record["peak traced bytes"]
+                                            for record in self.stages],
+                                           default=0)}
+        childrenrss = [record["children peak rss bytes"]
+                       for record in self.stages
+                       if "children peak rss bytes" in record]
+        if childrenrss:
+            totals["children peak rss bytes"] = max(childrenrss)
+        with Path(self.filename).open("w") as f:
+            json.dump({"run": self.info, "stages": self.stages,
+                       "total": totals}, f, ensure_ascii=False, indent=4)
+        print("===> metrics file generated:", self.filename, flush=True)
+
+
+def _children_cpu():
+    """CPU seconds of the child processes which ended (and were waited
+    for) so far."""
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def _children_peak_rss():
+    """Largest peak resident set size in bytes of the child processes which
+    ended so far, or None without the resource module (e.g. on Windows)."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # kilobytes, but bytes on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
 
 def sorted_alphabetized(input_object, key=lambda x: x, reverse=False,
-                        subkey=lambda x:x, subreverse=False):
+                        subkey=lambda x:x, subreverse=False,
+                        limit=None, min_count=None):
+    """Sort input_object by "key", and items with equal keys by "subkey".
+
+    If limit is given, return only the first "limit" items, found with
+    heapq instead of sorting everything. If min_count is given, only the
+    items whose key is at least min_count are sorted.
+    """
     if not input_object:
         print("Warning: object is empty. Sorting aborted.")
         return
 
-    new_sorted_list = list()
-    sorted_list = sorted(input_object, key=key, reverse=reverse)
-
-    for k, group in groupby(sorted_list, key=key): # groupby from itertools
+    if min_count is not None:
+        input_object = [x for x in input_object if key(x) >= min_count]
 
-        # must use "list(group)", cannot use just "group"!
-        sublist = sorted(list(group), key=subkey, reverse=subreverse)
+    # a single sort on a composite key; this is stable, as is sorting each
+    # group of equal keys, so ties on both keys keep their input order
+    if reverse == subreverse:
+        return _sorted_limit(input_object, lambda x: (key(x), subkey(x)),
+                             reverse, limit)
 
-        new_sorted_list.extend(sublist)
-
-    return new_sorted_list
+    input_object = list(input_object)
+    try:
+        return _sorted_limit(input_object, lambda x: (-key(x), subkey(x)),
+                             subreverse, limit)
+    except TypeError:
+        # keys which cannot be negated: two stable sorts, by subkey first
+        new_sorted_list = sorted(input_object, key=subkey, reverse=subreverse)
+        new_sorted_list.sort(key=key, reverse=reverse)
+        return new_sorted_list[:limit]
+
+
+def _sorted_limit(input_object, key, reverse, limit):
+    if limit is None:
+        return sorted(input_object, key=key, reverse=reverse)
+    elif reverse:
+        return heapq.nlargest(limit, input_object, key=key)
+    else:
+        return heapq.nsmallest(limit, input_object, key=key)
 
 
 # not yet used, still at experimental stage. J Lee, 2015/8/5
@@ -428,7 +650,7 @@ def OutputLargeDictOfKeyToCount(outfilename, inputdict,
 
     max_key_length = max([len(k) for k, v in inputdictSortedList])
 
-    with outfilename.open(open_parameter) as f:
+    with open_file(outfilename, open_parameter) as f:
         for k, v in inputdictSortedList:
             print("{} {}".format(k.ljust(max_key_length), v), file=f)
 
@@ -468,7 +690,7 @@ def OutputLargeDict(outfilename, inputdict,
 
     max_key_length = max([len(x) for x in input_keys])
 
-    with outfilename.open('w') as f:
+    with open_file(outfilename, 'w') as f:
         if summary:
             # print a summary (typically the list of keys with the size of the
             # corresponding value)
@@ -598,7 +820,7 @@ def OutputLargeDict2(outfilename, inputdict, SignatureFlag=True):
 
             these_lines.append(''.join(this_line))
 
-    with outfilename.open('w') as file:
+    with open_file(outfilename, 'w') as file:
         for this_line in these_lines:
             print(this_line, file=file)
 
@@ -27,12 +27,14 @@ from manifold_module import (GetMyWords, GetContextArray,
                              output_WordToSharedContextsOfNeighbors,
                              GetMyGraph, output_ImportantContextToWords)
 import ngrams
+from ngrams_module import load_ngram_store
 import lxa5
 
 from lxa5lib import (get_language_corpus_datafolder, json_pdump,
                      changeFilenameSuffix, stdout_list, json_pload,
                      load_config_for_command_line_help,
-                     SEP_SIG, SEP_SIGTRANSFORM)
+                     open_file, compressed_path, find_file, file_stem,
+                     COMPRESSIONS, SEP_SIG, SEP_SIGTRANSFORM)
 
 
 def makeArgParser(configfilename="config.json"):
@@ -75,6 +77,9 @@ def makeArgParser(configfilename="config.json"):
                         type=bool, default=False)
     parser.add_argument("--usesigtransforms", help="use signature transforms?",
                         type=bool, default=True)
+    parser.add_argument("--compress", help="compress the .txt and .json "
+                        "outputs (their names end in \".gz\" etc)",
+                        type=str, choices=sorted(COMPRESSIONS), default=None)
 
     return parser
 
@@ -82,18 +87,18 @@ def makeArgParser(configfilename="config.json"):
 def main(language=None, corpus=None, datafolder=None, filename=None,
          maxwordtypes=1000, nNeighbors=9, nEigenvectors=11, 
          create_WordToContexts=False, create_ContextToWords=False,
-         mincontexts=3, usesigtransforms=True):
+         mincontexts=3, usesigtransforms=True, compress=None):
 
     print("\n*****************************************************\n"
           "Running the manifold.py program now...\n")
 
     if filename:
-        corpusStem = Path(filename).stem
+        corpusStem = file_stem(filename)
         infolder = Path(Path(filename).parent, 'ngrams')
         outfolder = Path(Path(filename).parent, 'neighbors')
         outcontextsfolder = Path(Path(filename).parent, 'word_contexts')
     else:
-        corpusStem = Path(corpus).stem
+        corpusStem = file_stem(corpus)
         infolder = Path(datafolder, language, 'ngrams')
         outfolder = Path(datafolder, language, 'neighbors')
         outcontextsfolder = Path(datafolder, language, 'word_contexts')
@@ -104,38 +109,40 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     if not outcontextsfolder.exists():
         outcontextsfolder.mkdir(parents=True)
 
-    infileWordsname = Path(infolder, corpusStem + '_words.txt')
-    infileBigramsname = Path(infolder, corpusStem + '_bigrams.txt')
-    infileTrigramsname = Path(infolder, corpusStem + '_trigrams.txt')
+    # the n-gram files are made by ngrams.py (or restored from the artifact
+    # cache) for the current corpus
+    ngrams.ensure_ngrams(language=language, corpus=corpus,
+                         datafolder=datafolder, filename=filename,
+                         tables=("words", "bigrams", "trigrams"))
 
-    if (not infileWordsname.exists()) or \
-       (not infileBigramsname.exists()) or \
-       (not infileTrigramsname.exists()):
-        print("Error in locating n-gram data files.\n"
-              "The program now creates them.\n")
-        ngrams.main(language=language, corpus=corpus,
-                        datafolder=datafolder, filename=filename)
+    # the n-gram files may be compressed
+    infileWordsname = find_file(Path(infolder, corpusStem + '_words.txt'))
+    infileBigramsname = find_file(Path(infolder, corpusStem + '_bigrams.txt'))
+    infileTrigramsname = find_file(Path(infolder, corpusStem + '_trigrams.txt'))
 
     if usesigtransforms:
         if filename:
             infolderlxa = Path(Path(filename).parent, 'lxa')
         else:
             infolderlxa = Path(datafolder, language, 'lxa')
-        sigtransform_json_fname = Path(infolderlxa,
-                                        corpusStem + "_WordToSigtransforms.json")
-        try:
-            WordToSigtransforms = json_pload(sigtransform_json_fname.open())
-        except FileNotFoundError:
-            print("The file \"{}\" is not found.\n"
-                  "The program now creates it.\n".format(sigtransform_json_fname))
-            lxa5.main(language=language, corpus=corpus, datafolder=datafolder,
-                      filename=filename)
-            WordToSigtransforms = json_pload(sigtransform_json_fname.open())
+        # made by lxa5.py (or restored from the artifact cache) for the
+        # current wordlist
+        lxa5.ensure_lxa5(language=language, corpus=corpus,
+                         datafolder=datafolder, filename=filename)
+        sigtransform_json_fname = find_file(Path(infolderlxa,
+                                        corpusStem + "_WordToSigtransforms.json"))
+        WordToSigtransforms = json_pload(open_file(sigtransform_json_fname))
 
     # WordToSigtransforms just read into the program; to be used soon...
 
+    # binary n-gram store written by ngrams.py, if any; if it is present,
+    # words, bigrams and trigrams are read from it instead of the .txt files
+    ngramstore = load_ngram_store(infolder, corpusStem)
+    if ngramstore is not None:
+        print("Using binary n-gram store", ngramstore.folder, flush=True)
+
     print('Reading word list...', flush=True)
-    mywords = GetMyWords(infileWordsname, corpus)
+    mywords = GetMyWords(infileWordsname, corpus, ngramstore=ngramstore)
 
     print("Word file is", infileWordsname, flush=True)
     print("Number of neighbors to find for each word type: ", nNeighbors)
@@ -153,27 +160,32 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     corpusName = corpusStem + '_' + str(nWordsForAnalysis) + '_' + str(nNeighbors)
 
-    outfilenameNeighbors = Path(outfolder, corpusName + "_neighbors.txt")
+    # the .txt and .json outputs are compressed if "compress" is given;
+    # the .gexf file is not, as neighbors.py and Gephi read it
+    outfilenameNeighbors = compressed_path(Path(outfolder,
+                            corpusName + "_neighbors.txt"), compress)
 
-    outfilenameSharedcontexts = Path(outfolder, corpusName + \
-                                "_shared_contexts.txt")
+    outfilenameSharedcontexts = compressed_path(Path(outfolder, corpusName + \
+                                "_shared_contexts.txt"), compress)
 
     outfilenameNeighborGraph = Path(outfolder, corpusName + "_neighbors.gexf")
 
-    outfilenameImportantContextToWords = Path(outfolder, corpusName + \
-                                              "_ImportantContextToWords.txt")
+    outfilenameImportantContextToWords = compressed_path(Path(outfolder,
+                            corpusName + "_ImportantContextToWords.txt"),
+                            compress)
 
-    outWordToContexts_json = Path(outcontextsfolder, corpusName + \
-                                       "_WordToContexts.json")
+    outWordToContexts_json = compressed_path(Path(outcontextsfolder,
+                            corpusName + "_WordToContexts.json"), compress)
 
-    outContextToWords_json = Path(outcontextsfolder, corpusName + \
-                                       "_ContextToWords.json")
+    outContextToWords_json = compressed_path(Path(outcontextsfolder,
+                            corpusName + "_ContextToWords.json"), compress)
 
     print("Reading bigrams/trigrams and computing context array...", flush=True)
 
     context_array, contextdict, \
     WordToContexts, ContextToWords = GetContextArray(nWordsForAnalysis,
-        worddict, infileBigramsname, infileTrigramsname, mincontexts)
+        worddict, infileBigramsname, infileTrigramsname, mincontexts,
+        ngramstore=ngramstore)
 
     print("Computing shared context master matrix...", flush=True)
     CountOfSharedContexts = context_array.dot(context_array.T).todense()
@@ -219,7 +231,7 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     del closestNeighbors
 
-    with outfilenameNeighbors.open('w') as f:
+    with open_file(outfilenameNeighbors, 'w') as f:
         print("# language: {}\n# corpus: {}\n"
               "# Number of word types analyzed: {}\n"
               "# Number of neighbors: {}\n".format(language, corpus,
@@ -235,11 +247,14 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     # output manifold as json for d3 visualization
     manifold_json_data = json_graph.node_link_data(neighbor_graph)
-    outfilenameManifoldJson = Path(outfolder, corpusName + "_manifold.json")
-    json.dump(manifold_json_data, outfilenameManifoldJson.open("w"), indent=2)
+    outfilenameManifoldJson = compressed_path(Path(outfolder,
+                                corpusName + "_manifold.json"), compress)
+    with open_file(outfilenameManifoldJson, "w") as f:
+        json.dump(manifold_json_data, f, indent=2)
 
     WordToNeighbors_json = changeFilenameSuffix(outfilenameNeighbors, ".json")
-    json_pdump(WordToNeighbors_by_str, WordToNeighbors_json.open("w"), asis=True)
+    with open_file(WordToNeighbors_json, "w") as f:
+        json_pdump(WordToNeighbors_by_str, f, asis=True)
 
     print("Computing shared contexts among neighbors...", flush=True)
     WordToSharedContextsOfNeighbors, \
@@ -264,13 +279,15 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     if create_WordToContexts:
         outputfilelist.append(outWordToContexts_json)
-        json_pdump(WordToContexts, outWordToContexts_json.open("w"),
-                   key=lambda x : len(x[1]), reverse=True)
+        with open_file(outWordToContexts_json, "w") as f:
+            json_pdump(WordToContexts, f,
+                       key=lambda x : len(x[1]), reverse=True)
 
     if create_ContextToWords:
         outputfilelist.append(outContextToWords_json)
-        json_pdump(ContextToWords, outContextToWords_json.open("w"),
-                   key=lambda x : len(x[1]), reverse=True)
+        with open_file(outContextToWords_json, "w") as f:
+            json_pdump(ContextToWords, f,
+                       key=lambda x : len(x[1]), reverse=True)
 
     stdout_list("Output files:", *outputfilelist)
 
@@ -286,6 +303,7 @@ if __name__ == "__main__":
     create_ContextToWords = args.contexttowords
     mincontexts = args.mincontexts
     usesigtransforms = args.usesigtransforms
+    compress = args.compress
 
     description="You are running {}.\n".format(__file__) + \
                 "This program computes word neighbors.\n" + \
@@ -313,5 +331,5 @@ if __name__ == "__main__":
          create_WordToContexts=create_WordToContexts,
          create_ContextToWords=create_ContextToWords,
          mincontexts=mincontexts,
-         usesigtransforms=usesigtransforms)
+         usesigtransforms=usesigtransforms, compress=compress)
 
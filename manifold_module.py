@@ -18,7 +18,7 @@ import scipy.spatial
 import scipy.sparse
 import networkx as nx
 
-from lxa5lib import sorted_alphabetized
+from lxa5lib import sorted_alphabetized, open_file
 
 def Normalize(NumberOfWordsForAnalysis, CountOfSharedContexts):
     arr = np.ones((NumberOfWordsForAnalysis), dtype=np.int64)
@@ -38,10 +38,24 @@ def hasGooglePOSTag(line, corpus):
     else:
         return False
 
-def GetMyWords(infileWordsname, corpus, minWordFreq=1):
+def GetMyWords(infileWordsname, corpus, minWordFreq=1, ngramstore=None):
     mywords = dict()
 
-    with infileWordsname.open() as wordfile:
+    if ngramstore is not None:
+        # the vocabulary of a binary n-gram store is in the order of the
+        # words file
+        for word, wordFreq in zip(ngramstore.vocabulary.tolist(),
+                                  ngramstore.word_counts.tolist()):
+            # as the lines of the words file starting with "#" (comments)
+            if word.startswith('#') or hasGooglePOSTag(word, corpus):
+                continue
+            if wordFreq < minWordFreq:
+                break
+            mywords[word] = wordFreq
+
+        return OrderedDict(sorted(mywords.items(), key=lambda x:x[1], reverse=True))
+
+    with open_file(infileWordsname) as wordfile:
         for line in wordfile:
             line = line.replace('\n', '').replace('\r', '')
             if (not line) or line.startswith('#') or hasGooglePOSTag(line, corpus):
@@ -68,8 +82,40 @@ def GetMyGraph(WordToNeighbors_by_str, useWeights=None):
     return G
 
 
+def ngrams_from_file(infilename, n):
+    """Yield (tuple of n words, count) for each line of an n-gram file."""
+    with open_file(infilename) as ngramfile:
+        for line in ngramfile:
+            line = line.strip()
+            if (not line) or line.startswith('#'):
+                continue
+            line_components = line.split()
+            yield tuple(line_components[:n]), int(line_components[n])
+
+
+def ngrams_from_store(ngram_ids, ngram_counts, vocabulary, worddict,
+                      mincontexts):
+    """Yield (tuple of words, count) for the n-grams of a binary n-gram
+    store (see ngrams_module.NgramStore), in the same order as in the
+    n-gram file, skipping those which occur fewer than mincontexts times or
+    which contain no word in worddict (i.e., which would not be used)."""
+    in_worddict = np.array([word in worddict for word in vocabulary],
+                           dtype=bool)
+    keep = np.asarray(ngram_counts) >= mincontexts
+    if len(in_worddict):
+        keep &= in_worddict[np.asarray(ngram_ids)].any(axis=1)
+
+    for ids, count in zip(np.asarray(ngram_ids)[keep].tolist(),
+                          np.asarray(ngram_counts)[keep].tolist()):
+        yield tuple([vocabulary[i] for i in ids]), count
+
+
 def GetContextArray(nwords, worddict,
-                    infileBigramsname, infileTrigramsname, mincontexts):
+                    infileBigramsname, infileTrigramsname, mincontexts,
+                    ngramstore=None):
+    # If ngramstore (a binary n-gram store, see ngrams_module.NgramStore)
+    # is given, the n-grams are read from it instead of from the
+    # bigram and trigram files.
 
     # this is necessary so we can reference variables from inner functions
     class Namespace:
@@ -121,53 +167,44 @@ def GetContextArray(nwords, worddict,
         WordToContexts[word_no][context_no] += occurrence_count
         ContextToWords[context_no][word_no] += occurrence_count
 
-    with infileTrigramsname.open() as trigramfile:
-        for line in trigramfile:
-            line = line.strip()
-            if (not line) or line.startswith('#'):
-                continue
-            line_components = line.split()
-
-            word1 = line_components[0]
-            word2 = line_components[1]
-            word3 = line_components[2]
-            occurrence_count = int(line_components[3])
-
-            if occurrence_count < mincontexts:
-                continue
+    if ngramstore is not None:
+        vocabulary = ngramstore.vocabulary.tolist()
+        trigrams = ngrams_from_store(ngramstore.trigram_ids,
+                                     ngramstore.trigram_counts,
+                                     vocabulary, worddict, mincontexts)
+        bigrams = ngrams_from_store(ngramstore.bigram_ids,
+                                    ngramstore.bigram_counts,
+                                    vocabulary, worddict, mincontexts)
+    else:
+        trigrams = ngrams_from_file(infileTrigramsname, 3)
+        bigrams = ngrams_from_file(infileBigramsname, 2)
 
-            context1 = tuple(['_', word2, word3])
-            context2 = tuple([word1, '_', word3])
-            context3 = tuple([word1, word2, '_'])
+    for (word1, word2, word3), occurrence_count in trigrams:
+        if occurrence_count < mincontexts:
+            continue
 
-            if worddict.get(word1) is not None:
-                addword(word1, context1, occurrence_count)
-            if worddict.get(word2) is not None:
-                addword(word2, context2, occurrence_count)
-            if worddict.get(word3) is not None:
-                addword(word3, context3, occurrence_count)
+        context1 = tuple(['_', word2, word3])
+        context2 = tuple([word1, '_', word3])
+        context3 = tuple([word1, word2, '_'])
 
-    with infileBigramsname.open() as bigramfile:
-        for line in bigramfile:
-            line = line.strip()
-            if (not line) or line.startswith('#'):
-                continue
-            line_components = line.split()
-
-            word1 = line_components[0]
-            word2 = line_components[1]
-            occurrence_count = int(line_components[2])
+        if worddict.get(word1) is not None:
+            addword(word1, context1, occurrence_count)
+        if worddict.get(word2) is not None:
+            addword(word2, context2, occurrence_count)
+        if worddict.get(word3) is not None:
+            addword(word3, context3, occurrence_count)
 
-            if occurrence_count < mincontexts:
-                continue
+    for (word1, word2), occurrence_count in bigrams:
+        if occurrence_count < mincontexts:
+            continue
 
-            context1 = tuple(['_', word2])
-            context2 = tuple([word1, '_'])
+        context1 = tuple(['_', word2])
+        context2 = tuple([word1, '_'])
 
-            if worddict.get(word1) is not None:
-                addword(word1, context1, occurrence_count)
-            if worddict.get(word2) is not None:
-                addword(word2, context2, occurrence_count)
+        if worddict.get(word1) is not None:
+            addword(word1, context1, occurrence_count)
+        if worddict.get(word2) is not None:
+            addword(word2, context2, occurrence_count)
 
     # csr_matrix in scipy means compressed matrix
     return ( scipy.sparse.csr_matrix((vals,(rows,cols)),
@@ -271,7 +308,7 @@ def output_WordToSharedContextsOfNeighbors(outfilenameSharedcontexts,
     _worddict = {v:k for k,v in worddict.items()} # from index to word
     _contextdict = {v:k for k,v in contextdict.items()} # from index to context tuple
 
-    with outfilenameSharedcontexts.open("w") as f:
+    with open_file(outfilenameSharedcontexts, "w") as f:
         for word_idx in range(nWordsForAnalysis):
 
             ContextToNeighbors = WordToSharedContextsOfNeighbors[word_idx] # a dict
@@ -314,7 +351,7 @@ def output_ImportantContextToWords(outfilename, ImportantContextToWords,
 
     WordToCount_list = [WordToCount for _, WordToCount in ImportantContextToWords_sorted]
 
-    with outfilename.open("w") as f:
+    with open_file(outfilename, "w") as f:
         for context_str, WordToCount in zip(context_str_list, WordToCount_list):
             print("{} {}".format(context_str.ljust(max_key_length),
                                  len(WordToCount)), file=f)
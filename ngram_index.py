@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Lookup index over the binary n-gram store written by ngrams.py, for
+#    point queries like "count of (w1, w2, w3)" and wildcard queries like
+#    "all trigrams with middle word X", without loading the n-gram tables.
+#
+#    The index is saved in the store folder:
+#
+#    vocabulary_order.npy  -- word IDs sorted by word, for word -> ID lookup
+#                             by binary search
+#    <name>_order<p>.npy   -- for the bigrams or trigrams ("name") and each
+#                             word position p, the row numbers of the n-grams
+#                             sorted by their word ID at position p, then by
+#                             the word IDs at the other positions in order
+#    <name>_offsets<p>.npy -- (vocabulary size + 1) offsets into
+#                             <name>_order<p>: the n-grams with word ID i at
+#                             position p are those at
+#                             <name>_order<p>[offsets[i]:offsets[i+1]]
+#
+#    The orders are built by radix sort, one stable counting sort per word
+#    position, on memory-mapped arrays read and written CHUNK_SIZE rows at a
+#    time, so that only a chunk and arrays the size of the vocabulary are in
+#    memory.
+#
+#    Usage (with "*" as a wildcard, see --wildcard):
+#
+#        $ python3 ngram_index.py ../data/english/ngrams/english-brown_ngramstore the "*" of
+#
+#------------------------------------------------------------------------------#
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from binarystore import save_arrays, load_array
+from ngrams_module import NgramStore, CHUNK_SIZE
+
+# wildcard of the command line; it is None in find()
+WILDCARD = "*"
+
+NGRAM_NAMES = {2: "bigram", 3: "trigram"}
+
+
+def write_ngram_index(storefolder, chunksize=CHUNK_SIZE):
+    """Build the lookup index of the n-gram store in "storefolder"."""
+    storefolder = Path(storefolder)
+    store = NgramStore(storefolder)
+    vocabulary = store.vocabulary.tolist()
+    nwords = len(vocabulary)
+
+    arrays = {"vocabulary_order": np.array(sorted(range(nwords),
+                                                  key=vocabulary.__getitem__),
+                                           dtype=np.int64)}
+    del vocabulary
+
+    for n, name in NGRAM_NAMES.items():
+        ids = getattr(store, name + "_ids")
+        for p in range(n):
+            offsets = np.zeros(nwords + 1, dtype=np.int64)
+            for start in range(0, len(ids), chunksize):
+                offsets[1:] += np.bincount(ids[start:start + chunksize, p],
+                                           minlength=nwords)
+            np.cumsum(offsets, out=offsets)
+            arrays["{}_offsets{}".format(name, p)] = offsets
+
+            # least significant position first, position p last
+            columns = [q for q in range(n) if q != p][::-1] + [p]
+            _radix_sort(ids, columns, nwords,
+                        Path(storefolder, "{}_order{}.npy".format(name, p)),
+                        chunksize)
+
+    save_arrays(storefolder, **arrays)
+
+
+def _radix_sort(ids, columns, nwords, outpath, chunksize=CHUNK_SIZE):
+    """Write to "outpath" (a .npy file) the row numbers of "ids" sorted by
+    its "columns", the most significant last, with one stable counting sort
+    per column. The row numbers go back and forth between two memory-mapped
+    arrays, read and written "chunksize" rows at a time."""
+    temppaths = [Path(str(outpath) + ".tmp{}.npy".format(i)) for i in (0, 1)]
+    orders = [np.lib.format.open_memmap(str(path), mode="w+", dtype=np.int64,
+                                        shape=(len(ids),))
+              for path in temppaths]
+
+    source = None # the row numbers in order of ids at first
+    for i, column in enumerate(columns):
+        target = orders[i % 2]
+
+        # start of each word ID in the target, moving forward as the rows
+        # with the word ID are placed
+        cursor = np.zeros(nwords, dtype=np.int64)
+        for start in range(0, len(ids), chunksize):
+            cursor[1:] += np.bincount(ids[start:start + chunksize, column],
+                                      minlength=nwords)[:-1]
+        np.cumsum(cursor, out=cursor)
+
+        for start in range(0, len(ids), chunksize):
+            if source is None:
+                rows = np.arange(start, min(start + chunksize, len(ids)))
+            else:
+                rows = np.asarray(source[start:start + chunksize])
+            keys = np.asarray(ids[rows, column], dtype=np.int64)
+            chunkorder = np.argsort(keys, kind="stable")
+            keys = keys[chunkorder]
+            # rank of each row among the rows of the chunk with its word ID
+            ranks = np.arange(len(keys)) - np.searchsorted(keys, keys)
+            target[cursor[keys] + ranks] = rows[chunkorder]
+            cursor += np.bincount(keys, minlength=nwords)
+        target.flush()
+        source = target
+
+    del orders, source, target
+    last = temppaths[(len(columns) - 1) % 2]
+    last.replace(outpath)
+    for path in temppaths:
+        if path.exists():
+            path.unlink()
+
+
+class NgramIndex:
+    """Word, bigram and trigram counts of an n-gram store, looked up with
+    its index (see write_ngram_index()). Everything is memory-mapped, and a
+    query reads only O(log n) entries of the n-gram tables plus the
+    matching n-grams."""
+
+    def __init__(self, storefolder):
+        self.store = NgramStore(storefolder)
+        self.folder = self.store.folder
+        self._vocabulary_order = load_array(self.folder, "vocabulary_order")
+
+    def word_id(self, word):
+        """Return the ID of "word", or None if it is not in the vocabulary."""
+        vocabulary = self.store.vocabulary
+        order = self._vocabulary_order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if vocabulary[int(order[mid])] < word:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and vocabulary[int(order[lo])] == word:
+            return int(order[lo])
+        return None
+
+    def count(self, *words):
+        """Return the count of the word, bigram or trigram "words"."""
+        matches = self.find(*words)
+        return matches[0][1] if matches else 0
+
+    def find(self, *pattern):
+        """Return the list of (tuple of words, count) of the words, bigrams
+        or trigrams matching "pattern", where None stands for any word, by
+        decreasing count and then in the order of the n-gram files."""
+        n = len(pattern)
+        word_ids = [None if word is None else self.word_id(word)
+                    for word in pattern]
+        if any(word is not None and word_id is None
+               for word, word_id in zip(pattern, word_ids)):
+            return list()
+
+        if n == 1:
+            rows = np.arange(len(self.store.word_counts)) \
+                   if word_ids[0] is None else np.array(word_ids)
+            return [((self.store.vocabulary[int(i)],),
+                     int(self.store.word_counts[i])) for i in rows]
+
+        # row numbers are in the order of the n-gram files
+        rows = np.sort(self._find_rows(n, word_ids))
+        name = NGRAM_NAMES[n]
+        ids = getattr(self.store, name + "_ids")[rows]
+        counts = getattr(self.store, name + "_counts")[rows]
+        vocabulary = self.store.vocabulary
+        return [(tuple(vocabulary[i] for i in row), count)
+                for row, count in zip(ids.tolist(), counts.tolist())]
+
+    def _find_rows(self, n, word_ids):
+        """Return the array of row numbers of the n-grams matching
+        word_ids (None for a wildcard)."""
+        if n not in NGRAM_NAMES:
+            raise ValueError("Only words, bigrams and trigrams are indexed")
+        name = NGRAM_NAMES[n]
+        ids = getattr(self.store, name + "_ids")
+        fixed = [p for p in range(n) if word_ids[p] is not None]
+        if not fixed:
+            return np.arange(len(ids))
+
+        def load(kind, p):
+            return load_array(self.folder, "{}_{}{}".format(name, kind, p))
+
+        # start from the word position with the fewest n-grams
+        def block(p):
+            offsets = load("offsets", p)
+            return int(offsets[word_ids[p]]), int(offsets[word_ids[p] + 1])
+
+        p = min(fixed, key=lambda q: block(q)[1] - block(q)[0])
+        order = load("order", p)
+        lo, hi = block(p)
+
+        # within the block, the n-grams are sorted by the other positions
+        # in order, so as long as those are fixed, narrow down the block by
+        # binary search
+        others = [q for q in range(n) if q != p]
+        for i, q in enumerate(others):
+            if word_ids[q] is None:
+                break
+            lo, hi = _search_range(ids, order, lo, hi, q, word_ids[q])
+        else:
+            i = len(others)
+
+        rows = np.asarray(order[lo:hi])
+        for q in others[i:]:
+            if word_ids[q] is not None:
+                rows = rows[ids[rows, q] == word_ids[q]]
+        return rows
+
+
+def _search_range(ids, order, lo, hi, column, value):
+    """Return the range [lo, hi) of the entries of order[lo:hi] whose
+    n-grams (rows of "ids") have "value" in "column", given that they are
+    sorted by that column."""
+    def bisect(lo, hi, right):
+        while lo < hi:
+            mid = (lo + hi) // 2
+            x = ids[order[mid], column]
+            if x < value or (right and x == value):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    start = bisect(lo, hi, False)
+    return start, bisect(start, hi, True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Look up words, bigrams or trigrams in the binary n-gram "
+                    "store written by ngrams.py.")
+    parser.add_argument("store", help="n-gram store folder, e.g. "
+                        "../data/english/ngrams/english-brown_ngramstore")
+    parser.add_argument("words", help="1 to 3 words; the wildcard stands for "
+                        "any word", nargs="+")
+    parser.add_argument("--wildcard", help="wildcard among the words (change "
+                        "it to look up n-grams with a literal \"{}\")"
+                        .format(WILDCARD), type=str, default=WILDCARD)
+    parser.add_argument("--limit", help="maximum number of n-grams printed",
+                        type=int, default=50)
+    args = parser.parse_args()
+
+    if not Path(args.store, "vocabulary_order.npy").exists():
+        print("Building the index...", flush=True)
+        write_ngram_index(args.store)
+
+    matches = NgramIndex(args.store).find(*[None if word == args.wildcard
+                                            else word.casefold()
+                                            for word in args.words])
+    print("# matches: {}".format(len(matches)))
+    for words, count in matches[:args.limit]:
+        print("\t".join(words) + "\t" + str(count))
@@ -1,12 +1,26 @@
 #!usr/bin/env python3
 
-from collections import Counter
 import argparse
+from contextlib import closing
 from pathlib import Path
 
 from lxa5lib import (get_language_corpus_datafolder, stdout_list,
                      load_config_for_command_line_help, sorted_alphabetized,
-                     changeFilenameSuffix, json_pdump)
+                     changeFilenameSuffix, json_pdump, json_pdump_items,
+                     open_file, compressed_path, file_stem, find_file,
+                     COMPRESSIONS)
+from ngrams_module import (iter_corpus_lines, count_ngrams_in_parallel,
+                           CHUNK_SIZE, COUNTING_ENGINES,
+                           ngram_store_path, write_ngram_store,
+                           NgramIdCounter, count_ngram_ids_in_parallel,
+                           write_ngram_store_arrays, iter_ngram_strings,
+                           alphabetical_order,
+                           count_state_path, update_count_state,
+                           ApproximateNgramCounter, SpillingNgramCounter,
+                           RollingNgramCounter)
+from ngram_index import write_ngram_index
+from artifact_cache import (ArtifactCache, cache_path, cached_run,
+                            settings_path, write_settings, remove_settings)
 
 #------------------------------------------------------------------------------#
 #
@@ -19,6 +33,26 @@ from lxa5lib import (get_language_corpus_datafolder, stdout_list,
 #
 #------------------------------------------------------------------------------#
 
+# version of the outputs of main() in the artifact cache (see
+# artifact_cache.py); increase it when they change
+CACHE_VERSION = 1
+
+#------------------------------------------------------------------------------#
+
+def output_settings(maxwordtokens=0, append=False, approximate=False,
+                    memory=1024, topk=100000, order=0, skip=0, mincount=0):
+    """Return the settings of main() which change its outputs, as written in
+    their settings file (see artifact_cache.py). The engine, workers,
+    chunksize and maxentries give the same outputs, and compressed outputs
+    are read as the others are."""
+    settings = dict(maxwordtokens=maxwordtokens, append=append,
+                    approximate=approximate, order=order, skip=skip,
+                    mincount=mincount)
+    if approximate:
+        settings.update(memory=memory, topk=topk)
+    return settings
+
+
 def makeArgParser(configfilename="config.json"):
 
     language, \
@@ -45,11 +79,103 @@ def makeArgParser(configfilename="config.json"):
                         " if this is zero, then the program reads "
                         "all word tokens in the corpus",
                         type=int, default=0)
+    parser.add_argument("--chunksize", help="number of characters read from "
+                        "the corpus file at a time",
+                        type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", help="number of processes counting "
+                        "n-grams in parallel, each on a part of the corpus; "
+                        "ignored if maxwordtokens is not zero",
+                        type=int, default=1)
+    parser.add_argument("--engine", help="n-gram counting engine; \"numpy\" "
+                        "maps words to integer IDs and counts bigrams and "
+                        "trigrams as packed integer keys in numpy arrays, "
+                        "which takes much less memory for large corpora",
+                        type=str, choices=sorted(COUNTING_ENGINES),
+                        default="counter")
+    parser.add_argument("--append", help="count only the corpus text added "
+                        "since the last run with --append (new files in a "
+                        "corpus folder, or new lines at the end of a file), "
+                        "and add the counts to those saved by that run; "
+                        "ignored if maxwordtokens is not zero",
+                        action="store_true")
+    parser.add_argument("--approximate", help="count bigrams and trigrams "
+                        "approximately in bounded memory (see --memory), and "
+                        "output only the most frequent ones (see --topk) in "
+                        "*_bigrams_approx.txt and *_trigrams_approx.txt; "
+                        "word counts are exact",
+                        action="store_true")
+    parser.add_argument("--memory", help="memory budget in megabytes for "
+                        "approximate counting: the count-min sketches, the "
+                        "most frequent bigrams and trigrams kept, and the "
+                        "exact word counts and batches of n-gram counts",
+                        type=int, default=1024)
+    parser.add_argument("--topk", help="number of most frequent bigrams and "
+                        "trigrams in the outputs of approximate counting",
+                        type=int, default=100000)
+    parser.add_argument("--maxentries", help="maximum number of bigram and "
+                        "trigram types counted in memory; when it is "
+                        "reached, the counts are sorted and spilled to "
+                        "temporary files in the ngrams folder, which are "
+                        "merged at the end; zero means no limit",
+                        type=int, default=0)
+    parser.add_argument("--order", help="count all n-grams of orders 1 to "
+                        "this number in every line, however short, and "
+                        "output one table per order (*_words.txt, "
+                        "*_bigrams.txt, *_trigrams.txt, *_4grams.txt etc); "
+                        "zero means the usual words, bigrams and trigrams of "
+                        "lines with at least 3 words",
+                        type=int, default=0)
+    parser.add_argument("--skip", help="also count the bigrams with 1 to "
+                        "this number of words in between, and output one "
+                        "table for each number (*_skip1bigrams.txt etc); "
+                        "if --order is zero, n-grams are counted as with "
+                        "--order 3",
+                        type=int, default=0)
+    parser.add_argument("--compress", help="compress the .txt and .json "
+                        "outputs in the ngrams folder (their names end in "
+                        "\".gz\" etc); the corpus may be compressed in any "
+                        "of these formats, which is detected automatically",
+                        type=str, choices=sorted(COMPRESSIONS), default=None)
+    parser.add_argument("--mincount", help="leave the n-grams occurring "
+                        "fewer than this number of times out of the bigram, "
+                        "trigram etc outputs and the binary n-gram store "
+                        "(not out of the word outputs); zero means all "
+                        "n-grams",
+                        type=int, default=0)
     return parser
 
 
+def output_ngram_table(outfilename, intro_string, ngramsSorted, sep="\t",
+                       header=(), ntypes=None):
+    """Write the (ngram, freq) pairs of ngramsSorted, which may be an
+    iterator if their number is given as "ntypes"."""
+    if ntypes is None:
+        ntypes = len(ngramsSorted)
+    with open_file(outfilename, 'w') as f:
+        print(intro_string, file=f)
+        for line in header:
+            print(line, file=f)
+        print("# type count: {}".format(ntypes), file=f)
+        for (ngram, freq) in ngramsSorted:
+            print(ngram + sep + str(freq), file=f)
+
+
+def iter_output_ngram_table(outfilename, intro_string, ngramsSorted, ntypes,
+                            sep="\t"):
+    """Like output_ngram_table(), for an iterator over "ntypes" n-grams;
+    yield each (ngram, freq) as it is written."""
+    with open_file(outfilename, 'w') as f:
+        print(intro_string, file=f)
+        print("# type count: {}".format(ntypes), file=f)
+        for (ngram, freq) in ngramsSorted:
+            print(ngram + sep + str(freq), file=f)
+            yield ngram, freq
+
+
 def main(language=None, corpus=None, datafolder=None, filename=None,
-         maxwordtokens=0):
+         maxwordtokens=0, chunksize=CHUNK_SIZE, workers=1, engine="counter",
+         append=False, approximate=False, memory=1024, topk=100000,
+         maxentries=0, order=0, skip=0, compress=None, mincount=0):
 
     print("\n*****************************************************\n"
           "Running the ngrams.py program now...\n")
@@ -71,67 +197,124 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
         outfolderDx1.mkdir(parents=True)
 
     if maxwordtokens:
-        corpusName = Path(corpus).stem + "_{}-tokens".format(maxwordtokens)
+        corpusName = file_stem(corpus) + "_{}-tokens".format(maxwordtokens)
     else:
-        corpusName = Path(corpus).stem
-
-    outfilenameWords = Path(outfolder, corpusName + "_words.txt")
-    outfilenameBigrams = Path(outfolder, corpusName + "_bigrams.txt")
-    outfilenameTrigrams = Path(outfolder, corpusName + "_trigrams.txt")
+        corpusName = file_stem(corpus)
+
+    # the .txt and .json outputs are compressed if "compress" is given
+    outfilenameWords = compressed_path(Path(outfolder,
+                                            corpusName + "_words.txt"), compress)
+    outfilenameBigrams = compressed_path(Path(outfolder,
+                                        corpusName + "_bigrams.txt"), compress)
+    outfilenameTrigrams = compressed_path(Path(outfolder,
+                                        corpusName + "_trigrams.txt"), compress)
     outfilenameDx1 = Path(outfolderDx1, corpusName + ".dx1")
+    outfolderStore = ngram_store_path(outfolder, corpusName)
+    outfolderState = count_state_path(outfolder, corpusName)
+    settingsfile = settings_path(outfolder, corpusName)
 
-    wordDict = Counter()
-    trigramDict = Counter()
-    bigramDict = Counter()
     sep = "\t"
-    corpusCurrentSize = 0 # running word token count
-
-    print('Reading the corpus file now...')
-
-    with infilename.open() as f:
-        for line in f.readlines():
-            if not line:
-                continue
-
-            line = line.strip().casefold()
-
-            # TODO: modify/combine these with "scrubbing", cf. Alchemist and Lxa4
-            line = line.replace(".", " . ")
-            line = line.replace(",", " , ")
-            line = line.replace(";", " ; ")
-            line = line.replace("!", " ! ")
-            line = line.replace("?", " ? ")
-            line = line.replace(":", " : ")
-            line = line.replace(")", " ) ")
-            line = line.replace("(", " ( ")
-
-            words = line.split()
-            lenWords = len(words)
-
-            corpusCurrentSize += lenWords
-
-            for i in range(lenWords-2):
-
-                word1 = words[i]
-                word2 = words[i+1]
-                word3 = words[i+2]
-
-                wordDict[word3] += 1
-
-                if i == 0:
-                    wordDict[word1] += 1
-                    wordDict[word2] += 1
-                    bigram = word1 + sep + word2
-                    bigramDict[bigram] += 1
 
-                bigram = word2 + sep + word3
-                trigram = word1 + sep + word2 + sep + word3
+    # for sorted_alphabetized(): only the n-grams with at least mincount
+    # occurrences are sorted and written
+    min_count = mincount or None
 
-                trigramDict[trigram] += 1
-                bigramDict[bigram] += 1
+    print('Reading the corpus file now...')
 
-            if maxwordtokens and corpusCurrentSize > maxwordtokens:
-                break
+    if workers > 1 and maxwordtokens:
+        print("maxwordtokens is not zero; "
+              "the corpus is read by one process only.")
+        workers = 1
+
+    if append and maxwordtokens:
+        print("maxwordtokens is not zero; "
+              "all of the corpus text is counted.")
+        append = False
+
+    if (order or skip) and (approximate or append or workers > 1 or
+                            maxentries):
+        print("N-grams of a given order are counted in memory by one "
+              "process, with all of the corpus text.")
+        approximate = append = False
+        workers = 1
+        maxentries = 0
+
+    if approximate and maxentries:
+        print("Approximate counts are computed in memory; "
+              "maxentries is ignored.")
+        maxentries = 0
+
+    if maxentries and (append or workers > 1):
+        print("Counts spilled to disk are computed by one process, "
+              "with all of the corpus text.")
+        append = False
+        workers = 1
+
+    if approximate and (append or workers > 1):
+        print("Approximate counts are computed by one process, "
+              "with all of the corpus text.")
+        append = False
+        workers = 1
+
+    # written once all the outputs are
+    settings = output_settings(maxwordtokens, append, approximate, memory,
+                               topk, order, skip, mincount)
+    remove_settings(settingsfile)
+
+    # the corpus is read in chunks of "chunksize" characters, so memory use
+    # depends on the number of n-gram types, not on the size of the corpus
+    if order or skip:
+        # all n-grams up to "order" words and skip-bigrams, in one pass
+        counter = RollingNgramCounter(order or 3, skip)
+        with closing(iter_corpus_lines(infilename, chunksize)) as lines:
+            counter.count_lines(lines, maxwordtokens)
+        ngramTables = counter.to_counters(sep)
+        wordDict = ngramTables[0][1]
+        corpusCurrentSize = counter.tokencount
+    elif approximate:
+        # exact word counts; bigram and trigram counts are estimated in
+        # "memory" megabytes
+        counter = ApproximateNgramCounter(memory * 2**20, topk, sep=sep)
+        with closing(iter_corpus_lines(infilename, chunksize)) as lines:
+            counter.count_lines(lines, maxwordtokens)
+        wordDict = counter.wordDict
+        corpusCurrentSize = counter.tokencount
+    elif maxentries:
+        # exact counts; bigram and trigram counts are spilled to disk as
+        # sorted runs whenever there are "maxentries" of them in memory
+        counter = SpillingNgramCounter(maxentries, outfolder, sep)
+        with closing(iter_corpus_lines(infilename, chunksize)) as lines:
+            counter.count_lines(lines, maxwordtokens)
+        wordDict = counter.wordDict
+        corpusCurrentSize = counter.tokencount
+    elif append:
+        # the counts of the previous run are in outfolderState
+        wordDict, bigramDict, trigramDict, \
+        corpusCurrentSize = update_count_state(infilename, outfolderState,
+                                               workers, chunksize, sep, engine)
+    elif engine == "numpy":
+        # the n-grams stay arrays of word IDs until the outputs are written
+        if workers > 1:
+            idcounter = count_ngram_ids_in_parallel(infilename, workers,
+                                                    chunksize)
+        else:
+            idcounter = NgramIdCounter()
+            with closing(iter_corpus_lines(infilename, chunksize)) as lines:
+                idcounter.count_lines(lines, maxwordtokens)
+        words, wordcounts, bigramArrays, trigramArrays = \
+            idcounter.sorted_arrays(mincount)
+        wordDict = dict(zip(words, wordcounts.tolist()))
+        corpusCurrentSize = idcounter.tokencount
+        del idcounter
+    elif workers > 1:
+        wordDict, bigramDict, trigramDict, \
+        corpusCurrentSize = count_ngrams_in_parallel(infilename, workers,
+                                                     chunksize, sep, engine)
+    else:
+        count_ngrams = COUNTING_ENGINES[engine]
+        with closing(iter_corpus_lines(infilename, chunksize)) as lines:
+            wordDict, bigramDict, trigramDict, \
+            corpusCurrentSize = count_ngrams(lines, maxwordtokens, sep)
 
     print("\nCompleted counting words, bigrams, and trigrams.")
     print("Token count: {}".format(corpusCurrentSize))
@@ -144,54 +327,205 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     wordsSorted = sorted_alphabetized(wordDict.items(),
                                       key=lambda x: x[1], reverse=True)
 
-    bigramsSorted = sorted_alphabetized(bigramDict.items(),
-                                        key=lambda x: x[1], reverse=True)
-
-    trigramsSorted = sorted_alphabetized(trigramDict.items(),
-                                         key=lambda x: x[1], reverse=True)
-
-    # print txt outputs
-    with outfilenameWords.open('w') as f:
-        print(intro_string, file=f)
-        print("# type count: {}".format(len(wordsSorted)), file=f)
-        for (word, freq) in wordsSorted:
-            print(word + sep + str(freq), file=f)
-
-    with outfilenameBigrams.open('w') as f:
-        print(intro_string, file=f)
-        print("# type count: {}".format(len(bigramsSorted)), file=f)
-        for (bigram, freq) in bigramsSorted:
-            print(bigram + sep +  str(freq), file=f)
-
-    with outfilenameTrigrams.open('w') as f:
-        print(intro_string, file=f)
-        print("# type count: {}".format(len(trigramsSorted)), file=f)
-        for (trigram, freq) in trigramsSorted:
-            print(trigram + sep + str(freq), file=f)
+    # print word outputs
+    output_ngram_table(outfilenameWords, intro_string, wordsSorted, sep)
 
-    # print dx1 output
     with outfilenameDx1.open('w') as f:
         for (word, freq) in wordsSorted:
             print(word, freq, ' '.join(word), file=f)
 
-    # print json outputs
-    with changeFilenameSuffix(outfilenameWords, ".json").open('w') as f:
+    with open_file(changeFilenameSuffix(outfilenameWords, ".json"),
+                   'w') as f:
         json_pdump(dict(wordsSorted), f)
 
-    with changeFilenameSuffix(outfilenameBigrams, ".json").open('w') as f:
-        json_pdump(dict(bigramsSorted), f)
+    if order or skip:
+        outputfiles = [outfilenameWords, outfilenameDx1,
+                       changeFilenameSuffix(outfilenameWords, ".json")]
+        ngramsSortedByName = dict()
+
+        for name, ngramDict in ngramTables[1:]:
+            outfilename = compressed_path(Path(outfolder,
+                            corpusName + "_{}.txt".format(name)), compress)
+            ngramsSorted = sorted_alphabetized(ngramDict.items(),
+                                        key=lambda x: x[1], reverse=True,
+                                        min_count=min_count) or []
+            output_ngram_table(outfilename, intro_string, ngramsSorted, sep)
+            with open_file(changeFilenameSuffix(outfilename, ".json"),
+                           'w') as f:
+                json_pdump_items(sorted(ngramsSorted), f)
+            ngramsSortedByName[name] = ngramsSorted
+            outputfiles += [outfilename, changeFilenameSuffix(outfilename,
+                                                              ".json")]
+
+        write_ngram_store(outfolderStore, wordsSorted,
+                          ngramsSortedByName.get("bigrams"),
+                          ngramsSortedByName.get("trigrams"),
+                          corpusCurrentSize, infilename, sep)
+        write_ngram_index(outfolderStore)
+
+        write_settings(settingsfile, settings, [infilename])
+
+        print('wordlist and n-gram files ready')
+        print('dx1 file ready')
+        print('binary n-gram store and index ready')
+        stdout_list("Output files:", *outputfiles, outfolderStore,
+                    settingsfile)
+        return
+
+    if approximate:
+        outputfiles = [outfilenameWords, outfilenameDx1,
+                       changeFilenameSuffix(outfilenameWords, ".json")]
+
+        for name in ["bigram", "trigram"]:
+            outfilename = compressed_path(Path(outfolder,
+                            corpusName + "_{}s_approx.txt".format(name)),
+                            compress)
+            ngramsSorted, error_bound = counter.most_common(name)
+            ngramsSorted = sorted_alphabetized(ngramsSorted,
+                                        key=lambda x: x[1], reverse=True,
+                                        limit=topk, min_count=min_count) or []
+            header = ["# approximate counts of the {} most frequent {}s "
+                      "(count-min sketch, {} bytes)".format(topk, name,
+                                    counter.sketches[name].table.nbytes),
+                      "# each count exceeds the true count by at most {:.0f}"
+                      " with probability {:.4f}".format(error_bound,
+                                counter.sketches[name].confidence())]
+            output_ngram_table(outfilename, intro_string, ngramsSorted, sep,
+                               header)
+            outputfiles.append(outfilename)
+
+        write_settings(settingsfile, settings, [infilename])
+
+        print('wordlist and approximate bigram and trigram files ready')
+        print('dx1 file ready')
+        stdout_list("Output files:", *outputfiles, settingsfile)
+        return
+
+    if maxentries:
+        # the runs are merged as the outputs are written, so that the
+        # bigram and trigram tables are never in memory as a whole
+        with counter:
+            # print json outputs (in n-gram order, as merged)
+            with open_file(changeFilenameSuffix(outfilenameBigrams, ".json"),
+                           'w') as f:
+                json_pdump_items(counter.iter_counts("bigram", mincount), f)
+
+            with open_file(changeFilenameSuffix(outfilenameTrigrams, ".json"),
+                           'w') as f:
+                json_pdump_items(counter.iter_counts("trigram", mincount), f)
+
+            # print txt outputs and the binary n-gram store together
+            nbigrams, bigramsSorted = counter.frequency_sorted("bigram",
+                                                               mincount)
+            ntrigrams, trigramsSorted = counter.frequency_sorted("trigram",
+                                                                 mincount)
+            write_ngram_store(outfolderStore, wordsSorted,
+                              iter_output_ngram_table(outfilenameBigrams,
+                                        intro_string, bigramsSorted,
+                                        nbigrams, sep),
+                              iter_output_ngram_table(outfilenameTrigrams,
+                                        intro_string, trigramsSorted,
+                                        ntrigrams, sep),
+                              corpusCurrentSize, infilename, sep,
+                              nbigrams=nbigrams, ntrigrams=ntrigrams)
+        write_ngram_index(outfolderStore)
+    elif engine == "numpy" and not append:
+        for outfilename, (ids, counts) in [(outfilenameBigrams, bigramArrays),
+                                           (outfilenameTrigrams,
+                                            trigramArrays)]:
+            # print txt outputs (by frequency) and json outputs (by n-gram)
+            output_ngram_table(outfilename, intro_string,
+                               iter_ngram_strings(words, ids, counts, sep=sep),
+                               sep, ntypes=len(ids))
+            with open_file(changeFilenameSuffix(outfilename, ".json"),
+                           'w') as f:
+                json_pdump_items(iter_ngram_strings(words, ids, counts,
+                                        alphabetical_order(words, ids), sep),
+                                 f)
+
+        write_ngram_store_arrays(outfolderStore, words, wordcounts,
+                                 bigramArrays, trigramArrays,
+                                 corpusCurrentSize, infilename)
+        write_ngram_index(outfolderStore)
+    else:
+        bigramsSorted = sorted_alphabetized(bigramDict.items(),
+                                            key=lambda x: x[1], reverse=True,
+                                            min_count=min_count) or []
+
+        trigramsSorted = sorted_alphabetized(trigramDict.items(),
+                                             key=lambda x: x[1], reverse=True,
+                                             min_count=min_count) or []
 
-    with changeFilenameSuffix(outfilenameTrigrams, ".json").open('w') as f:
-        json_pdump(dict(trigramsSorted), f)
+        # print txt outputs
+        output_ngram_table(outfilenameBigrams, intro_string, bigramsSorted, sep)
+        output_ngram_table(outfilenameTrigrams, intro_string, trigramsSorted,
+                           sep)
+
+        # print json outputs (by n-gram; there may be none with --mincount)
+        with open_file(changeFilenameSuffix(outfilenameBigrams, ".json"),
+                       'w') as f:
+            json_pdump_items(sorted(bigramsSorted), f)
+
+        with open_file(changeFilenameSuffix(outfilenameTrigrams, ".json"),
+                       'w') as f:
+            json_pdump_items(sorted(trigramsSorted), f)
+
+        # print binary n-gram store, to be memory-mapped by manifold.py etc
+        write_ngram_store(outfolderStore, wordsSorted, bigramsSorted,
+                          trigramsSorted, corpusCurrentSize, infilename, sep)
+
+        # print lookup index of the store, for ngram_index.py
+        write_ngram_index(outfolderStore)
+
+    write_settings(settingsfile, settings, [infilename])
 
     print('wordlist, bigram and trigram files ready')
     print('dx1 file ready')
+    print('binary n-gram store and index ready')
 
     stdout_list("Output files:", outfilenameWords,
                 outfilenameBigrams, outfilenameTrigrams, outfilenameDx1,
                 changeFilenameSuffix(outfilenameWords, ".json"),
                 changeFilenameSuffix(outfilenameBigrams, ".json"),
-                changeFilenameSuffix(outfilenameTrigrams, ".json"))
+                changeFilenameSuffix(outfilenameTrigrams, ".json"),
+                outfolderStore, *([outfolderState] if append else []),
+                settingsfile)
+
+
+def ensure_ngrams(language=None, corpus=None, datafolder=None, filename=None,
+                  maxwordtokens=0, tables=("words",)):
+    """Make sure that the outputs of main() with the default settings for
+    the corpus are there and up to date, at least the files of "tables"
+    (words, bigrams, trigrams), compressed or not: they are restored from
+    the artifact cache if it has them for the same corpus contents and
+    maxwordtokens, or adopted in it if main() made them on its own with
+    these settings from the corpus as it is, or else main() is run and its
+    outputs are cached (see artifact_cache.py). Return True if main() was
+    not run."""
+    if filename:
+        infilename = Path(filename)
+        root = infilename.parent
+    else:
+        infilename = Path(datafolder, language, corpus)
+        root = Path(datafolder, language)
+
+    if maxwordtokens:
+        corpusName = file_stem(infilename) + "_{}-tokens".format(maxwordtokens)
+    else:
+        corpusName = file_stem(infilename)
+    outfolder = Path(root, "ngrams")
+    outputs = [find_file(Path(outfolder,
+                              "{}_{}.txt".format(corpusName, table)))
+               for table in tables]
+
+    cache = ArtifactCache(cache_path(language, datafolder, filename), root)
+    return cached_run(cache, "ngrams", CACHE_VERSION,
+                      output_settings(maxwordtokens), [infilename],
+                      [outfolder, Path(root, "dx1")],
+                      lambda: main(language=language, corpus=corpus,
+                                   datafolder=datafolder, filename=filename,
+                                   maxwordtokens=maxwordtokens),
+                      outputs, settings_path(outfolder, corpusName))
 
 
 if __name__ == "__main__":
@@ -199,6 +533,18 @@ if __name__ == "__main__":
     args = makeArgParser().parse_args()
 
     maxwordtokens = args.maxwordtokens
+    chunksize = args.chunksize
+    workers = args.workers
+    engine = args.engine
+    append = args.append
+    approximate = args.approximate
+    memory = args.memory
+    topk = args.topk
+    maxentries = args.maxentries
+    order = args.order
+    skip = args.skip
+    compress = args.compress
+    mincount = args.mincount
 
     description="You are running {}.\n".format(__file__) + \
                 "This program extracts word n-grams.\n" + \
@@ -210,5 +556,8 @@ if __name__ == "__main__":
                                       scriptname=__file__)
 
     main(language=language, corpus=corpus, datafolder=datafolder,
-         maxwordtokens=maxwordtokens)
+         maxwordtokens=maxwordtokens, chunksize=chunksize, workers=workers,
+         engine=engine, append=append, approximate=approximate,
+         memory=memory, topk=topk, maxentries=maxentries, order=order,
+         skip=skip, compress=compress, mincount=mincount)
 
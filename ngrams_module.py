@@ -0,0 +1,1277 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Functions for reading a corpus text and counting word n-grams,
+#    used by ngrams.py
+#
+#------------------------------------------------------------------------------#
+
+from collections import Counter, deque
+from array import array
+import hashlib
+import heapq
+import io
+from itertools import groupby, islice
+import math
+import multiprocessing
+from operator import itemgetter
+from pathlib import Path
+import shutil
+import tempfile
+
+import numpy as np
+
+from tokenizer import tokenize
+from lxa5lib import detect_compression, open_file
+from binarystore import (save_arrays, load_array, save_info, load_info,
+                         save_string_table, StringTable, ArrayWriter)
+
+# number of characters read from the corpus file at a time
+CHUNK_SIZE = 1 << 20
+
+# for the "numpy" counting engine: number of word tokens buffered before
+# their bigrams and trigrams are counted, and the number of bits of each
+# word ID in a packed bigram/trigram key (3 * ID_BITS must fit in an int64)
+BATCH_SIZE = 1 << 22
+ID_BITS = 21
+MAX_VOCABULARY_SIZE = 1 << ID_BITS
+
+
+def read_lines_in_chunks(infile, chunksize=CHUNK_SIZE):
+    """Yield the lines of the open text file "infile", reading it in chunks
+    of "chunksize" characters. Only one chunk (plus a partial line carried
+    over from the previous chunk) is in memory at any time.
+
+    Lines are split on "\\n" only, as with readlines() on a text file, and
+    they keep no line terminator.
+    """
+    tail = ""
+    while True:
+        chunk = infile.read(chunksize)
+        if not chunk:
+            break
+        lines = (tail + chunk).split("\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def corpus_files(infilename):
+    """Return the list of corpus files for "infilename", which is either a
+    corpus file or a folder of corpus files (read in filename order)."""
+    if infilename.is_dir():
+        return sorted(path for path in infilename.iterdir() if path.is_file())
+    else:
+        return [infilename]
+
+
+def iter_corpus_lines(infilename, chunksize=CHUNK_SIZE):
+    """Yield the lines of the corpus file (or folder of corpus files)
+    "infilename". The file being read is closed as soon as the caller stops
+    iterating."""
+    for path in corpus_files(infilename):
+        with open_file(path) as f:
+            yield from read_lines_in_chunks(f, chunksize)
+
+
+class ByteRangeReader(io.RawIOBase):
+    """Raw binary reader over bytes [start, end) of a file, so that a shard
+    of a corpus can be wrapped in a TextIOWrapper like a whole file."""
+
+    def __init__(self, infilename, start, end):
+        self._file = infilename.open("rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        nbytes = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= nbytes
+        return nbytes
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def find_shard_boundaries(infilename, nshards, start=0, end=None):
+    """Split bytes [start, end) of the file "infilename" (by default, the
+    whole file) into at most "nshards" byte ranges of about equal size, each
+    starting at the beginning of a line ("start" must be one).
+    Return a list of (start, end) byte offsets."""
+    if end is None:
+        end = infilename.stat().st_size
+    boundaries = [start]
+
+    with infilename.open("rb") as f:
+        for i in range(1, nshards):
+            position = start + i * (end - start) // nshards
+            if position <= boundaries[-1]:
+                continue
+            # move to the start of the first line beginning at or after
+            # "position"
+            f.seek(position - 1)
+            f.readline()
+            position = f.tell()
+            if boundaries[-1] < position < end:
+                boundaries.append(position)
+
+    boundaries.append(end)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def find_last_line_end(infilename):
+    """Return the byte offset just after the last "\n" in the file
+    "infilename" (0 if there is none)."""
+    blocksize = 1 << 16
+    with infilename.open("rb") as f:
+        end = f.seek(0, io.SEEK_END)
+        while end > 0:
+            start = max(0, end - blocksize)
+            f.seek(start)
+            block = f.read(end - start)
+            position = block.rfind(b"\n")
+            if position >= 0:
+                return start + position + 1
+            end = start
+    return 0
+
+
+def hash_file_range(infilename, start, end, sha1=None):
+    """Update the hashlib.sha1 object "sha1" (a new one if None) with bytes
+    [start, end) of the file "infilename", and return it."""
+    if sha1 is None:
+        sha1 = hashlib.sha1()
+    with ByteRangeReader(infilename, start, end) as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(block)
+    return sha1
+
+
+def iter_shard_lines(infilename, start, end, chunksize=CHUNK_SIZE):
+    """Yield the lines of corpus text in bytes [start, end) of the file
+    "infilename", decoded just as Path.open() would decode the whole file.
+
+    A compressed file cannot be read from an offset, so it is always read
+    as a whole (start and end are ignored)."""
+    if detect_compression(infilename):
+        with open_file(infilename) as f:
+            yield from read_lines_in_chunks(f, chunksize)
+        return
+    with io.TextIOWrapper(io.BufferedReader(
+                          ByteRangeReader(infilename, start, end))) as f:
+        yield from read_lines_in_chunks(f, chunksize)
+
+
+def count_line_ngrams(words, wordDict, bigramDict, trigramDict, sep="\t"):
+    """Add the words, bigrams and trigrams of a line (as a list of words)
+    to the counters. Nothing is counted in lines with fewer than 3 words."""
+    for i in range(len(words)-2):
+
+        word1 = words[i]
+        word2 = words[i+1]
+        word3 = words[i+2]
+
+        wordDict[word3] += 1
+
+        if i == 0:
+            wordDict[word1] += 1
+            wordDict[word2] += 1
+            bigram = word1 + sep + word2
+            bigramDict[bigram] += 1
+
+        bigram = word2 + sep + word3
+        trigram = word1 + sep + word2 + sep + word3
+
+        trigramDict[trigram] += 1
+        bigramDict[bigram] += 1
+
+
+def count_ngrams(lines, maxwordtokens=0, sep="\t"):
+    """Count words, bigrams and trigrams in "lines" (any iterable of lines of
+    corpus text, consumed lazily).
+
+    If maxwordtokens is non-zero, counting stops right after the line at
+    which the running token count exceeds it, and no further lines are
+    requested from "lines".
+
+    Return (wordDict, bigramDict, trigramDict, token count).
+    """
+    wordDict = Counter()
+    trigramDict = Counter()
+    bigramDict = Counter()
+    corpusCurrentSize = 0 # running word token count
+
+    for line in lines:
+        if not line:
+            continue
+
+        words = tokenize(line)
+        corpusCurrentSize += len(words)
+
+        count_line_ngrams(words, wordDict, bigramDict, trigramDict, sep)
+
+        if maxwordtokens and corpusCurrentSize > maxwordtokens:
+            break
+
+    return wordDict, bigramDict, trigramDict, corpusCurrentSize
+
+
+def _merge_counts(keys, counts, newkeys, newcounts):
+    """Merge two tables of (packed key, count) into one, sorted by key."""
+    keys, inverse = np.unique(np.concatenate((keys, newkeys)),
+                              return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate((counts, newcounts)),
+                         minlength=len(keys))
+    return keys, counts.astype(np.int64)
+
+
+class NgramIdCounter:
+    """Word, bigram and trigram counts over integer word IDs.
+
+    Each word type is mapped to an ID once. Bigrams and trigrams are packed
+    into int64 keys (ID_BITS bits per word) and kept as sorted arrays of
+    unique keys with their counts, which are updated a batch of tokens at a
+    time with np.unique. Strings are rebuilt only by to_counters(); the
+    outputs of ngrams.py are written from sorted_arrays() without them.
+    """
+
+    def __init__(self, batchsize=BATCH_SIZE):
+        self.batchsize = batchsize
+        self.word_to_id = dict()
+        self.words = list() # word ID -> word
+        self.tokencount = 0
+
+        self.wordcounts = np.zeros(0, dtype=np.int64)
+        self.bigram_keys = np.zeros(0, dtype=np.int64)
+        self.bigram_counts = np.zeros(0, dtype=np.int64)
+        self.trigram_keys = np.zeros(0, dtype=np.int64)
+        self.trigram_counts = np.zeros(0, dtype=np.int64)
+
+        # word IDs of the lines not yet counted, each line followed by -1
+        self._buffer = array("q")
+
+    def get_id(self, word):
+        word_id = self.word_to_id.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            if word_id >= MAX_VOCABULARY_SIZE:
+                raise ValueError("More than {} word types; use the \"counter\" "
+                                 "counting engine".format(MAX_VOCABULARY_SIZE))
+            self.word_to_id[word] = word_id
+            self.words.append(word)
+        return word_id
+
+    def count_lines(self, lines, maxwordtokens=0):
+        """Count the n-grams in "lines", with the same conventions and the
+        same maxwordtokens behavior as count_ngrams()."""
+        get_id = self.get_id
+
+        for line in lines:
+            if not line:
+                continue
+
+            words = tokenize(line)
+            lenWords = len(words)
+
+            self.tokencount += lenWords
+
+            # as in count_ngrams(), nothing is counted in lines with fewer
+            # than three words
+            if lenWords > 2:
+                self._buffer.extend([get_id(word) for word in words])
+                self._buffer.append(-1)
+
+                if len(self._buffer) >= self.batchsize:
+                    self.flush()
+
+            if maxwordtokens and self.tokencount > maxwordtokens:
+                break
+
+        self.flush()
+        return self.tokencount
+
+    def flush(self):
+        """Count the n-grams of the buffered lines."""
+        if not self._buffer:
+            return
+
+        ids = np.frombuffer(self._buffer, dtype=np.int64)
+
+        wordcounts = np.bincount(ids[ids >= 0], minlength=len(self.words))
+        wordcounts[:len(self.wordcounts)] += self.wordcounts
+        self.wordcounts = wordcounts
+
+        # an n-gram is valid if it does not span a line separator (-1)
+        first, second = ids[:-1], ids[1:]
+        valid = (first >= 0) & (second >= 0)
+        keys = (first[valid] << ID_BITS) | second[valid]
+        self._add(keys, "bigram")
+
+        first, second, third = ids[:-2], ids[1:-1], ids[2:]
+        valid = (first >= 0) & (second >= 0) & (third >= 0)
+        keys = (first[valid] << (2 * ID_BITS)) | \
+               (second[valid] << ID_BITS) | third[valid]
+        self._add(keys, "trigram")
+
+        self._buffer = array("q")
+
+    def _add(self, keys, name, counts=None):
+        if counts is None:
+            keys, counts = np.unique(keys, return_counts=True)
+        merged_keys, merged_counts = _merge_counts(
+                                        getattr(self, name + "_keys"),
+                                        getattr(self, name + "_counts"),
+                                        keys, counts)
+        setattr(self, name + "_keys", merged_keys)
+        setattr(self, name + "_counts", merged_counts)
+
+    def merge(self, other):
+        """Add the counts of another NgramIdCounter to this one."""
+        self.flush()
+        other.flush()
+
+        # other's word IDs -> this counter's word IDs
+        id_map = np.array([self.get_id(word) for word in other.words],
+                          dtype=np.int64)
+        mask = MAX_VOCABULARY_SIZE - 1
+
+        wordcounts = np.zeros(len(self.words), dtype=np.int64)
+        wordcounts[:len(self.wordcounts)] = self.wordcounts
+        np.add.at(wordcounts, id_map, other.wordcounts)
+        self.wordcounts = wordcounts
+
+        keys = other.bigram_keys
+        keys = (id_map[keys >> ID_BITS] << ID_BITS) | id_map[keys & mask]
+        self._add(keys, "bigram", other.bigram_counts)
+
+        keys = other.trigram_keys
+        keys = (id_map[keys >> (2 * ID_BITS)] << (2 * ID_BITS)) | \
+               (id_map[(keys >> ID_BITS) & mask] << ID_BITS) | \
+               id_map[keys & mask]
+        self._add(keys, "trigram", other.trigram_counts)
+
+        self.tokencount += other.tokencount
+
+    def to_counters(self, sep="\t"):
+        """Return (wordDict, bigramDict, trigramDict) with string keys."""
+        self.flush()
+        words = self.words
+        mask = MAX_VOCABULARY_SIZE - 1
+
+        wordDict = Counter({words[word_id]: count
+                            for word_id, count in enumerate(
+                                                    self.wordcounts.tolist())
+                            if count})
+
+        keys = self.bigram_keys
+        bigramDict = Counter(dict(zip(
+            [words[i] + sep + words[j]
+             for i, j in zip((keys >> ID_BITS).tolist(),
+                             (keys & mask).tolist())],
+            self.bigram_counts.tolist())))
+
+        keys = self.trigram_keys
+        trigramDict = Counter(dict(zip(
+            [words[i] + sep + words[j] + sep + words[k]
+             for i, j, k in zip((keys >> (2 * ID_BITS)).tolist(),
+                                ((keys >> ID_BITS) & mask).tolist(),
+                                (keys & mask).tolist())],
+            self.trigram_counts.tolist())))
+
+        return wordDict, bigramDict, trigramDict
+
+    def sorted_arrays(self, min_count=0):
+        """Return (words, wordcounts, bigrams, trigrams) in the order of the
+        outputs of ngrams.py, i.e. by decreasing count and then
+        alphabetically, without rebuilding any n-gram strings. Only the
+        bigrams and trigrams with counts of at least min_count are sorted
+        and returned.
+
+        "words" is the list of the words with their counts in the array
+        "wordcounts". "bigrams" and "trigrams" are each a pair of arrays
+        (ids, counts): the n-grams as rows of IDs of "words", and their
+        counts.
+        """
+        self.flush()
+        nwords = len(self.words)
+        wordcounts = np.zeros(nwords, dtype=np.int64)
+        wordcounts[:len(self.wordcounts)] = self.wordcounts
+
+        alphabetical = _alphabetical_ranks(self.words)
+        order = np.lexsort((alphabetical, -wordcounts))
+        order = order[wordcounts[order] > 0]
+        rank = np.full(nwords, -1, dtype=np.int64) # word ID -> output ID
+        rank[order] = np.arange(len(order))
+
+        words = [self.words[i] for i in order.tolist()]
+        ngrams = [self._sorted_ngrams(getattr(self, name + "_keys"),
+                                      getattr(self, name + "_counts"), n,
+                                      rank, alphabetical, min_count)
+                  for name, n in [("bigram", 2), ("trigram", 3)]]
+        return (words, wordcounts[order], *ngrams)
+
+    @staticmethod
+    def _sorted_ngrams(keys, counts, n, rank, alphabetical, min_count=0):
+        if min_count:
+            keys, counts = keys[counts >= min_count], counts[counts >= min_count]
+        mask = MAX_VOCABULARY_SIZE - 1
+        columns = [(keys >> (ID_BITS * (n - 1 - i))) & mask for i in range(n)]
+        # by decreasing count, then by first word, second word etc
+        order = np.lexsort([alphabetical[column] for column in columns[::-1]]
+                           + [-counts])
+        ids = np.empty((len(keys), n), dtype=np.int32)
+        for i, column in enumerate(columns):
+            ids[:, i] = rank[column[order]]
+        return ids, counts[order]
+
+
+def _alphabetical_ranks(words):
+    """Return the array of the rank of each of "words" in alphabetical
+    order."""
+    ranks = np.empty(len(words), dtype=np.int64)
+    ranks[sorted(range(len(words)), key=words.__getitem__)] = \
+        np.arange(len(words))
+    return ranks
+
+
+def alphabetical_order(words, ids):
+    """Return the order of the rows of "ids" (n-grams as IDs of "words") by
+    n-gram, i.e. by first word, then second word etc."""
+    ranks = _alphabetical_ranks(words)
+    return np.lexsort([ranks[ids[:, i]] for i in reversed(range(ids.shape[1]))])
+
+
+def iter_ngram_strings(words, ids, counts, order=None, sep="\t"):
+    """Yield the (ngram, count) pairs of the n-grams given as rows of IDs of
+    "words", with their counts, in the order of the rows (or in "order").
+    The n-gram strings are built CHUNK_SIZE rows at a time."""
+    for start in range(0, len(ids), CHUNK_SIZE):
+        if order is None:
+            rows = slice(start, start + CHUNK_SIZE)
+        else:
+            rows = order[start:start + CHUNK_SIZE]
+        yield from zip([sep.join([words[i] for i in row])
+                        for row in ids[rows].tolist()],
+                       counts[rows].tolist())
+
+
+def count_ngrams_by_id(lines, maxwordtokens=0, sep="\t"):
+    """Same as count_ngrams(), but counting with an NgramIdCounter."""
+    counter = NgramIdCounter()
+    counter.count_lines(lines, maxwordtokens)
+    return (*counter.to_counters(sep), counter.tokencount)
+
+
+def _count_shard(args):
+    infilename, start, end, chunksize, sep, engine = args
+    lines = iter_shard_lines(infilename, start, end, chunksize)
+    if engine == "numpy":
+        counter = NgramIdCounter()
+        counter.count_lines(lines)
+        return counter
+    else:
+        return count_ngrams(lines, sep=sep)
+
+
+def count_ngrams_in_ranges(ranges, workers=1, chunksize=CHUNK_SIZE,
+                           sep="\t", engine="counter"):
+    """Count words, bigrams and trigrams in "ranges", a list of
+    (corpus file, start, end) byte ranges each starting at the beginning of
+    a line. If workers > 1, each range is split into line-aligned shards
+    which are counted by a pool of "workers" processes, and the partial
+    counts are merged as the shards are done.
+
+    Compressed corpus files are not split: each is counted whole by one
+    process.
+
+    Return (wordDict, bigramDict, trigramDict, token count), with the same
+    counts as count_ngrams() over all lines in the ranges.
+    """
+    if engine == "numpy":
+        idcounter = count_ngram_ids_in_ranges(ranges, workers, chunksize)
+        return (*idcounter.to_counters(sep), idcounter.tokencount)
+
+    if workers <= 1:
+        return COUNTING_ENGINES[engine](_iter_ranges_lines(ranges, chunksize),
+                                        0, sep)
+
+    wordDict = Counter()
+    trigramDict = Counter()
+    bigramDict = Counter()
+    corpusCurrentSize = 0
+
+    tasks = _shard_tasks(ranges, workers, chunksize, sep, engine)
+    with multiprocessing.Pool(max(1, min(workers, len(tasks)))) as pool:
+        for words, bigrams, trigrams, size in pool.imap_unordered(
+                                                    _count_shard, tasks):
+            wordDict.update(words)
+            bigramDict.update(bigrams)
+            trigramDict.update(trigrams)
+            corpusCurrentSize += size
+
+    return wordDict, bigramDict, trigramDict, corpusCurrentSize
+
+
+def count_ngram_ids_in_ranges(ranges, workers=1, chunksize=CHUNK_SIZE):
+    """Same as count_ngrams_in_ranges() with the "numpy" engine, but return
+    the NgramIdCounter with the counts."""
+    idcounter = NgramIdCounter()
+    if workers <= 1:
+        idcounter.count_lines(_iter_ranges_lines(ranges, chunksize))
+        return idcounter
+
+    tasks = _shard_tasks(ranges, workers, chunksize, "\t", "numpy")
+    with multiprocessing.Pool(max(1, min(workers, len(tasks)))) as pool:
+        for result in pool.imap_unordered(_count_shard, tasks):
+            idcounter.merge(result)
+    return idcounter
+
+
+def _iter_ranges_lines(ranges, chunksize):
+    return (line for infilename, start, end in ranges
+            for line in iter_shard_lines(infilename, start, end, chunksize))
+
+
+def _shard_tasks(ranges, workers, chunksize, sep, engine):
+    return [(infilename, shard_start, shard_end, chunksize, sep, engine)
+            for infilename, start, end in ranges
+            for shard_start, shard_end in (
+                [(start, end)] if detect_compression(infilename) else
+                find_shard_boundaries(infilename, workers, start, end))]
+
+
+def count_ngrams_in_parallel(infilename, workers, chunksize=CHUNK_SIZE,
+                             sep="\t", engine="counter"):
+    """Count words, bigrams and trigrams in the corpus file (or folder of
+    corpus files) "infilename" with a pool of "workers" processes.
+    See count_ngrams_in_ranges()."""
+    return count_ngrams_in_ranges(_file_ranges(infilename), workers,
+                                  chunksize, sep, engine)
+
+
+def count_ngram_ids_in_parallel(infilename, workers, chunksize=CHUNK_SIZE):
+    """Same as count_ngrams_in_parallel() with the "numpy" engine, but
+    return the NgramIdCounter with the counts."""
+    return count_ngram_ids_in_ranges(_file_ranges(infilename), workers,
+                                     chunksize)
+
+
+def _file_ranges(infilename):
+    return [(path, 0, path.stat().st_size) for path in corpus_files(infilename)]
+
+
+# functions with the same interface as count_ngrams()
+COUNTING_ENGINES = {"counter": count_ngrams,
+                    "numpy": count_ngrams_by_id}
+
+
+#------------------------------------------------------------------------------#
+#    n-grams of any order and skip-bigrams
+#------------------------------------------------------------------------------#
+
+def ngram_table_name(n):
+    """Name of the table of n-grams, as in "<corpus>_<name>.txt"."""
+    return {1: "words", 2: "bigrams", 3: "trigrams"}.get(n,
+                                                        "{}grams".format(n))
+
+
+def skipgram_table_name(k):
+    """Name of the table of bigrams with k words in between."""
+    return "skip{}bigrams".format(k)
+
+
+class RollingNgramCounter:
+    """Counts of all n-grams of orders 1 to "order", and of the skip-bigrams
+    (word1, word2) with 1 to "skip" words in between, in one pass.
+
+    Each word type is mapped to an integer ID once, and each line is read
+    through a rolling window of the IDs of its last max(order, skip + 2)
+    words: at each word, the window ends with all the n-grams and
+    skip-bigrams ending there. N-grams do not cross lines, and unlike
+    count_ngrams(), every line is counted, however short.
+    """
+
+    def __init__(self, order=3, skip=0):
+        if order < 1:
+            raise ValueError("The n-gram order must be at least 1")
+        self.order = order
+        self.skip = skip
+        self.word_to_id = dict()
+        self.words = list() # word ID -> word
+        self.tokencount = 0
+
+        # ngramcounts[n-1]: tuple of n word IDs -> count
+        # skipcounts[k-1]: (word1 ID, word2 ID) with k words in between -> count
+        self.ngramcounts = [Counter() for _ in range(order)]
+        self.skipcounts = [Counter() for _ in range(skip)]
+
+    def get_id(self, word):
+        word_id = self.word_to_id.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.word_to_id[word] = word_id
+            self.words.append(word)
+        return word_id
+
+    def count_lines(self, lines, maxwordtokens=0):
+        """Count the n-grams in "lines", with the same maxwordtokens
+        behavior as count_ngrams()."""
+        get_id = self.get_id
+        ngramcounts = self.ngramcounts
+        skipcounts = self.skipcounts
+        windowsize = max(self.order, self.skip + 2)
+
+        for line in lines:
+            if not line:
+                continue
+
+            words = tokenize(line)
+            self.tokencount += len(words)
+
+            window = deque(maxlen=windowsize)
+            for word in words:
+                window.append(get_id(word))
+                ids = tuple(window)
+                size = len(ids)
+
+                for n in range(1, min(self.order, size) + 1):
+                    ngramcounts[n-1][ids[size-n:]] += 1
+
+                for k in range(1, min(self.skip, size - 2) + 1):
+                    skipcounts[k-1][ids[size-k-2], ids[-1]] += 1
+
+            if maxwordtokens and self.tokencount > maxwordtokens:
+                break
+
+        return self.tokencount
+
+    def to_counters(self, sep="\t"):
+        """Return the list of (table name, Counter of n-gram strings): the
+        n-grams of each order from 1 up, then the skip-bigrams."""
+        words = self.words
+
+        def strings(counts):
+            return Counter({sep.join([words[i] for i in ids]): count
+                            for ids, count in counts.items()})
+
+        tables = [(ngram_table_name(n), strings(counts))
+                  for n, counts in enumerate(self.ngramcounts, start=1)]
+        tables += [(skipgram_table_name(k), strings(counts))
+                   for k, counts in enumerate(self.skipcounts, start=1)]
+        return tables
+
+
+#------------------------------------------------------------------------------#
+#    binary n-gram store
+#------------------------------------------------------------------------------#
+
+def ngram_store_path(outfolder, corpusName):
+    return Path(outfolder, corpusName + "_ngramstore")
+
+
+def write_ngram_store(storefolder, wordsSorted, bigramsSorted, trigramsSorted,
+                      tokencount, datasource="", sep="\t", extra_info=None,
+                      nbigrams=None, ntrigrams=None):
+    """Write the n-gram tables as a binary store in "storefolder".
+
+    The vocabulary is saved in the order of wordsSorted, so that a word ID
+    is the word's rank in the words file. Bigrams and trigrams are saved as
+    arrays of word IDs with their counts, in the order of bigramsSorted and
+    trigramsSorted (i.e., the order of the .txt outputs).
+
+    bigramsSorted and trigramsSorted may be iterators, read once in batches,
+    if their lengths are given as nbigrams and ntrigrams.
+    """
+    words = [word for word, _ in wordsSorted or []]
+    word_to_id = {word: i for i, word in enumerate(words)}
+
+    def save_ngrams(name, ngramsSorted, n, length):
+        ngramsSorted = ngramsSorted or []
+        if length is None:
+            length = len(ngramsSorted)
+        ngramsSorted = iter(ngramsSorted)
+        with ArrayWriter(storefolder, name + "_ids", (length, n),
+                         np.int32) as ids, \
+             ArrayWriter(storefolder, name + "_counts", (length,),
+                         np.int64) as counts:
+            while True:
+                batch = list(islice(ngramsSorted, CHUNK_SIZE))
+                if not batch:
+                    break
+                ids.write([[word_to_id[word] for word in ngram.split(sep)]
+                           for ngram, _ in batch])
+                counts.write([count for _, count in batch])
+
+    save_string_table(storefolder, "vocabulary", words)
+    save_arrays(storefolder,
+                word_counts=np.array([count for _, count in wordsSorted or []],
+                                     dtype=np.int64))
+    save_ngrams("bigram", bigramsSorted, 2, nbigrams)
+    save_ngrams("trigram", trigramsSorted, 3, ntrigrams)
+    info = {"data source": str(datasource), "token count": tokencount}
+    info.update(extra_info or {})
+    save_info(storefolder, info)
+
+
+def write_ngram_store_arrays(storefolder, words, wordcounts, bigrams,
+                             trigrams, tokencount, datasource="",
+                             extra_info=None):
+    """Same as write_ngram_store(), for the outputs of
+    NgramIdCounter.sorted_arrays(): "words" in the order of the words file
+    with their counts, and "bigrams" and "trigrams" as (ids, counts) in the
+    order of the .txt outputs."""
+    save_string_table(storefolder, "vocabulary", words)
+    save_arrays(storefolder, word_counts=wordcounts.astype(np.int64),
+                bigram_ids=bigrams[0].astype(np.int32),
+                bigram_counts=bigrams[1].astype(np.int64),
+                trigram_ids=trigrams[0].astype(np.int32),
+                trigram_counts=trigrams[1].astype(np.int64))
+    info = {"data source": str(datasource), "token count": tokencount}
+    info.update(extra_info or {})
+    save_info(storefolder, info)
+
+
+class NgramStore:
+    """Memory-mapped n-gram tables written by write_ngram_store().
+
+    vocabulary     -- StringTable, word ID -> word (by decreasing frequency)
+    word_counts    -- array, word ID -> count
+    bigram_ids     -- (number of bigrams, 2) array of word IDs
+    bigram_counts  -- array of bigram counts
+    trigram_ids    -- (number of trigrams, 3) array of word IDs
+    trigram_counts -- array of trigram counts
+    """
+
+    def __init__(self, storefolder):
+        self.folder = Path(storefolder)
+        self.info = info = load_info(self.folder)
+        self.datasource = info["data source"]
+        self.tokencount = info["token count"]
+
+        self.vocabulary = StringTable(self.folder, "vocabulary")
+        self.word_counts = load_array(self.folder, "word_counts")
+        self.bigram_ids = load_array(self.folder, "bigram_ids")
+        self.bigram_counts = load_array(self.folder, "bigram_counts")
+        self.trigram_ids = load_array(self.folder, "trigram_ids")
+        self.trigram_counts = load_array(self.folder, "trigram_counts")
+
+    def to_counters(self, sep="\t"):
+        """Return (wordDict, bigramDict, trigramDict) with string keys."""
+        vocabulary = self.vocabulary.tolist()
+
+        wordDict = Counter(dict(zip(vocabulary, self.word_counts.tolist())))
+        bigramDict = Counter(dict(zip(
+            [sep.join([vocabulary[i] for i in ids])
+             for ids in self.bigram_ids.tolist()],
+            self.bigram_counts.tolist())))
+        trigramDict = Counter(dict(zip(
+            [sep.join([vocabulary[i] for i in ids])
+             for ids in self.trigram_ids.tolist()],
+            self.trigram_counts.tolist())))
+
+        return wordDict, bigramDict, trigramDict
+
+
+def load_ngram_store(outfolder, corpusName):
+    """Return the NgramStore for corpusName in outfolder, or None if there
+    is none (e.g. for outputs of an older version of ngrams.py)."""
+    storefolder = ngram_store_path(outfolder, corpusName)
+    if not Path(storefolder, "info.json").exists():
+        return None
+    return NgramStore(storefolder)
+
+
+#------------------------------------------------------------------------------#
+#    persisted count state, for adding new corpus text to the counts
+#------------------------------------------------------------------------------#
+
+def count_state_path(outfolder, corpusName):
+    return Path(outfolder, corpusName + "_countstate")
+
+
+def update_count_state(infilename, statefolder, workers=1,
+                       chunksize=CHUNK_SIZE, sep="\t", engine="counter"):
+    """Add the corpus text not yet counted to the count state in
+    "statefolder", and return the updated counts
+    (wordDict, bigramDict, trigramDict, token count).
+
+    The count state is a binary n-gram store with the counts of all complete
+    lines (i.e., up to the last "\n") of the corpus files counted so far,
+    together with, for each corpus file, the number of bytes counted and
+    their SHA-1 checksum. Only new files and the new complete lines of
+    files that have grown are counted. If a counted file has been modified
+    or removed, everything is counted again.
+
+    The last line of a file, if it has no "\n" yet, is not part of the count
+    state, but it is counted in the returned counts, so that these are
+    always the same as counting the whole corpus from scratch.
+
+    A compressed file is counted as a whole: if it changes in any way after
+    it has been counted, everything is counted again.
+    """
+    files = corpus_files(infilename)
+
+    sources = dict()
+    prefix_sha1 = dict() # corpus file -> SHA-1 of the bytes already counted
+    wordDict, bigramDict, trigramDict = Counter(), Counter(), Counter()
+    tokencount = 0
+
+    if Path(statefolder, "info.json").exists():
+        state = NgramStore(statefolder)
+        sources = state.info["sources"]
+        current = {str(path) for path in files}
+
+        for path in set(sources) - current:
+            print("{} has been removed.".format(path))
+            sources = dict()
+
+        for path in files:
+            source = sources.get(str(path))
+            if source is None:
+                continue
+            if path.stat().st_size == source["offset"] or \
+               (path.stat().st_size > source["offset"] and
+                not detect_compression(path)):
+                prefix_sha1[path] = hash_file_range(path, 0, source["offset"])
+            if path not in prefix_sha1 or \
+               prefix_sha1[path].hexdigest() != source["sha1"]:
+                print("{} has been modified.".format(path))
+                sources = dict()
+                prefix_sha1 = dict()
+                break
+
+        if sources:
+            wordDict, bigramDict, trigramDict = state.to_counters(sep)
+            tokencount = state.tokencount
+        else:
+            print("All of the corpus text is counted again.")
+        del state
+
+    # the new complete lines of each file, and its last line without "\n"
+    newranges = list()
+    tailranges = list()
+    newsources = dict()
+
+    for path in files:
+        offset = sources.get(str(path), {"offset": 0})["offset"]
+        filesize = path.stat().st_size
+        if detect_compression(path):
+            lineend = filesize
+        else:
+            lineend = find_last_line_end(path)
+
+        if offset < lineend:
+            newranges.append((path, offset, lineend))
+        if lineend < filesize:
+            tailranges.append((path, lineend, filesize))
+
+        sha1 = hash_file_range(path, offset, lineend, prefix_sha1.get(path))
+        newsources[str(path)] = {"offset": lineend, "sha1": sha1.hexdigest()}
+
+    print("{} new byte(s) of corpus text to count.".format(
+          sum(end - start for _, start, end in newranges)))
+
+    if newranges:
+        words, bigrams, trigrams, size = count_ngrams_in_ranges(newranges,
+                                            workers, chunksize, sep, engine)
+        wordDict.update(words)
+        bigramDict.update(bigrams)
+        trigramDict.update(trigrams)
+        tokencount += size
+        del words, bigrams, trigrams
+
+    # write the new state next to the old one before replacing it
+    newstatefolder = Path(str(statefolder) + ".new")
+    if newstatefolder.exists():
+        shutil.rmtree(str(newstatefolder))
+    write_ngram_store(newstatefolder, wordDict.items(), bigramDict.items(),
+                      trigramDict.items(), tokencount, infilename, sep,
+                      extra_info={"sources": newsources})
+    if Path(statefolder).exists():
+        shutil.rmtree(str(statefolder))
+    newstatefolder.rename(statefolder)
+
+    if tailranges:
+        words, bigrams, trigrams, size = count_ngrams_in_ranges(tailranges,
+                                                    1, chunksize, sep, engine)
+        wordDict.update(words)
+        bigramDict.update(bigrams)
+        trigramDict.update(trigrams)
+        tokencount += size
+
+    return wordDict, bigramDict, trigramDict, tokencount
+
+
+#------------------------------------------------------------------------------#
+#    approximate bigram and trigram counts in bounded memory
+#------------------------------------------------------------------------------#
+
+class CountMinSketch:
+    """Count-min sketch (Cormode and Muthukrishnan 2005) of item counts.
+
+    Items are given by their 64-bit hashes. The estimate of an item's count
+    is never below its true count, and it exceeds the true count by at most
+    error_bound() with probability at least confidence().
+    """
+
+    def __init__(self, width, depth, seed=0):
+        # width must be a power of 2, and at least 2 so that the hash shift
+        # is less than 64 bits
+        if width < 2 or width & (width - 1):
+            raise ValueError("The width of a count-min sketch must be a power "
+                             "of 2 and at least 2, not {}".format(width))
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+        # multiply-shift hash functions, one for each row
+        random = np.random.RandomState(seed)
+        self._a = random.randint(0, 1 << 62, size=depth,
+                                 dtype=np.int64).astype(np.uint64) * 2 + 1
+        self._b = random.randint(0, 1 << 62, size=depth,
+                                 dtype=np.int64).astype(np.uint64)
+        self._shift = np.uint64(64 - int(math.log2(width)))
+
+    @classmethod
+    def from_memory(cls, nbytes, depth=5):
+        """Return the widest sketch of the given depth in nbytes of memory."""
+        width = 1 << max(0, int(math.log2(max(1, nbytes // (8 * depth)))))
+        return cls(width, depth)
+
+    def _columns(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        return (hashes[None, :] * self._a[:, None] + self._b[:, None]) \
+               >> self._shift
+
+    def add(self, hashes, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        for row, columns in zip(self.table, self._columns(hashes)):
+            np.add.at(row, columns.astype(np.intp), counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, hashes):
+        columns = self._columns(hashes).astype(np.intp)
+        return np.min(self.table[np.arange(self.depth)[:, None], columns],
+                      axis=0)
+
+    def error_bound(self):
+        return math.e / self.width * self.total
+
+    def confidence(self):
+        return 1 - math.exp(-self.depth)
+
+
+class HeavyHitters:
+    """The "size" items with the largest estimated counts offered so far."""
+
+    def __init__(self, size):
+        self.size = size
+        self.counts = dict()
+        self._heap = list() # (count, item), may have outdated entries
+
+    def threshold(self):
+        """The smallest count an item must have to be kept."""
+        if len(self.counts) < self.size:
+            return 0
+        while self._heap[0][0] != self.counts.get(self._heap[0][1]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0]
+
+    def offer(self, item, count):
+        if count <= self.counts.get(item, 0):
+            return
+        self.counts[item] = count
+        heapq.heappush(self._heap, (count, item))
+
+        if len(self.counts) > self.size:
+            self.threshold() # drop outdated entries from the top of the heap
+            _, smallest = heapq.heappop(self._heap)
+            del self.counts[smallest]
+
+        if len(self._heap) > 2 * self.size:
+            self._heap = [(c, x) for x, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+
+def _string_hashes(strings):
+    return np.array([hash(s) for s in strings], dtype=np.int64) \
+             .astype(np.uint64)
+
+
+# approximate counting: estimated bytes taken by an entry of a Counter of
+# words or n-grams (string, count and hash table slot, plus the arrays built
+# when a batch is added to a sketch), and by a kept heavy hitter (string,
+# count and heap entries)
+COUNTER_ENTRY_BYTES = 300
+HEAVY_HITTER_BYTES = 400
+
+
+class ApproximateNgramCounter:
+    """Exact word counts, and approximate counts of the most frequent
+    bigrams and trigrams in about "memory" bytes.
+
+    Half of "memory" is taken by two count-min sketches, one for bigrams
+    and one for trigrams, and the "topk" bigrams and trigrams with the
+    largest estimated counts are kept. Bigrams and trigrams are counted
+    exactly in batches, which take the rest of "memory" together with the
+    word counts: a batch is added to the sketches (and the kept n-grams
+    updated) as soon as it would take more. A ValueError is raised if
+    topk is too large for "memory", or if the word counts alone come to
+    take all of the rest.
+
+    String hashes are those of hash(), so results may differ slightly from
+    one run to another unless PYTHONHASHSEED is set.
+    """
+
+    def __init__(self, memory, topk, sep="\t"):
+        self.sep = sep
+        self.tokencount = 0
+        self.wordDict = Counter()
+        self.sketches = {"bigram": CountMinSketch.from_memory(memory // 4),
+                         "trigram": CountMinSketch.from_memory(memory // 4)}
+
+        # the kept n-grams may take half of the rest, the batches and the
+        # word counts what is left
+        rest = memory - sum(sketch.table.nbytes
+                            for sketch in self.sketches.values())
+        maxtopk = rest // 2 // (2 * HEAVY_HITTER_BYTES)
+        if topk > maxtopk:
+            raise ValueError("At most {} top bigrams and trigrams can be kept "
+                             "in {} bytes, not {}".format(maxtopk, memory,
+                                                          topk))
+        self.heavyhitters = {"bigram": HeavyHitters(topk),
+                             "trigram": HeavyHitters(topk)}
+        self.maxentries = (rest - 2 * topk * HEAVY_HITTER_BYTES) // \
+                          COUNTER_ENTRY_BYTES
+
+        self._bigrams = Counter()
+        self._trigrams = Counter()
+
+    def count_lines(self, lines, maxwordtokens=0):
+        """Count the n-grams in "lines", with the same conventions and the
+        same maxwordtokens behavior as count_ngrams()."""
+        for line in lines:
+            if not line:
+                continue
+
+            words = tokenize(line)
+            self.tokencount += len(words)
+
+            count_line_ngrams(words, self.wordDict,
+                              self._bigrams, self._trigrams, self.sep)
+
+            if len(self.wordDict) + len(self._bigrams) + \
+                    len(self._trigrams) >= self.maxentries:
+                self.flush()
+                if len(self.wordDict) >= self.maxentries:
+                    raise ValueError("The word counts take all of the memory "
+                                     "for approximate counting; give it "
+                                     "more memory")
+
+            if maxwordtokens and self.tokencount > maxwordtokens:
+                break
+
+        self.flush()
+        return self.tokencount
+
+    def flush(self):
+        for name, batch in [("bigram", self._bigrams),
+                            ("trigram", self._trigrams)]:
+            if not batch:
+                continue
+            ngrams = list(batch.keys())
+            hashes = _string_hashes(ngrams)
+            self.sketches[name].add(hashes, list(batch.values()))
+            estimates = self.sketches[name].estimate(hashes)
+
+            heavyhitters = self.heavyhitters[name]
+            threshold = heavyhitters.threshold()
+            for i in np.flatnonzero(estimates >= threshold).tolist():
+                heavyhitters.offer(ngrams[i], int(estimates[i]))
+
+        self._bigrams = Counter()
+        self._trigrams = Counter()
+
+    def most_common(self, name):
+        """Return the list of the kept bigrams or trigrams ("name") with
+        their final estimated counts, and the error bound of the counts."""
+        self.flush()
+        sketch = self.sketches[name]
+        ngrams = list(self.heavyhitters[name].counts)
+        if not ngrams:
+            return [], sketch.error_bound()
+        estimates = sketch.estimate(_string_hashes(ngrams)).tolist()
+        return list(zip(ngrams, estimates)), sketch.error_bound()
+
+
+#------------------------------------------------------------------------------#
+#    external-memory counting: sorted runs spilled to disk, k-way merge
+#------------------------------------------------------------------------------#
+
+# maximum number of run files merged (and open) at a time
+MAX_MERGE_FANIN = 128
+
+
+def _write_run(path, items):
+    """Write (ngram, count) pairs as lines "ngram<TAB>count" to "path"."""
+    with path.open("w", encoding="utf-8") as f:
+        for ngram, count in items:
+            f.write("{}\t{}\n".format(ngram, count))
+
+
+def _read_run(path):
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            ngram, count = line[:-1].rsplit("\t", 1)
+            yield ngram, int(count)
+
+
+def _by_frequency(item):
+    """Sort key for (ngram, count): decreasing count, then n-gram."""
+    return -item[1], item[0]
+
+
+def _sum_counts(items):
+    """Sum the counts of equal n-grams in (ngram, count) pairs sorted by
+    n-gram."""
+    for ngram, group in groupby(items, key=itemgetter(0)):
+        yield ngram, sum(count for _, count in group)
+
+
+class SpillingNgramCounter:
+    """Exact n-gram counts in bounded memory.
+
+    Words are counted in memory. Bigrams and trigrams are counted in memory
+    until there are "maxentries" bigram and trigram types together; the
+    counts are then sorted by n-gram and spilled to a run file in a
+    temporary folder (created in "tempfolder", or in the system default
+    location), and counting starts over with empty counters. The runs are
+    combined at the end by a streaming k-way merge, so at most "maxentries"
+    n-grams (plus one line per run) are in memory at any time.
+
+    Use as a context manager, or call close(), to remove the run files.
+    """
+
+    def __init__(self, maxentries, tempfolder=None, sep="\t"):
+        self.maxentries = maxentries
+        self.sep = sep
+        self.tokencount = 0
+        self.wordDict = Counter()
+        self.counters = {"bigram": Counter(), "trigram": Counter()}
+        self.runs = {"bigram": [], "trigram": []}
+        self.folder = Path(tempfile.mkdtemp(prefix="ngramruns",
+                                            dir=tempfolder and str(tempfolder)))
+        self._nextrun = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        shutil.rmtree(str(self.folder), ignore_errors=True)
+
+    def _new_run_path(self):
+        self._nextrun += 1
+        return Path(self.folder, "run{:06d}.txt".format(self._nextrun))
+
+    def count_lines(self, lines, maxwordtokens=0):
+        """Count the n-grams in "lines", with the same conventions and the
+        same maxwordtokens behavior as count_ngrams()."""
+        bigramDict = self.counters["bigram"]
+        trigramDict = self.counters["trigram"]
+
+        for line in lines:
+            if not line:
+                continue
+
+            words = tokenize(line)
+            self.tokencount += len(words)
+
+            count_line_ngrams(words, self.wordDict,
+                              bigramDict, trigramDict, self.sep)
+
+            if len(bigramDict) + len(trigramDict) >= self.maxentries:
+                self.spill()
+
+            if maxwordtokens and self.tokencount > maxwordtokens:
+                break
+
+        return self.tokencount
+
+    def spill(self):
+        """Write the in-memory bigram and trigram counts as sorted runs."""
+        for name, counter in self.counters.items():
+            if not counter:
+                continue
+            path = self._new_run_path()
+            _write_run(path, sorted(counter.items()))
+            self.runs[name].append(path)
+            counter.clear()
+
+        print("Spilled n-gram counts to disk ({} runs)".format(
+              sum(len(runs) for runs in self.runs.values())))
+
+    def _merge_runs(self, runs, aggregate=_sum_counts, key=None):
+        """Merge groups of MAX_MERGE_FANIN runs into single runs until
+        there are few enough to be merged at once; return the runs left."""
+        runs = list(runs)
+        while len(runs) > MAX_MERGE_FANIN:
+            group, runs = runs[:MAX_MERGE_FANIN], runs[MAX_MERGE_FANIN:]
+            path = self._new_run_path()
+            _write_run(path, aggregate(heapq.merge(
+                       *[_read_run(run) for run in group], key=key)))
+            for run in group:
+                run.unlink()
+            runs.append(path)
+        return runs
+
+    def iter_counts(self, name, min_count=0):
+        """Yield the final (ngram, count) pairs of the bigrams or trigrams
+        ("name") with counts of at least min_count, sorted by n-gram."""
+        runs = self._merge_runs(self.runs[name])
+        self.runs[name] = runs
+        inmemory = sorted(self.counters[name].items())
+        counts = _sum_counts(heapq.merge(inmemory,
+                                         *[_read_run(run) for run in runs]))
+        if min_count:
+            counts = (item for item in counts if item[1] >= min_count)
+        return counts
+
+    def frequency_sorted(self, name, min_count=0):
+        """Return the number of bigram or trigram ("name") types with counts
+        of at least min_count, and an iterator over their (ngram, count)
+        pairs sorted by decreasing count and then by n-gram, i.e., in the
+        order of sorted_alphabetized(key=count, reverse=True).
+
+        The merged counts are sorted again in runs of "maxentries" pairs,
+        which are merged lazily as the iterator is consumed.
+        """
+        ntypes = 0
+        freqruns = list()
+        counts = self.iter_counts(name, min_count)
+        while True:
+            batch = list(islice(counts, self.maxentries))
+            if not batch:
+                break
+            ntypes += len(batch)
+            batch.sort(key=_by_frequency)
+            path = self._new_run_path()
+            _write_run(path, batch)
+            freqruns.append(path)
+
+        freqruns = self._merge_runs(freqruns, aggregate=iter,
+                                    key=_by_frequency)
+        merged = heapq.merge(*[_read_run(run) for run in freqruns],
+                             key=_by_frequency)
+        return ntypes, merged
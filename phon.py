@@ -2,6 +2,7 @@
 
 from collections import Counter
 import argparse
+import sys
 from pathlib import Path
 
 import ngrams
@@ -9,7 +10,7 @@ from lxa5lib import (get_language_corpus_datafolder, json_pdump,
                      changeFilenameSuffix, stdout_list,
                      load_config_for_command_line_help,
                      determine_use_corpus, get_wordlist_path_corpus_stem,
-                     sorted_alphabetized)
+                     sorted_alphabetized, open_file)
 
 #------------------------------------------------------------------------------#
 #
@@ -57,23 +58,19 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     print("\n*****************************************************\n"
           "Running the phon.py program now...\n")
 
+    if use_corpus:
+        # the wordlist is made by ngrams.py (or restored from the artifact
+        # cache) for the current corpus
+        ngrams.ensure_ngrams(language=language, corpus=corpus,
+                             datafolder=datafolder, filename=filename,
+                             maxwordtokens=maxwordtokens)
+
     infilename, corpusName = get_wordlist_path_corpus_stem(language, corpus,
                                 datafolder, filename, maxwordtokens, use_corpus)
 
     if not infilename.exists():
-        if use_corpus:
-            if maxwordtokens:
-                warning = " ({} tokens)".format(maxwordtokens)
-            else:
-                warning = ""
-            print("\nWordlist for {}{} not found.\n"
-                  "ngrams.py is now run.\n".format(corpus, warning))
-            ngrams.main(language=language, corpus=corpus,
-                        datafolder=datafolder, filename=filename,
-                        maxwordtokens=maxwordtokens)
-        else:
-            sys.exit("\nThe specified wordlist ""\n"
-                     "is not found.".format(infilename))
+        sys.exit("\nThe specified wordlist {}\n"
+                 "is not found.".format(infilename))
 
     if filename:
         outfolder = Path(Path(filename).parent, "phon")
@@ -94,7 +91,7 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     print('Reading the wordlist file now...')
 
-    with infilename.open() as f:
+    with open_file(infilename) as f:
         lines = f.readlines()
 
         for line in lines:
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    ngrams.ensure_ngrams and lxa5.ensure_lxa5 with the artifact cache
+#    (artifact_cache.py): outputs made on their own with the default
+#    settings are adopted, and outputs made with other settings, or with
+#    some of them missing, are made again or restored.
+#
+#        $ python3 -m pytest tests
+#
+#------------------------------------------------------------------------------#
+
+import contextlib
+import io
+from pathlib import Path
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from artifact_cache import ArtifactCache
+import lxa5
+import ngrams
+
+STEMS = ["walk", "talk", "jump", "climb", "paint", "play", "kick", "print",
+         "burn", "learn", "cook", "clean"]
+SUFFIXES = ["", "s", "ed", "ing", "er"]
+OTHER = ["the", "a", "dog", "cat", "and", "then", "it"]
+
+
+def make_corpus(path, seed=0):
+    rng = random.Random(seed)
+    with path.open("w") as f:
+        for _ in range(300):
+            words = [rng.choice(STEMS) + rng.choice(SUFFIXES)
+                     if rng.random() < 0.5 else rng.choice(OTHER)
+                     for _ in range(10)]
+            print(" ".join(words), file=f)
+
+
+def quiet(function, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(**kwargs)
+
+
+class ArtifactCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.datafolder = self._folder.name
+        self.root = Path(self.datafolder, "english")
+        self.root.mkdir()
+        make_corpus(Path(self.root, "corpus.txt"))
+        self.corpus = dict(language="english", corpus="corpus.txt",
+                           datafolder=self.datafolder)
+        self.bigrams = Path(self.root, "ngrams", "corpus_bigrams.txt")
+
+    def tearDown(self):
+        self._folder.cleanup()
+
+    def ensure_ngrams(self):
+        return quiet(ngrams.ensure_ngrams,
+                     tables=("words", "bigrams", "trigrams"), **self.corpus)
+
+    def manifests(self, component):
+        return [manifest for manifest in
+                ArtifactCache(Path(self.root, "cache")).manifests()
+                if manifest["component"] == component]
+
+    def test_ngrams_adopted(self):
+        quiet(ngrams.main, **self.corpus)
+        self.assertTrue(self.ensure_ngrams())
+        self.assertEqual([manifest["adopted"]
+                          for manifest in self.manifests("ngrams")], [True])
+
+    def test_ngrams_other_settings(self):
+        quiet(ngrams.main, engine="numpy", mincount=2, **self.corpus)
+        filtered = self.bigrams.read_text()
+        self.assertFalse(self.ensure_ngrams())
+        self.assertNotEqual(self.bigrams.read_text(), filtered)
+        self.assertEqual([manifest["adopted"]
+                          for manifest in self.manifests("ngrams")], [False])
+
+        # made again with the default settings, so that the table is that
+        # of a run of ngrams.py on its own
+        expected = self.bigrams.read_text()
+        quiet(ngrams.main, **self.corpus)
+        self.assertEqual(self.bigrams.read_text(), expected)
+
+    def test_ngrams_missing(self):
+        # restored from the cache
+        self.assertFalse(self.ensure_ngrams())
+        expected = self.bigrams.read_text()
+        self.bigrams.unlink()
+        self.assertTrue(self.ensure_ngrams())
+        self.assertEqual(self.bigrams.read_text(), expected)
+
+        # made again without the cache
+        quiet(ngrams.main, **self.corpus)
+        Path(self.root, "cache").rename(Path(self.root, "oldcache"))
+        self.bigrams.unlink()
+        self.assertFalse(self.ensure_ngrams())
+        self.assertEqual(self.bigrams.read_text(), expected)
+
+    def test_lxa5(self):
+        quiet(lxa5.main, **self.corpus)
+        self.assertTrue(quiet(lxa5.ensure_lxa5, **self.corpus))
+
+        # the entry of the adopted outputs is replaced by that of the run
+        sigtransforms = Path(self.root, "lxa",
+                             "corpus_WordToSigtransforms.json")
+        expected = sigtransforms.read_text()
+        quiet(lxa5.main, MinimumStemLength=5, **self.corpus)
+        self.assertNotEqual(sigtransforms.read_text(), expected)
+        self.assertFalse(quiet(lxa5.ensure_lxa5, **self.corpus))
+        self.assertEqual(sigtransforms.read_text(), expected)
+        self.assertEqual([manifest["adopted"]
+                          for manifest in self.manifests("lxa5")], [False])
+
+
+if __name__ == "__main__":
+    unittest.main()
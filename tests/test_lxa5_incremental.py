@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    IncrementalMorphology (lxa5_incremental.py) must give the same outputs
+#    as a full run of lxa5.py on the new wordlist, after words are added and
+#    removed, for suffixes and for prefixes.
+#
+#        $ python3 -m pytest tests
+#
+#------------------------------------------------------------------------------#
+
+import contextlib
+import filecmp
+import io
+from pathlib import Path
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import lxa5
+from lxa5lib import json_pload
+from lxa5_incremental import IncrementalMorphology
+
+AFFIXES = ["", "s", "ed", "ing", "er", "ers", "ly", "un", "re", "dis"]
+
+
+def make_words(FindSuffixesFlag, seed=0):
+    """Return a dict of word: count of made-up stems with affixes."""
+    rng = random.Random(seed)
+    words = dict()
+    for _ in range(400):
+        stem = "".join(rng.choice("bcdfghklmnprstvz") + rng.choice("aeiou")
+                       for _ in range(rng.randint(2, 4)))
+        for affix in rng.sample(AFFIXES, rng.randint(1, 5)):
+            word = stem + affix if FindSuffixesFlag else affix + stem
+            words[word] = rng.randint(1, 100)
+    return words
+
+
+def compare_folders(test, folder1, folder2):
+    """The json files are compared by their contents, as the sets in them
+    (e.g. the stems of each signature) are written in no particular order,
+    and the other files byte for byte."""
+    comparison = filecmp.dircmp(str(folder1), str(folder2))
+    test.assertEqual(comparison.left_only + comparison.right_only, [])
+    jsonfiles = [name for name in comparison.common_files
+                 if name.endswith(".json")]
+    for name in jsonfiles:
+        with Path(folder1, name).open() as f1, Path(folder2, name).open() as f2:
+            test.assertEqual(json_pload(f1), json_pload(f2), name)
+    _, mismatch, errors = filecmp.cmpfiles(str(folder1), str(folder2),
+        [name for name in comparison.common_files if name not in jsonfiles],
+        shallow=False)
+    test.assertEqual(mismatch + errors, [])
+    for subfolder in comparison.common_dirs:
+        compare_folders(test, Path(folder1, subfolder),
+                        Path(folder2, subfolder))
+
+
+class IncrementalMorphologyTest(unittest.TestCase):
+
+    def check_against_full_run(self, direction):
+        FindSuffixesFlag = lxa5.DIRECTIONS[direction]
+        allwords = make_words(FindSuffixesFlag)
+        wordlist = sorted(allwords)
+        rng = random.Random(1)
+
+        current = {word: allwords[word]
+                   for word in rng.sample(wordlist, len(wordlist) * 2 // 3)}
+        morphology = IncrementalMorphology.from_words(
+            dict(current), MinimumStemLength=3,
+            FindSuffixesFlag=FindSuffixesFlag)
+
+        for step in range(4):
+            remove = rng.sample(sorted(current), len(current) // 5)
+            add = rng.sample(sorted(set(wordlist) - set(current)),
+                             len(wordlist) // 10)
+            # the first and last words of the wordlist (which may be in it
+            # already, and then have their counts increased), and a word
+            # removed twice, which is removed only once
+            if step == 2:
+                add += [wordlist[0], wordlist[-1]]
+                remove += remove[:1]
+
+            kept = set(current) - set(remove)
+            added, removed = morphology.update(
+                add={word: allwords[word] for word in add}, remove=remove)
+            self.assertEqual(added, len(set(add) - kept))
+            self.assertEqual(removed, len(set(remove)))
+
+            current = {word: current[word] for word in kept}
+            for word in add:
+                current[word] = current.get(word, 0) + allwords[word]
+            self.assertEqual(dict(morphology.wordFreqDict), current)
+
+        self.assertTrue(morphology.SigToStems)
+
+        with tempfile.TemporaryDirectory() as datafolder:
+            Path(datafolder, "test").mkdir()
+            with Path(datafolder, "test", "words.txt").open("w") as f:
+                for word in sorted(current):
+                    print(word, current[word], file=f)
+
+            incrementalfolder = Path(datafolder, "incremental")
+            incrementalfolder.mkdir()
+            with contextlib.redirect_stdout(io.StringIO()):
+                lxa5.main(language="test", corpus="words.txt",
+                          datafolder=datafolder, MinimumStemLength=3,
+                          use_corpus=False, direction=direction)
+                lxa5.write_outputs(incrementalfolder, "words",
+                    morphology.wordFreqDict, morphology.StemToWords,
+                    morphology.SigToStems, morphology.WordToSigs,
+                    morphology.WordToSigtransforms, morphology.AffixToSigs,
+                    FindSuffixesFlag=FindSuffixesFlag)
+
+            # the settings file of lxa5.py is not one of the outputs
+            Path(datafolder, "test", "lxa", "words_settings.json").unlink()
+            compare_folders(self, Path(datafolder, "test", "lxa"),
+                            incrementalfolder)
+
+    def test_suffixes(self):
+        self.check_against_full_run("suffix")
+
+    def test_prefixes(self):
+        self.check_against_full_run("prefix")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    ngrams.py with --mincount above the largest count of the n-grams: the
+#    n-gram tables are written without any n-grams, with each engine.
+#
+#        $ python3 -m pytest tests
+#
+#------------------------------------------------------------------------------#
+
+import contextlib
+import io
+import json
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import ngrams
+
+CORPUS = "the cat sat on the mat .\nthe dog sat on the cat .\n"
+
+
+class MinCountTest(unittest.TestCase):
+
+    def check_no_ngrams(self, **kwargs):
+        with tempfile.TemporaryDirectory() as folder:
+            corpus = Path(folder, "corpus.txt")
+            corpus.write_text(CORPUS)
+            with contextlib.redirect_stdout(io.StringIO()):
+                ngrams.main(filename=str(corpus), mincount=100, **kwargs)
+
+            for name in ["bigrams", "trigrams"]:
+                with Path(folder, "ngrams",
+                          "corpus_{}.json".format(name)).open() as f:
+                    self.assertEqual(json.load(f), {})
+                with Path(folder, "ngrams",
+                          "corpus_{}.txt".format(name)).open() as f:
+                    self.assertTrue(all(line.startswith("#") for line in f))
+
+    def test_counter(self):
+        self.check_no_ngrams()
+
+    def test_numpy(self):
+        self.check_no_ngrams(engine="numpy")
+
+    def test_maxentries(self):
+        self.check_no_ngrams(maxentries=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
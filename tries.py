@@ -253,25 +253,21 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     print("reading wordlist...", flush=True)
 
+    if use_corpus:
+        # the wordlist is made by ngrams.py (or restored from the artifact
+        # cache) for the current corpus
+        ngrams.ensure_ngrams(language=language, corpus=corpus,
+                             datafolder=datafolder, filename=filename,
+                             maxwordtokens=maxwordtokens)
+
     wordlist_path, corpusName = get_wordlist_path_corpus_stem(language, corpus,
                                 datafolder, filename, maxwordtokens, use_corpus)
 
     print("wordlist file path:\n{}\n".format(wordlist_path))
 
     if not wordlist_path.exists():
-        if use_corpus:
-            if maxwordtokens:
-                warning = " ({} tokens)".format(maxwordtokens)
-            else:
-                warning = ""
-            print("\nWordlist for {}{} not found.\n"
-                  "ngrams.py is now run.\n".format(corpus, warning))
-            ngrams.main(language=language, corpus=corpus,
-                        datafolder=datafolder, filename=filename,
-                        maxwordtokens=maxwordtokens)
-        else:
-            sys.exit("\nThe specified wordlist ""\n"
-                     "is not found.".format(wordlist_path))
+        sys.exit("\nThe specified wordlist {}\n"
+                 "is not found.".format(wordlist_path))
 
     wordFreqDict = read_word_freq(wordlist_path)
     wordlist = sorted(wordFreqDict.keys())
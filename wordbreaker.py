@@ -24,7 +24,8 @@ import datetime
 from latexTable_py3 import MakeLatexTable
 from lxa5lib import (get_language_corpus_datafolder, json_pdump,
                      changeFilenameSuffix, stdout_list,
-                     load_config_for_command_line_help)
+                     load_config_for_command_line_help, open_file)
+from tokenizer import tokenize
 
 
 
@@ -188,7 +189,7 @@ class Lexicon:
             print("Warning:", infilepathname, "does not exist.")
             print("Check file paths and names.")
             sys.exit()
-        infile = open(infilepathname)
+        infile = open_file(infilepathname)
 
         rawcorpus_list = infile.readlines() # bad code if the corpus is very large -- but then we won't use python.
         if howmuchcorpus != "all":
@@ -200,17 +201,7 @@ class Lexicon:
             breakpoint_list_forline = list()
 
             # Clean up data as desired   # This is for the sake of the TrueDictionary 
-            line = line.casefold()
-            line = line.replace(".", " . ")
-            line = line.replace(",", " , ")
-            line = line.replace(";", " ; ")
-            line = line.replace("!", " ! ")
-            line = line.replace("?", " ? ")
-            line = line.replace(":", " : ")
-            line = line.replace(")", " ) ")
-            line = line.replace("(", " ( ")
-
-            line_list = line.split()                           # split line into words
+            line_list = tokenize(line)                         # split line into words
             if len(line_list) <=  1:
                 continue
             for word in line_list:                             # by word in line